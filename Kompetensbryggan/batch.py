@@ -0,0 +1,258 @@
+"""
+Headless batchkörning: poängsätter en mapp (eller manifest) med CV-PDF:er.
+
+Taxonomin laddas en gång – i föräldraprocessen före fork (delas copy-on-write)
+eller, på plattformar utan fork, en gång per worker via den memory-mappade snapshoten.
+Resultaten strömmas rad för rad till en JSONL-fil.
+
+Usage:
+    python batch.py cv_mapp/ --out resultat.jsonl
+    python batch.py manifest.txt --workers 8 --top-k 10
+    python batch.py cv_mapp/ --service http://127.0.0.1:8765   # varm taxonomi i service.py
+    python batch.py portfolios/ --workers 2 --page-workers 4    # få men mycket långa PDF:er
+    python batch.py cv_mapp/ --fuzzy                            # även böjningar och stavfel (långsammare)
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from loaders import load_jobtech_data, detect_pdf_skills
+from fuzzy import FUZZY_CREDIT
+from hierarchy import HIERARCHY_DECAY
+from pdf_cache import AnalysisCache
+from service import MatchingClient
+from sparse_engine import MatchMatrix
+
+_STATE = None  # (db, matcher, matrix) per process
+_CACHE = None  # AnalysisCache när --cache-dir anges
+
+
+def _load_state(cache_dir=None):
+    global _STATE, _CACHE
+    if _STATE is None:
+        db = load_jobtech_data()
+        # Samma automat som registret; yrkesmatrisen poängsätter ett helt uppdrag i en produkt
+        _STATE = (db, db['registry'].matcher, MatchMatrix(db['relations']))
+    if cache_dir and _CACHE is None:
+        _CACHE = AnalysisCache(cache_dir)
+    return _STATE
+
+
+def collect_inputs(source):
+    """En mapp (alla *.pdf rekursivt) eller ett manifest med en sökväg per rad."""
+    if os.path.isdir(source):
+        paths = []
+        for root, _, files in os.walk(source):
+            paths.extend(os.path.join(root, f) for f in files if f.lower().endswith('.pdf'))
+        return sorted(paths)
+    base = os.path.dirname(os.path.abspath(source))
+    with open(source, 'r', encoding='utf-8') as f:
+        lines = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+    return [p if os.path.isabs(p) else os.path.join(base, p) for p in lines]
+
+
+def _detect_cv(path, db, matcher, max_pages=None, max_chars=None, page_workers=1, fuzzy=False):
+    """Extraherar och detekterar ett CV -> (resultat, pdf-analysen)."""
+    def analyze():
+        # Sidorna strömmas in i automaten; tid per sida avslöjar patologiska PDF:er
+        return detect_pdf_skills(path, matcher, max_pages, max_chars, page_workers,
+                                 fuzzy=db['fuzzy'] if fuzzy else None)
+
+    if _CACHE is not None:
+        with open(path, 'rb') as f:
+            pdf = _CACHE.get_or_compute(f.read(), analyze, max_pages, max_chars, fuzzy)
+    else:
+        pdf = analyze()
+    result = {'file': path, 'pages': pdf['pages'], 'truncated': pdf['truncated'], 'skills': pdf['skill_ids']}
+    if fuzzy:
+        result['fuzzy_skills'] = pdf['fuzzy_ids']
+    return result, pdf
+
+
+def analyze_chunk(paths, top_k=5, max_pages=None, max_chars=None, decay=HIERARCHY_DECAY, page_workers=1,
+                  fuzzy=False):
+    """
+    Extraherar och detekterar varje CV i paths och poängsätter sedan alla på en gång
+    (MatchMatrix: en gles matrisprodukt för hela uppdraget). Körs i en worker-process.
+    """
+    db, matcher, matrix = _load_state()
+    results, seconds, credits = [], [], []
+    for path in paths:
+        t0 = time.perf_counter()
+        try:
+            result, pdf = _detect_cv(path, db, matcher, max_pages, max_chars, page_workers, fuzzy)
+            approximate = set(pdf['fuzzy_ids'])  # ungefärliga träffar ger FUZZY_CREDIT
+            credits.append(db['ancestry'].expand(set(pdf['skill_ids']) - approximate, decay,
+                                                 dict.fromkeys(approximate, FUZZY_CREDIT)))
+        except Exception as e:
+            result = {'file': path, 'error': str(e)}
+        results.append(result)
+        seconds.append(time.perf_counter() - t0)
+
+    ok = [i for i, r in enumerate(results) if 'error' not in r]
+    t0 = time.perf_counter()
+    try:
+        for i, top in zip(ok, matrix.top_k(credits, top_k)):
+            results[i]['top'] = [{'id': occ, 'name': db['jobs'].get(occ, 'Specialistroll'), 'score': round(score, 4)}
+                                 for occ, score in top]
+    except Exception as e:
+        for i in ok:
+            results[i]['error'] = str(e)
+    share = (time.perf_counter() - t0) / max(len(ok), 1)  # poängsättningen fördelas lika
+    for i in ok:
+        seconds[i] += share
+    for result, s in zip(results, seconds):
+        result['seconds'] = round(s, 4)
+    return results
+
+
+def analyze_cv(path, top_k=5, max_pages=None, max_chars=None, decay=HIERARCHY_DECAY, page_workers=1, fuzzy=False):
+    """Extraherar, detekterar och poängsätter ett CV."""
+    return analyze_chunk([path], top_k, max_pages, max_chars, decay, page_workers, fuzzy)[0]
+
+
+def _analyze(args):
+    return analyze_chunk(*args)
+
+
+def run_batch(paths, out_path, workers=None, top_k=5, chunksize=4, cache_dir=None,
+              max_pages=None, max_chars=None, decay=HIERARCHY_DECAY, page_workers=1, fuzzy=False):
+    """
+    Kör alla CV:n i en processpool och skriver ett JSON-objekt per rad. Returnerar (ok, fel).
+    Varje worker-uppdrag är chunksize CV:n som poängsätts tillsammans (analyze_chunk).
+    Med page_workers > 1 delas dessutom långa PDF:er upp i sidintervall (loaders.iter_pages).
+    """
+    # Med fork laddas taxonomin här en gång och ärvs av alla workers
+    if 'fork' in multiprocessing.get_all_start_methods():
+        ctx = multiprocessing.get_context('fork')
+        _load_state(cache_dir)
+    else:
+        ctx = multiprocessing.get_context()
+
+    ok = failed = 0
+    t0 = time.time()
+    with open(out_path, 'w', encoding='utf-8') as out, \
+            ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                                initializer=_load_state, initargs=(cache_dir,)) as pool:
+        chunks = (paths[i:i + chunksize] for i in range(0, len(paths), chunksize))
+        for batch in pool.map(_analyze, ((chunk, top_k, max_pages, max_chars, decay, page_workers, fuzzy)
+                                         for chunk in chunks)):
+            for result in batch:
+                out.write(json.dumps(result, ensure_ascii=False) + '\n')
+                if 'error' in result:
+                    failed += 1
+                else:
+                    ok += 1
+
+    elapsed = max(time.time() - t0, 1e-9)
+    print(f"✅ {ok} CV:n analyserade ({failed} fel) på {elapsed:.1f} s – "
+          f"{(ok + failed) / elapsed * 3600:,.0f} CV:n/timme → {out_path}")
+    return ok, failed
+
+
+def _analyze_remote(client, paths, top_k, max_pages, max_chars, decay, fuzzy=False):
+    """Ett uppdrag mot matchningstjänsten: alla CV:n i paths detekteras och poängsätts i två anrop."""
+    t0 = time.perf_counter()
+    results, items = [], []
+    for path in paths:
+        try:
+            with open(path, 'rb') as f:
+                items.append({'pdf': f.read(), 'max_pages': max_pages, 'max_chars': max_chars, 'fuzzy': fuzzy})
+            results.append({'file': path})
+        except OSError as e:
+            results.append({'file': path, 'error': str(e)})
+    ok = [r for r in results if 'error' not in r]
+    try:
+        detected = client.detect_skills(items)
+        for result, pdf in zip(ok, detected):
+            result.update(pdf)
+            result.pop('text', None)
+        ok = [r for r in ok if 'error' not in r]
+        scored = client.score_occupations([{'skill_ids': r['skill_ids'], 'fuzzy_ids': r['fuzzy_ids'],
+                                            'top_k': top_k, 'decay': decay} for r in ok])
+        jobs = client.taxonomy()['jobs']
+        for result, score in zip(ok, scored):
+            result['skills'] = result.pop('skill_ids')
+            fuzzy_ids = result.pop('fuzzy_ids')
+            if fuzzy:
+                result['fuzzy_skills'] = fuzzy_ids
+            result['top'] = [{'id': m['id'], 'name': jobs.get(m['id'], 'Specialistroll'), 'score': round(m['score'], 4)}
+                             for m in score['matches']]
+    except Exception as e:
+        for result in ok:
+            result['error'] = str(e)
+    seconds = round((time.perf_counter() - t0) / max(len(paths), 1), 4)
+    for result in results:
+        result['seconds'] = seconds
+    return results
+
+
+def run_batch_remote(paths, out_path, url, workers=None, top_k=5, chunksize=4,
+                     max_pages=None, max_chars=None, decay=HIERARCHY_DECAY, fuzzy=False):
+    """Som run_batch, men mot en varm matchningstjänst; workers trådar skickar chunksize CV:n per anrop."""
+    client = MatchingClient(url)
+    chunks = [paths[i:i + chunksize] for i in range(0, len(paths), chunksize)]
+    ok = failed = 0
+    t0 = time.time()
+    with open(out_path, 'w', encoding='utf-8') as out, ThreadPoolExecutor(max_workers=workers or 4) as pool:
+        for batch in pool.map(lambda chunk: _analyze_remote(client, chunk, top_k, max_pages, max_chars,
+                                                            decay, fuzzy), chunks):
+            for result in batch:
+                out.write(json.dumps(result, ensure_ascii=False) + '\n')
+                if 'error' in result:
+                    failed += 1
+                else:
+                    ok += 1
+
+    elapsed = max(time.time() - t0, 1e-9)
+    print(f"✅ {ok} CV:n analyserade via {url} ({failed} fel) på {elapsed:.1f} s – "
+          f"{(ok + failed) / elapsed * 3600:,.0f} CV:n/timme → {out_path}")
+    return ok, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch-matchning av CV-PDF:er mot JobTech-taxonomin")
+    parser.add_argument('source', help="Mapp med PDF:er eller manifest (en sökväg per rad)")
+    parser.add_argument('--out', default='resultat.jsonl', help="JSONL-utfil (default: resultat.jsonl)")
+    parser.add_argument('--workers', type=int, default=None, help="Antal processer (default: alla kärnor)")
+    parser.add_argument('--top-k', type=int, default=5, help="Antal yrken per CV (default: 5)")
+    parser.add_argument('--chunksize', type=int, default=4, help="CV:n per worker-uppdrag (default: 4)")
+    parser.add_argument('--cache-dir', default=None, help="Återanvänd PDF-analyser från en diskcache")
+    parser.add_argument('--max-pages', type=int, default=None, help="Läs högst så här många sidor per PDF")
+    parser.add_argument('--max-chars', type=int, default=None, help="Läs högst så här många tecken per PDF")
+    parser.add_argument('--page-workers', type=int, default=1,
+                        help="Processer per PDF för sidextrahering av långa dokument (default: 1)")
+    parser.add_argument('--hierarchy-decay', type=float, default=HIERARCHY_DECAY,
+                        help=f"Delkredit per hierarkisteg för överordnade kompetenser, 0 = av (default: {HIERARCHY_DECAY})")
+    parser.add_argument('--fuzzy', action='store_true',
+                        help="Matcha även böjningar och stavfel (trigram-index, flera gånger långsammare); "
+                             f"sådana träffar ger kredit {FUZZY_CREDIT} i stället för 1.0")
+    parser.add_argument('--service', default=None,
+                        help="Använd matchningstjänsten (service.py), t.ex. http://127.0.0.1:8765 eller unix:///tmp/kb.sock")
+    args = parser.parse_args()
+
+    paths = collect_inputs(args.source)
+    if not paths:
+        print(f"❌ Inga PDF:er hittades i {args.source}")
+        sys.exit(1)
+    print(f"📄 {len(paths)} CV:n att analysera")
+    if args.service:
+        if args.cache_dir:
+            print("⚠ --cache-dir gäller inte med --service; starta tjänsten med service.py --cache-dir")
+        if args.page_workers > 1:
+            print("⚠ --page-workers gäller inte med --service; starta tjänsten med service.py --page-workers")
+        run_batch_remote(paths, args.out, args.service, workers=args.workers, top_k=args.top_k,
+                         chunksize=args.chunksize, max_pages=args.max_pages, max_chars=args.max_chars,
+                         decay=args.hierarchy_decay, fuzzy=args.fuzzy)
+        return
+    run_batch(paths, args.out, workers=args.workers, top_k=args.top_k, chunksize=args.chunksize,
+              cache_dir=args.cache_dir, max_pages=args.max_pages, max_chars=args.max_chars,
+              decay=args.hierarchy_decay, page_workers=args.page_workers, fuzzy=args.fuzzy)
+
+
+if __name__ == '__main__':
+    main()
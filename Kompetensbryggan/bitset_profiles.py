@@ -0,0 +1,174 @@
+import numpy as np
+from occupation_index import OccupationIndex
+
+if hasattr(np, 'bitwise_count'):
+    def popcount(words):
+        return np.bitwise_count(words)
+else:  # numpy < 2.0: räkna bitar per byte via uppslagstabell
+    _BYTE_COUNTS = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+    def popcount(words):
+        return _BYTE_COUNTS[words.view(np.uint8)].reshape(*words.shape, 8).sum(axis=-1, dtype=np.uint8)
+
+
+class BitsetProfiles:
+    """
+    Yrkenas kravprofiler som bitmängder med fast bredd.
+    Varje kompetens-ID får ett tätt heltal (kolumn) och varje yrke en rad av uint64-ord,
+    så träffar och saknade krav blir popcount över AND / AND-NOT för hela katalogen på en gång.
+    Tar ~(antal kompetenser / 8) byte per yrke i stället för en Python-mängd med strängar.
+    OccupationIndex (kompetens -> rader) gallrar fram kandidaterna, så popcount bara
+    körs på yrken som delar minst en kompetens med CV:t.
+    """
+
+    def __init__(self, relations, index=None):
+        # relations: db['relations'], samma form och radordning som OccupationIndex
+        self.occupation_ids = []
+        self.skill_ids = []
+        self.skill_index = {}
+        rows, cols = [], []
+
+        for rel in relations:
+            job_cols = {self._column(r['id']) for r in rel.get('relations', [])}
+            if not job_cols:
+                continue
+            row = len(self.occupation_ids)
+            self.occupation_ids.append(rel['id'])
+            rows.extend([row] * len(job_cols))
+            cols.extend(job_cols)
+
+        self.words = max(1, -(-len(self.skill_ids) // 64))
+        self.bits = np.zeros((len(self.occupation_ids), self.words), dtype=np.uint64)
+        cols = np.asarray(cols, dtype=np.int64)
+        np.bitwise_or.at(self.bits, (np.asarray(rows, dtype=np.int64), cols >> 6),
+                         np.left_shift(np.uint64(1), (cols & 63).astype(np.uint64)))
+        self.requirement_counts = popcount(self.bits).sum(axis=1, dtype=np.int64)
+        self.index = index if index is not None else OccupationIndex(relations)
+        if len(self.index) != len(self):
+            raise ValueError("OccupationIndex och profilerna måste byggas från samma relationer")
+
+    def _column(self, s_id):
+        col = self.skill_index.get(s_id)
+        if col is None:
+            col = len(self.skill_ids)
+            self.skill_index[s_id] = col
+            self.skill_ids.append(s_id)
+        return col
+
+    def __len__(self):
+        return len(self.occupation_ids)
+
+    @property
+    def nbytes(self):
+        return self.bits.nbytes
+
+    def encode(self, skill_ids):
+        """Kodar en kompetensmängd som en bitvektor (okända IDn ignoreras)."""
+        vec = np.zeros(self.words, dtype=np.uint64)
+        cols = np.fromiter((self.skill_index[s] for s in skill_ids if s in self.skill_index), dtype=np.int64)
+        if len(cols):
+            np.bitwise_or.at(vec, cols >> 6, np.left_shift(np.uint64(1), (cols & 63).astype(np.uint64)))
+        return vec
+
+    def decode(self, words):
+        """Bitvektor(er) -> kolumner. För en matris returneras (rad, kolumn)-par."""
+        words = np.ascontiguousarray(words, dtype='<u8')
+        # Packa bara upp ord som inte är noll – profilerna är glesa
+        pos = np.nonzero(words)
+        flags = np.unpackbits(words[pos].view(np.uint8).reshape(-1, 8), axis=1, bitorder='little')
+        which, bit = np.nonzero(flags)
+        return (*(p[which] for p in pos[:-1]), pos[-1][which] * 64 + bit)
+
+    def overlap(self, cv_bits):
+        """Antal uppfyllda krav per yrke: popcount(yrke AND cv)."""
+        return popcount(self.bits & cv_bits).sum(axis=1, dtype=np.int64)
+
+    def missing_counts(self, cv_bits):
+        """Antal saknade krav per yrke: popcount(yrke AND NOT cv)."""
+        return popcount(self.bits & ~cv_bits).sum(axis=1, dtype=np.int64)
+
+    def candidates(self, my_ids):
+        """Rader som delar minst en kompetens med my_ids (via OccupationIndex), som int64-array."""
+        rows = self.index.candidates(my_ids)
+        return np.fromiter(rows, dtype=np.int64, count=len(rows))
+
+    def points(self, my_ids, credits=None):
+        """
+        (Viktade) träffar per yrke. credits från SkillHierarchy.expand grupperas per
+        kreditnivå, en bitvektor per nivå – så förblir även delkrediterna vektoriserade.
+        Bara kandidatraderna från indexet räknas; övriga har noll träffar.
+        """
+        levels = {1.0: list(my_ids)} if credits is None else {}
+        for s_id, credit in (credits or {}).items():
+            levels.setdefault(credit, []).append(s_id)
+        rows = self.candidates(my_ids if credits is None else credits)
+        sub = self.bits[rows]
+        total = np.zeros(len(self), dtype=np.float64)
+        for credit, ids in levels.items():
+            total[rows] += credit * popcount(sub & self.encode(ids)).sum(axis=1, dtype=np.int64)
+        return total
+
+    def score_vector(self, my_ids, credits=None):
+        """Poäng för hela katalogen = (viktade) träffar / antal krav, i radordning."""
+        return self.points(my_ids, credits) / np.maximum(self.requirement_counts, 1)
+
+    def _masks(self, my_ids, credits):
+        credits = credits if credits is not None else dict.fromkeys(my_ids, 1.0)
+        exact = self.encode([s for s, c in credits.items() if c >= 1.0])
+        return credits, exact, self.encode(credits)
+
+    def details(self, rows, my_ids, credits=None, points=None):
+        """
+        [{'id', 'score', 'hits', 'inherited', 'missing'}] för de givna raderna.
+        Bitarna packas bara upp för dessa rader, så topplistor blir billiga.
+        """
+        credits, exact, covered = self._masks(my_ids, credits)
+        rows = np.asarray(rows, dtype=np.int64)
+        if points is None:
+            points = self.points(my_ids, credits)
+        if not len(rows):
+            return []
+        sub = self.bits[rows]
+
+        def per_row(words):
+            _, cols = self.decode(words)
+            return np.split(cols, np.cumsum(popcount(words).sum(axis=1))[:-1])
+
+        hits, inherited, missing = per_row(sub & exact), per_row(sub & covered & ~exact), per_row(sub & ~covered)
+        ids = self.skill_ids
+        return [{
+            'id': self.occupation_ids[row],
+            'score': points[row] / self.requirement_counts[row],
+            'hits': [ids[c] for c in hits[i]],
+            'inherited': [ids[c] for c in inherited[i]],
+            'missing': [ids[c] for c in missing[i]],
+        } for i, row in enumerate(rows.tolist())]
+
+    def score(self, my_ids, credits=None):
+        """
+        Samma resultat som OccupationIndex.score: [{'id', 'score', 'hits', 'inherited', 'missing'}]
+        för alla yrken med minst en träff, i relationsordning. Behövs bara poängen är
+        score_vector/top_k betydligt billigare.
+        """
+        points = self.points(my_ids, credits)
+        return self.details(np.flatnonzero(points > 0), my_ids, credits, points)
+
+    def missing_by_skill(self, rows, my_ids, credits=None):
+        """Antal av de givna yrkena som saknar varje kompetens: {kompetens-ID: antal} (kolumnsummor)."""
+        _, _, covered = self._masks(my_ids, credits)
+        rows = np.asarray(rows, dtype=np.int64)
+        if not len(rows):
+            return {}
+        gaps = np.ascontiguousarray(self.bits[rows] & ~covered, dtype='<u8')
+        counts = np.unpackbits(gaps.view(np.uint8), axis=1, bitorder='little').sum(axis=0, dtype=np.int64)
+        cols = np.flatnonzero(counts[:len(self.skill_ids)])
+        return {self.skill_ids[c]: int(counts[c]) for c in cols}
+
+    def top_k(self, my_ids, k=5, credits=None):
+        """De k bästa yrkena som [(yrkes-ID, poäng)], bäst först; lika poäng i relationsordning."""
+        scores = self.score_vector(my_ids, credits)
+        rows = np.flatnonzero(scores > 0)  # bara kandidater kan ha poäng
+        if k <= 0 or not len(rows):
+            return []
+        order = rows[np.lexsort((rows, -scores[rows]))][:k]
+        return [(self.occupation_ids[r], float(scores[r])) for r in order]
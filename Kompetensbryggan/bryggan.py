@@ -1,22 +1,54 @@
 import streamlit as st
 import json
-import PyPDF2
-import re
+import os
+from matcher import SkillMatcher
+from fuzzy import FuzzyMatcher
+from bitset_profiles import BitsetProfiles
+from hierarchy import SkillHierarchy, HIERARCHY_DECAY
+from gap_analysis import GapAnalyzer, UNLOCK_THRESHOLD
+from snapshot import open_snapshot
+from pdf_cache import AnalysisCache
+from catalog import TaxonomyCatalog
+from industry import IndustryIndex, SOURCES as INDUSTRY_SOURCES
+from segments import OccupationSegments, SOURCES as SEGMENT_SOURCES
+from visualizer import draw_industry_heatmap, draw_taxonomy_tree
+from service import MatchingService, MatchingClient
+from instrumentation import metrics
 
-# 1. Förbättrad PDF-läsare
-def extract_text_from_pdf(file):
+# Klientläge: med KOMPETENSBRYGGAN_SERVICE (t.ex. http://127.0.0.1:8765 eller unix:///tmp/kb.sock)
+# hålls taxonomin varm i service.py och delas av alla workers; inget laddas i den här processen
+SERVICE_URL = os.environ.get('KOMPETENSBRYGGAN_SERVICE')
+# Prestandapanelen i sidofältet visas alltid med KOMPETENSBRYGGAN_DEBUG, annars via kryssrutan
+DEBUG = bool(os.environ.get('KOMPETENSBRYGGAN_DEBUG'))
+
+# 1. Förbättrad PDF-läsare: sidorna strömmas direkt in i kompetens-automaten
+MAX_PAGES = 40         # budget för långa portfolios och inskannade bilagor
+MAX_CHARS = 200_000
+
+def read_cv_pdf(pdf_bytes, fuzzy=False):
     try:
-        pdf_reader = PyPDF2.PdfReader(file)
-        text = " ".join([page.extract_text() or "" for page in pdf_reader.pages])
-        return text
+        result = load_matching_service().detect_skills(
+            [{'pdf': pdf_bytes, 'max_pages': MAX_PAGES, 'max_chars': MAX_CHARS, 'fuzzy': fuzzy}])[0]
+        if 'error' in result:
+            raise RuntimeError(result['error'])
+        return result
     except Exception as e:
+        metrics.error('extract', "Fel vid PDF-läsning")
         st.error(f"Fel vid PDF-läsning: {e}")
-        return ""
+        return {'text': "", 'skill_ids': [], 'fuzzy_ids': [], 'pages': [], 'truncated': False}
 
-# 2. Datamotor med SNI-koppling
-@st.cache_data
+# 2. Datamotor (cache_resource: delas av alla sessioner i stället för att picklas och kopieras)
+@st.cache_resource
+@metrics.timed('load')
 def load_all_data():
-    res = {'jobs': {}, 'skills': {}, 'relations': [], 'sni': {}}
+    res = {'jobs': {}, 'skills': {}, 'relations': [], 'hierarchy': {}}
+
+    # Kompilerad snapshot om den finns (python snapshot.py compile)
+    snap = open_snapshot()
+    if snap:
+        res.update(jobs=snap.jobs(), skills=snap.skills(), relations=snap.relations(),
+                   hierarchy=snap.hierarchy())
+        return res
     
     # Ladda yrken (SSYK)
     try:
@@ -28,68 +60,145 @@ def load_all_data():
                         res['jobs'][node['id']] = node['preferred_label']
                     if node.get('narrower'): walk(node['narrower'])
             walk(data)
-    except: pass
+    except Exception:
+        metrics.error('load', "Kunde inte läsa the-ssyk-hierarchy-with-occupations.json")
 
     # Ladda kompetenser (Atomer)
     try:
         with open('skills.json', 'r') as f:
             for s in json.load(f).get('data', {}).get('concepts', []):
                 if 'id' in s: res['skills'][s['id']] = s.get('preferred_label', '')
-    except: pass
+                parents = [b['id'] for b in s.get('broader', []) if 'id' in b]
+                if parents and 'id' in s: res['hierarchy'][s['id']] = parents
+    except Exception:
+        metrics.error('load', "Kunde inte läsa skills.json")
 
     # Ladda relationer (Yrke -> Kompetens)
     try:
         with open('concepts-and-common-relations.json', 'r') as f:
             res['relations'] = json.load(f).get('data', {}).get('concepts', [])
-    except: pass
-        
-    # Ladda branscher (SNI)
-    try:
-        with open('sni-level-1.json', 'r') as f:
-            for s in json.load(f).get('data', {}).get('concepts', []):
-                if 'id' in s: res['sni'][s['id']] = s.get('preferred_label', '')
-    except: pass
+    except Exception:
+        metrics.error('load', "Kunde inte läsa concepts-and-common-relations.json")
             
     return res
 
+# Övriga taxonomier (SNI, SUN, ISCO, regioner, ...) parsas först när en vy behöver dem
+@st.cache_resource
+def load_catalog():
+    return TaxonomyCatalog()
+
+# Yrke -> SNI (alla fem nivåer) som gles matris; branschvikterna blir en produkt med poängvektorn.
+# version (källfilernas stämplar) ingår i cachenyckeln, så en uppdaterad taxonomi ger ett nytt index
+@st.cache_resource
+def load_industry_index(version):
+    return IndustryIndex(load_catalog())
+
+# Yrke -> SSYK-1/SSYK-2 för den taxonomiska vyn, byggd om på samma sätt
+@st.cache_resource
+def load_occupation_segments(version):
+    return OccupationSegments(load_catalog())
+
+# 3. Kompetens-automat (byggs en gång per process, pickla inte via cache_data)
+@st.cache_resource
+def load_skill_matcher():
+    return SkillMatcher(load_all_data()['skills'])
+
+# Trigram-index för böjningar och stavfel; förbyggt i snapshoten om den finns
+@st.cache_resource
+def load_fuzzy_matcher():
+    snap = open_snapshot()
+    return snap.fuzzy_matcher() if snap else FuzzyMatcher(load_all_data()['skills'])
+
+# Kravprofilerna som uint64-bitmängder: hela katalogen poängsätts med popcount
+@st.cache_resource
+def load_bitset_profiles():
+    return BitsetProfiles(load_all_data()['relations'])
+
+# Yrke × kompetens som gles matris för gapanalysen (kolumnreduktioner över hela katalogen)
+@st.cache_resource
+def load_gap_analyzer():
+    return GapAnalyzer(load_bitset_profiles())
+
+# Förfäder per kompetens förberäknas en gång; 'Google Ads' ger delkredit för 'Marknadsföring'
+@st.cache_resource
+def load_skill_hierarchy():
+    return SkillHierarchy(load_all_data()['hierarchy'], decay=HIERARCHY_DECAY)
+
+# Detektering, poängsättning och gapplan – via tjänsten i klientläge, annars i processen.
+# PDF-analyserna cachas på ett ställe: i tjänsten (service.py --cache-dir) respektive här
+@st.cache_resource
+def load_matching_service():
+    if SERVICE_URL:
+        return MatchingClient(SERVICE_URL)
+    return MatchingService(load_all_data(), matcher=load_skill_matcher(), fuzzy=load_fuzzy_matcher(),
+                           profiles=load_bitset_profiles(), hierarchy=load_skill_hierarchy(),
+                           gap=load_gap_analyzer(), cache=load_analysis_cache(), catalog=load_catalog())
+
+# 4. Diskcache för PDF-text och detekterade kompetenser (PDF-hash + taxonomiversion)
+@st.cache_resource
+def load_analysis_cache():
+    return AnalysisCache()
+
+# 5. Prestandapanel: tid per steg, räknare och minne (i klientläge även tjänstens mätvärden)
+def show_debug_panel():
+    sources = [('', metrics.snapshot())]
+    if SERVICE_URL:
+        sources.append(('tjänst.', service.metrics()))
+    with st.sidebar.expander("🔧 Prestanda", expanded=True):
+        st.table([{
+            'steg': prefix + stage,
+            'antal': t['count'],
+            'senast (ms)': round(t['last'] * 1000, 1),
+            'p50 (ms)': round(t['p50'] * 1000, 1),
+            'p95 (ms)': round(t['p95'] * 1000, 1),
+        } for prefix, snap in sources for stage, t in sorted(snap['timers'].items())])
+        for prefix, snap in sources:
+            st.json({f"{prefix}räknare": snap['counters'], f"{prefix}minne": snap['memory']}, expanded=False)
+
 # --- UI APPLIKATION ---
 st.set_page_config(page_title="Kompetensbryggan Pro", layout="wide")
-db = load_all_data()
+service = load_matching_service()
+db = service.taxonomy()
+metrics.memory('load')
 
 st.title("🛡️ Din Strategiska Karriär-GPS")
 
 uploaded_file = st.sidebar.file_uploader("Ladda upp CV (PDF)", type="pdf")
+# Ungefärlig matchning kostar ett flertal gånger den exakta; träffarna ger bara delkredit
+fuzzy = st.sidebar.checkbox("Hitta även böjningar och stavfel (långsammare)", value=False)
 
 if uploaded_file:
-    cv_text = extract_text_from_pdf(uploaded_file).lower()
-    
-    # Detektera kompetenser
-    detected = []
-    for s_id, s_name in db['skills'].items():
-        if len(s_name) > 2 and re.search(rf"\b{re.escape(s_name.lower())}\b", cv_text):
-            detected.append({'id': s_id, 'name': s_name})
+    pdf_bytes = uploaded_file.getvalue()
+
+    # Detektera kompetenser sida för sida (en genomläsning av texten); samma CV parsas
+    # aldrig om vid reruns eftersom tjänsten slår upp PDF:en i sin diskcache först
+    with metrics.timer('ui.analyze_pdf'):
+        result = read_cv_pdf(pdf_bytes, fuzzy)
+    if result['truncated']:
+        st.warning(f"Långt dokument: analysen omfattar de första {len(result['pages'])} sidorna.")
+    cv_text, skill_ids = result['text'], result['skill_ids']
+    cv_text = cv_text.lower()
+    detected = [{'id': s_id, 'name': db['skills'].get(s_id, 'Okänd')} for s_id in skill_ids]
 
     my_ids = {s['id'] for s in detected}
+    fuzzy_ids = result['fuzzy_ids']
     
-    # Matchningslogik
-    matches = []
-    all_missing = {}
-    for rel in db['relations']:
-        job_skills = {r['id'] for r in rel.get('relations', [])}
-        if not job_skills: continue
-        hits = my_ids.intersection(job_skills)
-        if hits:
-            score = len(hits) / len(job_skills)
-            missing = job_skills - my_ids
-            matches.append({
-                'id': rel['id'],
-                'name': db['jobs'].get(rel['id'], 'Specialistroll'),
-                'score': score,
-                'hits': [db['skills'].get(h, 'Okänd') for h in hits],
-                'missing': [db['skills'].get(m, 'Okänd') for m in missing]
-            })
-            for m in missing:
-                all_missing[m] = all_missing.get(m, 0) + 1
+    # Matchningslogik: alla yrken poängsätts vektoriserat (AND / AND-NOT + popcount),
+    # träffar och saknade kompetenser packas bara upp för topplistan
+    with metrics.timer('ui.score'):
+        scored = service.score_occupations([{'skill_ids': sorted(my_ids), 'fuzzy_ids': fuzzy_ids, 'details': 5}])[0]
+    matches = [{
+        'id': m['id'],
+        'name': db['jobs'].get(m['id'], 'Specialistroll'),
+        'score': m['score'],
+    } for m in scored['matches']]
+    for m, hit in zip(matches, scored['details']):
+        m['hits'] = [db['skills'].get(h, 'Okänd') for h in hit['hits']]
+        m['inherited'] = [db['skills'].get(h, 'Okänd') for h in hit['inherited']]
+        m['missing'] = [db['skills'].get(s, 'Okänd') for s in hit['missing']]
+    # Girig plan: varje steg väljer kompetensen som låser upp flest yrken givet de tidigare stegen
+    with metrics.timer('ui.gap'):
+        next_skills = service.gap_plan([{'skill_ids': sorted(my_ids), 'fuzzy_ids': fuzzy_ids, 'steps': 5}])[0]
 
     # --- LAYOUT ---
     col1, col2, col3 = st.columns([1, 1, 1])
@@ -99,14 +208,25 @@ if uploaded_file:
         st.success(f"Identifierade {len(detected)} atomer.")
         st.write(", ".join([s['name'] for s in detected[:20]]) + "...")
         
-        st.subheader("🌐 Bransch-viktning")
+        st.subheader("🌐 Uppskattad bransch-viktning")
         st.write("Var väger din profil tyngst just nu?")
-        # Här simulerar vi viktning baserat på SNI-data i relation till dina träffar
-        for sni_id, sni_name in list(db['sni'].items())[:4]:
-            # Enkel logik: Ju fler yrken du matchar i en bransch, desto högre stapel
-            weight = 40 + (len(matches) % 50) 
-            st.write(f"**{sni_name}**")
-            st.progress(min(weight, 100))
+        # Alla matchade yrkens poäng summeras per SNI-avdelning (en gles produkt över katalogen)
+        industries = load_industry_index(load_catalog().version(*INDUSTRY_SOURCES))
+        with metrics.timer('ui.industries'):
+            occupation_scores = industries.vector(scored['matches'])
+            top_industries = industries.top(occupation_scores, level=1, k=4)
+        for industry in top_industries:
+            st.write(f"**{industry['label']}** (≈ {industry['share']:.0%})")
+            st.progress(min(int(industry['share'] * 100), 100))
+        if not top_industries:
+            st.caption("Inga av dina matchningar har en branschkoppling.")
+        else:
+            # Taxonomin saknar koppling yrke -> bransch; vikterna är härledda och ska läsas som en uppskattning
+            st.caption(f"Uppskattning: kopplingen yrke → bransch härleds ur textlikhet mellan SSYK-grupper "
+                       f"och SNI-branscher (likhet ≥ {industries.min_similarity:.2f}, tydligt före andra "
+                       f"avdelningar) och finns inte i "
+                       f"taxonomin. {industries.coverage(occupation_scores):.0%} av matchningspoängen "
+                       f"ligger på yrken med en koppling.")
 
     with col2:
         st.header("🎯 Topp-matchningar")
@@ -114,17 +234,35 @@ if uploaded_file:
         for m in matches[:5]:
             with st.expander(f"{m['name']} ({int(m['score']*100)}%)"):
                 st.write("**Matchar på:** " + ", ".join(m['hits']))
+                if m['inherited']:
+                    st.write("**Delvis (närliggande kompetenser eller ungefärliga träffar):** "
+                             + ", ".join(m['inherited']))
                 st.write("**Saknas:** " + ", ".join(m['missing'][:5]))
 
     with col3:
         st.header("💡 Din Utvecklingsplan")
-        st.write("Atomer som låser upp flest yrkesroller för dig:")
-        # Sortera de mest efterfrågade "saknade" kompetenserna
-        sorted_missing = sorted(all_missing.items(), key=lambda x: x[1], reverse=True)
-        for m_id, count in sorted_missing[:8]:
-            skill_name = db['skills'].get(m_id, "Specialistkunskap")
-            st.info(f"**{skill_name}**\n\nFinns i {count} matchande yrken")
+        st.write("Atomer som låser upp flest yrkesroller för dig, i ordning:")
+        for i, step in enumerate(next_skills, 1):
+            skill_name = db['skills'].get(step['id'], "Specialistkunskap")
+            st.info(f"**{i}. {skill_name}**\n\n"
+                    f"Låser upp {step['unlocks']} yrken · finns i {step['occupations']} matchande yrken\n\n"
+                    f"Efter steget: {step['unlocked_total']} yrken över {int(UNLOCK_THRESHOLD * 100)}%")
+
+    # --- TAXONOMISK VY ---
+    tree_tab, industry_tab = st.tabs(["🌳 Yrkes-ekosystem (SSYK)", "🏢 Branschpotential (SNI)"])
+    with tree_tab:
+        with metrics.timer('ui.taxonomy_tree'):
+            draw_taxonomy_tree(matches, load_occupation_segments(load_catalog().version(*SEGMENT_SOURCES)))
+    with industry_tab:
+        with metrics.timer('ui.industry_heatmap'):
+            draw_industry_heatmap(scored['matches'], industries)
+
+    metrics.memory('analysis')
+    metrics.export()
 
 else:
     st.info("Ladda upp ditt CV för att se den utökade analysen.")
+
+if DEBUG or st.sidebar.checkbox("Visa prestanda"):
+    show_debug_panel()
     
\ No newline at end of file
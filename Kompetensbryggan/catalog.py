@@ -0,0 +1,164 @@
+"""
+Lat katalog över alla JobTech-taxonomier.
+
+Katalogen känner till varje JSON-fil i Kompetensbryggan/ och data/raw/taxonomy/
+(SNI, SUN, ISCO, regioner, språk, ...) men parsar en fil först när den efterfrågas.
+Resultatet cachas per fil och vy och läses om när filens mtime eller storlek ändras,
+så en sida betalar bara för de taxonomier den faktiskt visar.
+
+Usage:
+    python catalog.py                 # listar kända filer
+    python catalog.py sni-level-2     # visar etiketterna i en fil
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from collections import Counter
+
+from jsonstream import iter_concepts
+
+CURRENT_FOLDER = os.path.dirname(os.path.abspath(__file__))
+RAW_TAXONOMY_FOLDER = os.path.join(os.path.dirname(CURRENT_FOLDER), 'data', 'raw', 'taxonomy')
+SEARCH_FOLDERS = (CURRENT_FOLDER, RAW_TAXONOMY_FOLDER)  # första mappen vinner vid samma filnamn
+
+
+def concept_key(concept):
+    """Konceptets ID, eller dess kod för filer utan ID (t.ex. SNI: 'sni_level_code_2007')."""
+    if 'id' in concept:
+        return str(concept['id'])
+    for field, value in concept.items():
+        if '_code_' in field and value:
+            return str(value)
+    return None
+
+
+def concept_label(concept):
+    return concept.get('preferred_label') or concept.get('label_sv') or ''
+
+
+def _parse(path):
+    concepts = list(iter_concepts(path))
+    if concepts:
+        return concepts
+    # Filer med annat kuvert (t.ex. concept-types.json: data -> concept_types)
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    data = data.get('data', data) if isinstance(data, dict) else data
+    if isinstance(data, dict):
+        return next((v for v in data.values() if isinstance(v, list)), [])
+    return data if isinstance(data, list) else []
+
+
+class TaxonomyCatalog:
+    """
+    Filnamn (utan .json) -> parsade koncept, laddade vid första åtkomst.
+    Trådsäker, så en instans kan delas av alla Streamlit-sessioner (st.cache_resource).
+    """
+
+    def __init__(self, folders=SEARCH_FOLDERS):
+        self.folders = [f for f in folders if os.path.isdir(f)]
+        self.files = {}
+        self._entries = {}  # (namn, vy) -> ((mtime_ns, storlek), värde)
+        self._lock = threading.RLock()
+        self.parses = Counter()  # namn -> antal parsningar
+        self.refresh()
+
+    def refresh(self):
+        """Läser om katalogernas fillistor (nya filer upptäcks, cachade vyer behålls)."""
+        files = {}
+        for folder in self.folders:
+            with os.scandir(folder) as it:
+                for entry in it:
+                    if entry.name.endswith('.json') and entry.is_file():
+                        files.setdefault(entry.name[:-len('.json')], entry.path)
+        self.files = dict(sorted(files.items()))
+
+    def __contains__(self, name):
+        return name.removesuffix('.json') in self.files
+
+    def __iter__(self):
+        return iter(self.files)
+
+    def __len__(self):
+        return len(self.files)
+
+    def path(self, name):
+        name = name.removesuffix('.json')
+        if name not in self.files:
+            raise KeyError(f"Okänd taxonomi: {name}")
+        return self.files[name]
+
+    def _stamp(self, name):
+        st = os.stat(self.path(name))
+        return st.st_mtime_ns, st.st_size
+
+    def version(self, *names):
+        """(mtime_ns, storlek) per fil; ändras när någon av filerna skrivs om (nyckel för härledda cachar)."""
+        return tuple(self._stamp(name.removesuffix('.json')) for name in names)
+
+    def _cached(self, name, view, build):
+        path = self.path(name)
+        stamp = self._stamp(name)
+        with self._lock:
+            entry = self._entries.get((name, view))
+            if entry is not None and entry[0] == stamp:
+                return entry[1]
+            value = build(path)
+            if view == 'concepts':
+                self.parses[name] += 1
+            self._entries[(name, view)] = (stamp, value)
+            return value
+
+    def concepts(self, name):
+        """Filens koncept (data -> concepts) som lista av dictar."""
+        return self._cached(name.removesuffix('.json'), 'concepts', _parse)
+
+    def labels(self, name):
+        """{ID eller kod: etikett} för filens toppnivåkoncept."""
+        def build(_):
+            return {k: concept_label(c) for c in self.concepts(name) if (k := concept_key(c)) is not None}
+        return self._cached(name.removesuffix('.json'), 'labels', build)
+
+    def flatten(self, name):
+        """Hierarkifiler (narrower) som platt lista: [{'id', 'label', 'type', 'parent', 'depth'}]."""
+        def build(_):
+            nodes = []
+            stack = [(c, None, 0) for c in reversed(self.concepts(name))]
+            while stack:
+                concept, parent, depth = stack.pop()
+                key = concept_key(concept)
+                nodes.append({'id': key, 'label': concept_label(concept), 'type': concept.get('type'),
+                              'parent': parent, 'depth': depth})
+                stack.extend((c, key, depth + 1) for c in reversed(concept.get('narrower', [])))
+            return nodes
+        return self._cached(name.removesuffix('.json'), 'flatten', build)
+
+    def loaded(self):
+        """Namnen på de filer som hittills parsats."""
+        with self._lock:
+            return sorted({name for name, view in self._entries if view == 'concepts'})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lat katalog över JobTech-taxonomierna")
+    parser.add_argument('name', nargs='?', help="Filnamn utan .json, t.ex. sni-level-2")
+    parser.add_argument('--limit', type=int, default=20, help="Antal etiketter att visa (default: 20)")
+    args = parser.parse_args()
+
+    catalog = TaxonomyCatalog()
+    if not args.name:
+        for name, path in catalog.files.items():
+            print(f"{os.path.getsize(path) / 1024:>8.0f} KB  {name}")
+        print(f"\n{len(catalog)} taxonomier i {', '.join(catalog.folders)}")
+        return
+    t0 = time.perf_counter()
+    labels = catalog.labels(args.name)
+    print(f"{args.name}: {len(labels)} koncept ({(time.perf_counter() - t0) * 1000:.0f} ms)")
+    for key, label in list(labels.items())[:args.limit]:
+        print(f"  {key:<16} {label}")
+
+
+if __name__ == '__main__':
+    main()
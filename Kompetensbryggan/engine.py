@@ -1,21 +1,99 @@
-import re, json, os
-        
-def find_any_skills(data, found=set()):
-    if is_instance(data, dict):
-        for k, v in data.items():
-            if k == 'skills' or k == 'kompetenser':
-                if is_instance(v, dict): found.update(v.items())
-            find_any_skills(v, found)
-    elif is_instance(data, list):
-        for i in data: find_any_skills(i, found)
+from collections import Counter
+from collections.abc import Mapping
+
+from matcher import SkillMatcher
+
+SKILL_KEYS = ('skills', 'kompetenser')
+
+
+def find_any_skills(data):
+    """Samlar alla {id: etikett}-par under nycklarna 'skills'/'kompetenser', oavsett djup."""
+    found = {}
+    stack = [data]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            for k, v in node.items():
+                if k in SKILL_KEYS and isinstance(v, dict):
+                    for s_id, label in v.items():
+                        found.setdefault(str(s_id), str(label))
+                stack.append(v)
+        elif isinstance(node, list):
+            stack.extend(node)
     return found
 
+
+class SkillRegistry:
+    """
+    Kompetensregister som byggs en gång vid laddning: id -> etikett, etikett -> IDn
+    och räknare. Textsökningen går via Aho-Corasick-automaten (matcher.py), så en
+    sökning är linjär i texten i stället för en genomgång av hela databasen per anrop.
+    Automaten byggs vid första behov och är den enda i processen: service.py och
+    batch.py använder registry.matcher i stället för att bygga en egen.
+    """
+
+    def __init__(self, skills, matcher=None):
+        # skills: {id: preferred_label}, samma form som db['skills']
+        self.labels = {str(k): str(v) for k, v in skills.items()}
+        self.ids = {}  # gemen etikett -> [ids]
+        for s_id, label in self.labels.items():
+            self.ids.setdefault(label.lower(), []).append(s_id)
+        self._matcher = matcher  # färdig SkillMatcher över samma kompetenser, valfri
+        self.db_chars = None  # den laddade databasens storlek i tecken; räknas en gång i get_system_analysis
+        self.stats = Counter(skills=len(self.labels), labels=len(self.ids),
+                             shared_labels=sum(len(ids) > 1 for ids in self.ids.values()))
+
+    @classmethod
+    def from_db(cls, db):
+        """Använder db['skills'] om den finns, annars letas kompetenser upp i hela strukturen (en gång)."""
+        skills = db.get('skills') if isinstance(db, dict) else None
+        return cls(skills if isinstance(skills, Mapping) else find_any_skills(db))
+
+    def __len__(self):
+        return len(self.labels)
+
+    @property
+    def matcher(self):
+        if self._matcher is None:
+            self._matcher = SkillMatcher(self.labels)
+        return self._matcher
+
+    def label(self, s_id, default='Okänd'):
+        return self.labels.get(s_id, default)
+
+    def lookup(self, label):
+        """IDn med exakt denna etikett (skiftlägesokänsligt)."""
+        self.stats['lookups'] += 1
+        return self.ids.get(label.lower(), [])
+
+    def find(self, text):
+        """Kompetenser i texten som [{'id', 'name'}], i registrets ordning."""
+        found = self.matcher.find(text)
+        self.stats['searches'] += 1
+        self.stats['chars'] += len(text)
+        self.stats['hits'] += len(found)
+        return found
+
+
+def get_registry(db):
+    """Registret för en laddad db; byggs vid första anropet och sparas som db['registry']."""
+    registry = db.get('registry')
+    if registry is None:
+        registry = db['registry'] = SkillRegistry.from_db(db)
+    return registry
+
+
 def find_skills(text, db):
-    s_map = { str(k): str(v) for k, v in find_any_skills(db) }
-    t_low = text.lower()
-    f_ids = [sid for sid, lbl in s_map.items() if str(lbl).lower() in t_low]
-    res = [] # Yorkes-matchning kĶrs dynamiskt nedan
-    return res, [{'id': i, 'name': s_map.get(i, 'Okänd')} for i in f_ids]
+    res = [] # Yrkes-matchning körs dynamiskt nedan
+    return res, get_registry(db).find(text)
+
 
 def get_system_analysis(db):
-    return {'total': len(str(db))}
\ No newline at end of file
+    """
+    'total' är som tidigare den laddade databasens storlek i tecken; registrets räknare läggs till.
+    Storleken räknas vid första anropet och sparas i registret, så efterföljande anrop är O(1).
+    """
+    registry = get_registry(db)
+    if registry.db_chars is None:
+        registry.db_chars = len(str(db))
+    return {'total': registry.db_chars, **registry.stats}
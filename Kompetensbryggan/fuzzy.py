@@ -0,0 +1,219 @@
+import functools
+import math
+import re
+from array import array
+
+FUZZY_THRESHOLD = 0.8   # minsta Dice-likhet mellan trigram-mängderna
+MIN_FUZZY_LENGTH = 6    # kortare (stammade) etiketter matchas bara exakt
+MAX_FUZZY_WORDS = 3     # längre etiketter matchas bara exakt
+FUZZY_CREDIT = 0.5      # poängvikt för en ungefärlig träff (exakt träff = 1.0); se SkillHierarchy.expand
+
+_WORD = re.compile(r'\w+')
+
+# Lätt svensk suffixstympning: böjningar och vanliga avledningar av samma stam
+# ('projektledning', 'projektledare', 'projektledarna' -> 'projektled'). Längst först.
+_SUFFIXES = sorted((
+    'ningarnas', 'ningarna', 'ningar', 'ningens', 'ningen', 'ning',
+    'arnas', 'ernas', 'ornas', 'arna', 'erna', 'orna', 'arens', 'aren',
+    'heten', 'heter', 'het', 'andet', 'ande', 'ende', 'erare', 'ares', 'are',
+    'elsen', 'else', 'ering', 'erade', 'erat', 'era',
+    'en', 'et', 'ar', 'er', 'or', 'as', 'es', 'na', 'a', 'e', 's',
+), key=len, reverse=True)
+_MIN_STEM = 4
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def stem(word):
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= _MIN_STEM:
+            return word[:-len(suffix)]
+    return word
+
+
+def normalize(text):
+    """Gemener, bara ordtecken, varje ord stammat: 'Projektledning, IT' -> ['projektled', 'it']."""
+    return [stem(w) for w in _WORD.findall(text.lower())]
+
+
+def trigrams(key, n_words=1):
+    # Trigrammen nycklas med antal ord, så indexet delas upp per ordantal utan extra tabeller
+    padded = f"{n_words} {key} "
+    return {padded[0] + padded[i:i + 3] for i in range(1, len(padded) - 2)}
+
+
+class FuzzyMatcher:
+    """
+    Trigram-index över alla kompetens-etiketter för böjningar och stavfel som
+    den exakta automaten (SkillMatcher) missar.
+
+    Etiketterna normaliseras (gemener, stammade ord) och varje etikett indexeras på
+    sina tecken-trigram i ett inverterat index (CSR). Vid sökning jämförs varje
+    ordsekvens i texten (1..max_words ord) mot etiketter med samma antal ord:
+      - trigrammen nycklas med antal ord, så bara etiketter med lika många ord är kandidater
+      - längdfilter: Dice >= t kräver t/(2-t)·|A| <= |B| <= (2-t)/t·|A|
+      - prefixfilter: bara de |A| - minsta_överlapp + 1 ovanligaste trigrammen
+        slås upp, så vanliga trigram ('ing', 'ion') genererar aldrig kandidater
+      - kandidaterna verifieras med exakt Dice-likhet
+    Flerordssekvenser prövas bara om varje ord finns bland, eller liknar, orden i
+    flerordsetiketterna (ordförrådet ligger i indexet med ordantal 0). Det gallrar bort
+    nästan all löptext, så kostnaden följer antalet unika ord i CV:t.
+    Indexet byggs en gång och sparas i taxonomi-snapshoten (snapshot.py).
+    """
+
+    def __init__(self, skills=None, threshold=FUZZY_THRESHOLD, min_length=MIN_FUZZY_LENGTH,
+                 max_words=MAX_FUZZY_WORDS):
+        # skills: {id: preferred_label}, samma form som db['skills']
+        self.threshold = threshold
+        self.min_length = min_length
+        self.max_words = max_words
+        self.keys = []                           # etikett-index -> normaliserad nyckel
+        self.skill_ids = []                      # etikett-index -> [ids]
+        self.sizes = array('H')                  # antal trigram per etikett
+        self.words = array('B')                  # antal ord per etikett (0 = ordförråd)
+        self.vocabulary = set()                  # ord som ingår i flerordsetiketter
+        self.grams = {}                          # trigram -> index i postings
+        self._label_grams = {}                   # etikett-index -> trigram-mängd (fylls vid behov)
+        self.offsets = array('I', [0])           # CSR: etiketter med trigram g i
+        self.postings = array('I')               # postings[offsets[g]:offsets[g + 1]]
+        if skills is not None:
+            self._build(skills)
+
+    def _build(self, skills):
+        by_key = {}
+        for s_id, s_name in skills.items():
+            words = normalize(s_name or '')
+            key = ' '.join(words)
+            if not words or len(words) > self.max_words or len(key) < self.min_length:
+                continue
+            if key not in by_key:
+                by_key[key] = len(self.keys)
+                self.keys.append(key)
+                self.skill_ids.append([])
+                self.words.append(len(words))
+            self.skill_ids[by_key[key]].append(s_id)
+
+        # Ordförrådet indexeras som egna "etiketter" utan kompetens-IDn
+        self.vocabulary = {w for key, n in zip(self.keys, self.words) if n > 1 for w in key.split()}
+        for word in sorted(self.vocabulary):
+            self.keys.append(word)
+            self.skill_ids.append([])
+            self.words.append(0)
+
+        by_gram = {}
+        for label, key in enumerate(self.keys):
+            grams = trigrams(key, self.words[label])
+            self.sizes.append(len(grams))
+            for g in grams:
+                by_gram.setdefault(g, []).append(label)
+        for g, labels in by_gram.items():
+            self.grams[g] = len(self.grams)
+            self.postings.extend(labels)
+            self.offsets.append(len(self.postings))
+
+    # ── SNAPSHOT ──────────────────────────────────────────────────────────────
+
+    def sections(self, intern):
+        """Indexet som snapshot-sektioner; intern(str) -> strängindex i snapshotens tabell."""
+        id_ptr, ids = array('I', [0]), array('I')
+        for group in self.skill_ids:
+            ids.extend(intern(s) for s in group)
+            id_ptr.append(len(ids))
+        return {
+            'fz_key': array('I', (intern(k) for k in self.keys)),
+            'fz_id_ptr': id_ptr,
+            'fz_id': ids,
+            'fz_size': self.sizes,
+            'fz_words': self.words,
+            'fz_gram': array('I', (intern(g) for g in self.grams)),
+            'fz_ptr': self.offsets,
+            'fz_idx': self.postings,
+            'fz_meta': array('I', (int(self.threshold * 1000), self.min_length, self.max_words)),
+        }
+
+    @classmethod
+    def from_snapshot(cls, snap):
+        """Läser det förbyggda indexet; postningslistorna läses direkt ur mappningen."""
+        section, string = snap.section, snap.string
+        threshold, min_length, max_words = section('fz_meta')
+        self = cls(threshold=threshold / 1000, min_length=min_length, max_words=max_words)
+        self.keys = [string(k) for k in section('fz_key')]
+        id_ptr, ids = section('fz_id_ptr'), section('fz_id')
+        self.skill_ids = [[string(s) for s in ids[id_ptr[i]:id_ptr[i + 1]]] for i in range(len(self.keys))]
+        self.sizes, self.words = section('fz_size'), section('fz_words')
+        self.vocabulary = {key for key, n in zip(self.keys, self.words) if n == 0}
+        self.grams = {string(g): i for i, g in enumerate(section('fz_gram'))}
+        self.offsets, self.postings = section('fz_ptr'), section('fz_idx')
+        return self
+
+    # ── SÖKNING ───────────────────────────────────────────────────────────────
+
+    def __len__(self):
+        return len(self.keys)
+
+    def best(self, key, n_words):
+        """(likhet, etikett-index) för den mest lika etiketten med n_words ord, eller None."""
+        t = self.threshold
+        grams = trigrams(key, n_words)
+        size = len(grams)
+        lo, hi = t / (2 - t) * size, (2 - t) / t * size
+        # Minsta överlapp för Dice >= t, givet den minsta tillåtna etikettlängden
+        need = max(1, math.ceil(t * (size + lo) / 2 - 1e-9))
+        offsets, postings, gram_index = self.offsets, self.postings, self.grams
+        known = [idx for idx in map(gram_index.get, grams) if idx is not None]
+        if len(known) < need:
+            return None  # för många trigram som ingen etikett har
+
+        # Prefixfilter: en etikett med minst need gemensamma trigram måste ha något av
+        # de len(known) - need + 1 ovanligaste, så bara deras postningslistor läses
+        probe = sorted(known, key=lambda idx: offsets[idx + 1] - offsets[idx])[:len(known) - need + 1]
+        hits = {}
+        for idx in probe:
+            for label in postings[offsets[idx]:offsets[idx + 1]]:
+                hits[label] = hits.get(label, 0) + 1
+
+        best = None
+        rest = len(known) - len(probe)
+        sizes, keys, label_grams = self.sizes, self.keys, self._label_grams
+        for label, h in hits.items():
+            other = sizes[label]
+            # Längdfilter och övre gräns: h träffar bland de uppslagna + högst alla övriga
+            if not lo <= other <= hi or 2 * (h + rest) < t * (size + other):
+                continue
+            other_grams = label_grams.get(label)
+            if other_grams is None:
+                other_grams = label_grams[label] = trigrams(keys[label], n_words)
+            sim = 2 * len(grams & other_grams) / (size + other)
+            if sim >= t and (best is None or sim > best[0]):
+                best = (sim, label)
+        return best
+
+    def find_ids(self, text, exclude=()):
+        """
+        Kompetens-IDn vars etikett liknar en ordsekvens i texten. IDn i exclude
+        (t.ex. exakta träffar från SkillMatcher) hoppas över.
+        """
+        tokens = normalize(text)
+        found = set()
+        near = {}  # ord -> finns i eller liknar ordförrådet för flerordsetiketter
+        for token in set(tokens):
+            fuzzy = len(token) >= self.min_length
+            if fuzzy:
+                hit = self.best(token, 1)
+                if hit is not None:
+                    found.update(self.skill_ids[hit[1]])
+            near[token] = token in self.vocabulary or (fuzzy and self.best(token, 0) is not None)
+
+        for n in range(2, self.max_words + 1):
+            seen = set()
+            for i in range(len(tokens) - n + 1):
+                span = tokens[i:i + n]
+                if not all(near[t] for t in span):
+                    continue
+                key = ' '.join(span)
+                if len(key) < self.min_length or key in seen:
+                    continue
+                seen.add(key)
+                hit = self.best(key, n)
+                if hit is not None:
+                    found.update(self.skill_ids[hit[1]])
+        return found - set(exclude)
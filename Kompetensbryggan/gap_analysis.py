@@ -0,0 +1,137 @@
+import heapq
+
+import numpy as np
+import scipy.sparse as sp
+
+UNLOCK_THRESHOLD = 0.5  # ett yrke räknas som upplåst när minst halva kravprofilen täcks
+_EPS = 1e-9
+
+
+class GapAnalyzer:
+    """
+    Gapanalys över yrke × kompetens-matrisen: vad är varje saknad kompetens värd för ett CV?
+
+    För varje kompetens räknas, med en gles kolumnreduktion över hela katalogen:
+      - occupations: antal matchande yrken (poäng > 0) som kräver kompetensen
+      - unlocks:     antal yrken som når threshold om kompetensen läggs till
+      - gain:        summan av poängökningen över alla yrken
+    plan() väljer de n bästa kompetenserna girigt och uppdaterar då bara de yrken
+    som kräver den valda kompetensen i stället för att räkna om allt.
+    """
+
+    def __init__(self, profiles, threshold=UNLOCK_THRESHOLD):
+        # profiles: BitsetProfiles – samma kolumner och radordning
+        self.profiles = profiles
+        self.threshold = threshold
+        rows, cols = profiles.decode(profiles.bits)
+        shape = (len(profiles), len(profiles.skill_ids))
+        self.matrix = sp.csr_matrix((np.ones(len(cols)), (rows, cols)), shape=shape)
+        self.columns = self.matrix.tocsc()
+        counts = np.maximum(profiles.requirement_counts, 1).astype(np.float64)
+        self.targets = threshold * counts
+        # Poängökning per kompetens om den lärs in helt: sum(1 / antal krav) över yrkena som kräver den
+        self.weights = (1.0 / counts) @ self.matrix
+
+    def _coverage(self, my_ids, credits):
+        cov = np.zeros(self.matrix.shape[1])
+        if credits is None:
+            credits = dict.fromkeys(my_ids, 1.0)
+        for s_id, credit in credits.items():
+            col = self.profiles.skill_index.get(s_id)
+            if col is not None and credit > cov[col]:
+                cov[col] = min(credit, 1.0)
+        return cov
+
+    @staticmethod
+    def _near(points, delta, targets):
+        # Yrken under tröskeln som når den med ytterligare delta poäng
+        return (points < targets - _EPS) & (points + delta >= targets - _EPS)
+
+    def _state(self, my_ids, credits):
+        cov = self._coverage(my_ids, credits)
+        points = self.matrix @ cov
+        matched = points > 0
+        levels = {float(d) for d in np.unique(1.0 - cov) if d > 0}
+        return {
+            'cov': cov,
+            'points': points,
+            'occupations': matched.astype(np.float64) @ self.matrix,
+            'unlocks': {d: self._near(points, d, self.targets).astype(np.float64) @ self.matrix for d in levels},
+            'unlocked': int((points >= self.targets - _EPS).sum()),
+            'matched': int(matched.sum()),
+        }
+
+    def _values(self, state):
+        """(unlocks, gain, occupations) per kolumn; täckta kolumner får -1."""
+        cov = state['cov']
+        delta = 1.0 - cov
+        unlocks = np.full(len(cov), -1.0)
+        for d, vec in state['unlocks'].items():
+            cols = np.isclose(delta, d)
+            unlocks[cols] = vec[cols]
+        open_cols = delta > 0
+        unlocks[~open_cols] = -1.0
+        gain = np.where(open_cols, delta * self.weights, -1.0)
+        return unlocks, gain, state['occupations']
+
+    def _top(self, state, k):
+        unlocks, gain, occupations = self._values(state)
+        candidates = np.flatnonzero(gain > 0)
+        best = heapq.nlargest(k, candidates.tolist(),
+                              key=lambda c: (unlocks[c], gain[c], occupations[c], -c))
+        return [{
+            'id': self.profiles.skill_ids[c],
+            'unlocks': int(unlocks[c]),
+            'gain': float(gain[c]),
+            'occupations': int(occupations[c]),
+        } for c in best]
+
+    def unlock_values(self, my_ids, credits=None, k=8):
+        """
+        De k saknade kompetenser som låser upp flest yrken (därefter störst poängökning):
+        [{'id', 'unlocks', 'gain', 'occupations'}].
+        """
+        return self._top(self._state(my_ids, credits), k)
+
+    def _learn(self, state, col):
+        cov, points = state['cov'], state['points']
+        delta = 1.0 - cov[col]
+        a, b = self.columns.indptr[col], self.columns.indptr[col + 1]
+        rows = self.columns.indices[a:b]
+        old = points[rows].copy()
+        new = old + delta
+        points[rows] = new
+        cov[col] = 1.0
+
+        # Endast raderna som kräver kompetensen ändras – uppdatera aggregaten med deras rader
+        sub = self.matrix[rows]
+        became_matched = ((old <= 0) & (new > 0)).astype(np.float64)
+        if became_matched.any():
+            state['occupations'] += became_matched @ sub
+        targets = self.targets[rows]
+        for d, vec in state['unlocks'].items():
+            change = (self._near(new, d, targets).astype(np.float64)
+                      - self._near(old, d, targets).astype(np.float64))
+            if change.any():
+                vec += change @ sub
+        state['unlocked'] += int(((new >= targets - _EPS) & (old < targets - _EPS)).sum())
+        state['matched'] += int(became_matched.sum())
+
+    def plan(self, my_ids, credits=None, steps=5):
+        """
+        Girig plan för de bästa nästa kompetenserna. Varje steg väljer kompetensen med högst
+        värde givet de tidigare valen: [{'id', 'unlocks', 'gain', 'occupations',
+        'unlocked_total', 'matched_total'}], där *_total är läget efter steget.
+        """
+        state = self._state(my_ids, credits)
+        plan = []
+        for _ in range(steps):
+            best = self._top(state, 1)
+            if not best:
+                break
+            step = best[0]
+            self._learn(state, self.profiles.skill_index[step['id']])
+            step['unlocked_total'] = state['unlocked']
+            step['matched_total'] = state['matched']
+            plan.append(step)
+        return plan
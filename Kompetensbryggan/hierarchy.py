@@ -0,0 +1,88 @@
+from array import array
+from collections import deque
+
+HIERARCHY_DECAY = 0.5  # kredit per steg uppåt: förälder 0.5, farförälder 0.25, ...
+
+
+class SkillHierarchy:
+    """
+    Förberäknat transitivt hölje över db['hierarchy'] (barn-ID -> [föräldra-IDn]).
+    Varje kompetens förfäder och avstånd lagras platt (CSR) vid laddning, så att
+    expand() bara slår upp färdiga listor i stället för att vandra i grafen per förfrågan.
+    Ett CV som nämner 'Google Ads' ger då delkredit för 'Marknadsföring'.
+    """
+
+    def __init__(self, hierarchy, decay=HIERARCHY_DECAY, max_depth=None):
+        self.decay = decay
+        self.ids = []
+        self.node = {}
+        parents = []
+        for child, broader in hierarchy.items():
+            c = self._intern(child, parents)
+            for p in broader:
+                parents[c].append(self._intern(p, parents))
+
+        # CSR: förfäder till nod i ligger i ancestors[offsets[i]:offsets[i + 1]], med djup i depths
+        self.offsets = array('I', [0])
+        self.ancestors = array('I')
+        self.depths = array('B')
+        for start in range(len(self.ids)):
+            seen = {start}
+            queue = deque((p, 1) for p in parents[start])
+            while queue:
+                node, depth = queue.popleft()
+                if node in seen:
+                    continue
+                seen.add(node)
+                # Bredden-först ger kortaste avståndet, dvs. högsta krediten, först
+                self.ancestors.append(node)
+                self.depths.append(min(depth, 255))
+                if max_depth is None or depth < max_depth:
+                    queue.extend((p, depth + 1) for p in parents[node])
+            self.offsets.append(len(self.ancestors))
+
+    def _intern(self, s_id, parents):
+        idx = self.node.get(s_id)
+        if idx is None:
+            idx = len(self.ids)
+            self.node[s_id] = idx
+            self.ids.append(s_id)
+            parents.append([])
+        return idx
+
+    def __len__(self):
+        return len(self.ancestors)
+
+    def ancestors_of(self, s_id):
+        """[(förfäder-ID, djup)] närmast först."""
+        idx = self.node.get(s_id)
+        if idx is None:
+            return []
+        a, b = self.offsets[idx], self.offsets[idx + 1]
+        return [(self.ids[n], d) for n, d in zip(self.ancestors[a:b], self.depths[a:b])]
+
+    def expand(self, my_ids, decay=None, partial=None):
+        """
+        Returnerar {kompetens-ID: kredit}: 1.0 för egna kompetenser och decay**djup för
+        förfäder (bästa vägen vinner). decay=0 stänger av hierarkisk matchning.
+        partial: {kompetens-ID: kredit} för svagare träffar (t.ex. ungefärliga, fuzzy.FUZZY_CREDIT);
+        deras förfäder får kredit × decay**djup.
+        """
+        decay = self.decay if decay is None else decay
+        credits = dict.fromkeys(my_ids, 1.0)
+        for s_id, credit in (partial or {}).items():
+            if credit > credits.get(s_id, 0.0):
+                credits[s_id] = credit
+        if not decay:
+            return credits
+        ids, ancestors, depths, offsets, node = self.ids, self.ancestors, self.depths, self.offsets, self.node
+        for s_id, base in list(credits.items()):  # egna och svagare träffar, före förfäderna
+            idx = node.get(s_id)
+            if idx is None:
+                continue
+            for i in range(offsets[idx], offsets[idx + 1]):
+                a_id = ids[ancestors[i]]
+                credit = base * decay ** depths[i]
+                if credit > credits.get(a_id, 0.0):
+                    credits[a_id] = credit
+        return credits
@@ -0,0 +1,228 @@
+"""
+Branschviktning: yrke -> SNI på alla fem nivåer som en gles matris.
+
+Taxonomin saknar en direkt koppling mellan yrken (SSYK) och branscher (SNI). Kopplingen
+härleds därför en gång ur texten: varje SSYK-4-grupp (etikett, definition och yrkesbenämningar)
+jämförs med varje SNI-5-bransch (etikett och överordnad grupp) som TF-IDF-vektorer över
+tecken-4-gram av stammade ord (fuzzy.normalize), så sammansättningar som 'advokat' /
+'advokatbyråverksamhet' möts. Varje grupp fördelas på sina bästa SNI-5-branscher i proportion
+till likheten, och vikten förs vidare till förfäderna på nivå 4..1.
+
+Kopplingen är en uppskattning, inte en officiell nyckel: under ~0.2 i likhet är den
+mestadels fel (t.ex. 'Pizzabagare' -> 'Takarbeten'), så svagare länkar släpps. En grupp
+kopplas dessutom bara om bästa träffen slår bästa träff i någon annan SNI-avdelning med
+en marginal (MIN_MARGIN) – annars är valet av bransch en slantsingling ('Gruv- och
+stenbrottsarbetare' ligger lika nära partihandel som gruvdrift) – och alla länkar hålls
+inom den avdelningen. Grupper som inte klarar gränserna får ingen branschvikt alls. UI:t
+ska visa resultatet som uppskattat tillsammans med gränserna och täckningen (coverage).
+
+Resultatet är matrisen yrke × SNI-nod (alla nivåer); branschvikterna för ett CV är då en
+enda gles produkt med poängvektorn, billig nog att räkna om vid varje rerun.
+
+Usage:
+    python industry.py                 # visar kopplingen för några SSYK-grupper
+"""
+import argparse
+import time
+
+import numpy as np
+import scipy.sparse as sp
+
+from catalog import TaxonomyCatalog
+from fuzzy import normalize
+
+SNI_LEVELS = 5
+TOP_INDUSTRIES = 3      # SNI-5-branscher per SSYK-4-grupp
+SOURCES = ('sni-hierarchy', 'ssyk-level-4-groups', 'the-ssyk-hierarchy-with-occupations')
+MIN_SIMILARITY = 0.20   # svagare textlikhet ger ingen koppling
+MIN_MARGIN = 0.03       # försprång före bästa bransch i en annan SNI-avdelning (218 av 400 grupper kopplas)
+
+
+def _grams(text):
+    # Tecken-4-gram per stammat ord, med ordgränser: 'advokater' -> ' adv', 'advo', ..., 'kat '
+    grams = []
+    for word in normalize(text):
+        padded = f" {word} "
+        grams.extend(padded[i:i + 4] for i in range(len(padded) - 3))
+    return grams
+
+
+def _tfidf(docs, vocabulary):
+    rows, cols = [], []
+    for row, text in enumerate(docs):
+        for g in _grams(text):
+            rows.append(row)
+            cols.append(vocabulary.setdefault(g, len(vocabulary)))
+    return rows, cols
+
+
+def _unit_rows(matrix):
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    return sp.diags(1.0 / np.maximum(norms, 1e-12)) @ matrix
+
+
+class IndustryIndex:
+    """
+    Yrke × SNI-nod (nivå 1..5) som CSR-matris, byggd en gång ur katalogen.
+    Radordningen följer occupation_ids, kolumnerna nodes.
+    """
+
+    def __init__(self, catalog=None, top=TOP_INDUSTRIES, min_similarity=MIN_SIMILARITY, min_margin=MIN_MARGIN):
+        catalog = catalog if catalog is not None else TaxonomyCatalog()
+        self.version = catalog.version(*SOURCES)
+        self.min_similarity = min_similarity
+        self.min_margin = min_margin
+        self.similarity = {}   # SSYK-4-ID -> bästa textlikhet bland gruppens länkar
+        self.margin = {}       # SSYK-4-ID -> försprång före bästa bransch i en annan avdelning
+        self.nodes = []        # [{'id', 'code', 'label', 'level', 'parent'}]; parent = nodindex
+        self._load_sni(catalog.concepts('sni-hierarchy'))
+        self.levels = np.array([n['level'] for n in self.nodes], dtype=np.int8)
+
+        groups, members = self._load_ssyk(catalog)
+        self.occupation_ids = [occ for occs in members.values() for occ in occs]
+        self.occupation_index = {occ: row for row, occ in enumerate(self.occupation_ids)}
+
+        links = self._link(groups, top, min_similarity, min_margin)  # SSYK-4-ID -> [(SNI-5-nod, andel)]
+        rows, cols, vals = [], [], []
+        for row, occ in enumerate(self.occupation_ids):
+            for node, share in links.get(self._group[occ], ()):
+                while node is not None:
+                    rows.append(row)
+                    cols.append(node)
+                    vals.append(share)
+                    node = self.nodes[node]['parent']
+        # Dubbletter (två SNI-5 under samma förälder) summeras av konstruktorn
+        self.matrix = sp.csr_matrix((vals, (rows, cols)), shape=(len(self.occupation_ids), len(self.nodes)))
+        self.linked = len({g for g in self._group.values() if g in links})
+
+    def _load_sni(self, concepts):
+        stack = [(c, None) for c in reversed(concepts)]
+        while stack:
+            concept, parent = stack.pop()
+            node = len(self.nodes)
+            self.nodes.append({
+                'id': concept.get('id'),
+                'code': concept.get('sni_level_code_2007', ''),
+                'label': concept.get('preferred_label', ''),
+                'level': int(concept.get('type', 'sni-level-0').rsplit('-', 1)[-1]),
+                'parent': parent,
+            })
+            stack.extend((c, node) for c in reversed(concept.get('narrower', [])))
+
+    def _load_ssyk(self, catalog):
+        """({SSYK-4-ID: text}, {SSYK-4-ID: [yrkes-IDn]}); gruppens eget ID räknas som yrke."""
+        definitions = {c['id']: c.get('definition', '') for c in catalog.concepts('ssyk-level-4-groups')}
+        groups, members = {}, {}
+        self._group = {}  # yrkes-ID -> SSYK-4-ID
+        self.group_labels = {}
+        for node in catalog.flatten('the-ssyk-hierarchy-with-occupations'):
+            if node['type'] == 'ssyk-level-4':
+                groups[node['id']] = [node['label'], definitions.get(node['id'], '')]
+                self.group_labels[node['id']] = node['label']
+                members[node['id']] = [node['id']]
+                self._group[node['id']] = node['id']
+            elif node['type'] == 'occupation-name' and node['parent'] in groups:
+                groups[node['parent']].append(node['label'])
+                members[node['parent']].append(node['id'])
+                self._group[node['id']] = node['parent']
+        return {g: ' '.join(parts) for g, parts in groups.items()}, members
+
+    def _similarity(self, groups):
+        """(SSYK-4-IDn, SNI-5-noder, likhetsmatris grupp × SNI-5) som TF-IDF-cosinus."""
+        leaves = [i for i, n in enumerate(self.nodes) if n['level'] == SNI_LEVELS]
+        leaf_docs = []
+        for i in leaves:
+            parent = self.nodes[i]['parent']
+            leaf_docs.append(self.nodes[i]['label'] + ' ' + (self.nodes[parent]['label'] if parent is not None else ''))
+        group_ids = list(groups)
+
+        vocabulary = {}
+        g_rows, g_cols = _tfidf((groups[g] for g in group_ids), vocabulary)
+        s_rows, s_cols = _tfidf(leaf_docs, vocabulary)
+        shape = len(vocabulary)
+        a = sp.csr_matrix((np.ones(len(g_cols)), (g_rows, g_cols)), shape=(len(group_ids), shape))
+        b = sp.csr_matrix((np.ones(len(s_cols)), (s_rows, s_cols)), shape=(len(leaves), shape))
+        df = np.diff((a > 0).tocsc().indptr) + np.diff((b > 0).tocsc().indptr)
+        idf = sp.diags(np.log((a.shape[0] + b.shape[0]) / np.maximum(df, 1)))
+        a, b = _unit_rows(a.log1p() @ idf), _unit_rows(b.log1p() @ idf)
+        return group_ids, leaves, (a @ b.T).toarray()
+
+    def _section(self, node):
+        while self.nodes[node]['parent'] is not None:
+            node = self.nodes[node]['parent']
+        return node
+
+    def _link(self, groups, top, min_similarity, min_margin):
+        group_ids, leaves, similarity = self._similarity(groups)
+        sections = np.array([self._section(i) for i in leaves])
+        links = {}
+        for row, group in enumerate(group_ids):
+            sims = similarity[row]
+            best = np.argsort(-sims, kind='stable')[:top]
+            section = sections[best[0]]
+            margin = sims[best[0]] - sims[sections != section].max(initial=0.0)
+            if sims[best[0]] < min_similarity or margin < min_margin:
+                continue  # för svag eller för jämn mot en annan avdelning
+            best = best[(sims[best] >= min_similarity) & (sections[best] == section)]
+            shares = sims[best] / sims[best].sum()
+            links[group] = [(leaves[c], float(s)) for c, s in zip(best.tolist(), shares)]
+            self.similarity[group] = float(sims[best[0]])
+            self.margin[group] = float(margin)
+        return links
+
+    def __len__(self):
+        return len(self.occupation_ids)
+
+    def vector(self, matches):
+        """Poängvektor i radordning ur [{'id', 'score'}]; okända yrken ignoreras."""
+        scores = np.zeros(len(self.occupation_ids))
+        index = self.occupation_index
+        for m in matches:
+            row = index.get(m['id'])
+            if row is not None:
+                scores[row] = m['score']
+        return scores
+
+    def weights(self, scores):
+        """Branschvikt per SNI-nod (alla nivåer) = summan av poängen för yrkena i branschen."""
+        return self.matrix.T @ scores
+
+    def coverage(self, scores):
+        """Andel av poängen som ligger på yrken med någon branschkoppling (0..1)."""
+        total = scores.sum()
+        if total <= 0:
+            return 0.0
+        linked = np.diff(self.matrix.indptr) > 0
+        return float(scores[linked].sum() / total)
+
+    def top(self, scores, level=1, k=5, weights=None):
+        """De k tyngsta branscherna på en nivå: [{'id', 'code', 'label', 'weight', 'share'}]."""
+        weights = self.weights(scores) if weights is None else weights
+        cols = np.flatnonzero((self.levels == level) & (weights > 0))
+        total = weights[cols].sum()
+        cols = cols[np.argsort(-weights[cols], kind='stable')[:k]]
+        return [{**{f: self.nodes[c][f] for f in ('id', 'code', 'label')},
+                 'weight': float(weights[c]), 'share': float(weights[c] / total)} for c in cols.tolist()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Härledd koppling SSYK -> SNI")
+    parser.add_argument('--limit', type=int, default=20, help="Antal SSYK-grupper att visa (default: 20)")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    index = IndustryIndex()
+    print(f"{len(index)} yrken × {len(index.nodes)} SNI-noder, {index.matrix.nnz} kopplingar, "
+          f"{index.linked} SSYK-4-grupper kopplade med likhet ≥ {index.min_similarity:.2f} "
+          f"och marginal ≥ {index.min_margin:.2f} "
+          f"({(time.perf_counter() - t0) * 1000:.0f} ms)")
+    for group, label in list(index.group_labels.items())[:args.limit]:
+        row = index.occupation_index[group]
+        start, end = index.matrix.indptr[row], index.matrix.indptr[row + 1]
+        leaves = [(index.nodes[c]['label'], share) for c, share in
+                  zip(index.matrix.indices[start:end], index.matrix.data[start:end]) if index.levels[c] == SNI_LEVELS]
+        similarity = f"{index.similarity[group]:.2f} +{index.margin[group]:.2f}" if group in index.similarity else '–'
+        print(f"  {label[:40]:<40} {similarity:>11} -> " + '; '.join(f"{sni} ({share:.0%})" for sni, share in leaves))
+
+if __name__ == '__main__':
+    main()
@@ -1,56 +1,201 @@
+"""
+Strömmande schemaprofilering av JobTech-filerna.
+
+Varje fil läses koncept för koncept (jsonstream.iter_concepts) och ett slumpmässigt
+urval av fast storlek hålls i en reservoar (Algorithm R). Schemat – fältvägar, typer,
+förekomst, kardinalitet, längder och nästlingsdjup – härleds ur urvalet, så minnet är
+begränsat av urvalsstorleken oavsett filstorlek. Rapporten innehåller bara korta,
+avklippta exempelvärden.
+
+Usage:
+    python inspector.py                          # alla filer i Kompetensbryggan/ och data/raw/taxonomy/
+    python inspector.py skills.json --sample 500
+"""
+import argparse
 import json
 import os
+import random
+import time
+from collections import Counter
 
-def inspect_json_files():
-    # Lista på de filer vi vill analysera
-    files_to_inspect = ['jobs.json', 'skills.json', 'relations.json']
-    output_file = 'filestructures.txt'
-    
-    analysis = "=== DATASYSTEMETS STRUKTUR-ANALYS ===\n\n"
-    
-    for filename in files_to_inspect:
-        analysis += f"--- FIL: {filename} ---\n"
-        
-        if not os.path.exists(filename):
-            analysis += "Status: HITTADES EJ!\n\n"
-            continue
-            
+from catalog import SEARCH_FOLDERS
+from jsonstream import iter_concepts
+
+SAMPLE_SIZE = 1000        # koncept per fil i reservoaren
+MAX_DISTINCT = 1000       # distinkta värden som räknas per fält, därefter "≥"
+EXAMPLE_CHARS = 40
+FALLBACK_MAX_BYTES = 8 * 2**20  # filer utan data -> concepts läses hela bara om de är små
+
+
+def _type_name(value):
+    if value is None:
+        return 'null'
+    return {dict: 'obj', list: 'list', str: 'str', bool: 'bool', int: 'int', float: 'float'}.get(
+        type(value), type(value).__name__)
+
+
+def _short(value):
+    text = json.dumps(value, ensure_ascii=False)
+    return text if len(text) <= EXAMPLE_CHARS else text[:EXAMPLE_CHARS - 1] + '…'
+
+
+class _Field:
+    __slots__ = ('count', 'types', 'distinct', 'min_len', 'max_len', 'example')
+
+    def __init__(self):
+        self.count = 0
+        self.types = Counter()
+        self.distinct = set()
+        self.min_len = None
+        self.max_len = None
+        self.example = None
+
+    def add(self, value):
+        self.count += 1
+        self.types[_type_name(value)] += 1
+        if isinstance(value, (str, list)):
+            n = len(value)
+            self.min_len = n if self.min_len is None else min(self.min_len, n)
+            self.max_len = n if self.max_len is None else max(self.max_len, n)
+        if not isinstance(value, (dict, list)):
+            if len(self.distinct) < MAX_DISTINCT:
+                self.distinct.add(value)
+            if self.example is None and value not in (None, ''):
+                self.example = value
+
+
+class SchemaProfile:
+    """Schema för en ström av koncept, härlett ur ett reservoarurval."""
+
+    def __init__(self, sample_size=SAMPLE_SIZE, seed=0):
+        self.sample_size = sample_size
+        self.rng = random.Random(seed)
+        self.sample = []
+        self.total = 0
+
+    def add(self, concept):
+        # Algorithm R: koncept nr i (0-baserat) ersätter en plats i urvalet med sannolikhet k/(i+1)
+        self.total += 1
+        if len(self.sample) < self.sample_size:
+            self.sample.append(concept)
+        else:
+            j = self.rng.randrange(self.total)
+            if j < self.sample_size:
+                self.sample[j] = concept
+
+    def fields(self):
+        """({fältväg: _Field}, {fältväg: antal objekt}, maxdjup) över urvalet."""
+        fields, objects = {}, Counter()
+        max_depth = 0
+        stack = [('', c, 0) for c in self.sample]
+        while stack:
+            path, value, depth = stack.pop()
+            max_depth = max(max_depth, depth)
+            if path:
+                field = fields.get(path)
+                if field is None:
+                    field = fields[path] = _Field()
+                field.add(value)
+            if isinstance(value, dict):
+                objects[path] += 1
+                prefix = f"{path}." if path else ''
+                stack.extend((prefix + k, v, depth + 1) for k, v in value.items())
+            elif isinstance(value, list):
+                stack.extend((f"{path}[]", v, depth + 1) for v in value)
+        return fields, objects, max_depth
+
+    def report(self):
+        fields, objects, max_depth = self.fields()
+        lines = [f"  {'fält':<44} {'typer':<18} {'förekomst':>9} {'distinkta':>10}  exempel"]
+        for path in sorted(fields):
+            field = fields[path]
+            parent = path.rsplit('.', 1)[0] if '.' in path else ''
+            if path.endswith('[]'):
+                presence = ''
+            else:
+                presence = f"{field.count / max(objects[parent], 1):.0%}"
+            types = '|'.join(t for t, _ in field.types.most_common())
+            if field.max_len is not None:
+                types += f"({field.min_len}-{field.max_len})"
+            scalar = field.count - field.types['obj'] - field.types['list']
+            if scalar:
+                n = len(field.distinct)
+                distinct = f"≥{n}" if n >= MAX_DISTINCT else str(n)
+                if n == scalar and n > 1:
+                    distinct += '*'  # unik i urvalet: sannolik nyckel
+            else:
+                distinct = ''
+            example = _short(field.example) if field.example is not None else ''
+            lines.append(f"  {path:<44} {types:<18} {presence:>9} {distinct:>10}  {example}")
+        lines.append(f"  max nästlingsdjup: {max_depth}")
+        return lines
+
+
+def profile_file(path, sample_size=SAMPLE_SIZE):
+    """Strömmar en fil och returnerar (SchemaProfile, kuvert)."""
+    profile = SchemaProfile(sample_size)
+    for concept in iter_concepts(path):
+        profile.add(concept)
+    if profile.total:
+        return profile, 'data.concepts[]'
+    if os.path.getsize(path) > FALLBACK_MAX_BYTES:
+        return profile, 'okänt (för stor för att läsas hel)'
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    # Annat kuvert (t.ex. concept-types.json: data -> concept_types): första listan profileras
+    data = data.get('data', data) if isinstance(data, dict) else data
+    key, items = None, data if isinstance(data, list) else [data]
+    if isinstance(data, dict):
+        key, items = next(((k, v) for k, v in data.items() if isinstance(v, list)), (None, [data]))
+    for item in items:
+        profile.add(item)
+    return profile, f"data.{key}[]" if key else 'dokument'
+
+
+def collect_files(targets):
+    paths = []
+    for target in targets:
+        if os.path.isdir(target):
+            paths.extend(sorted(os.path.join(target, f) for f in os.listdir(target) if f.endswith('.json')))
+        elif os.path.exists(target):
+            paths.append(target)
+    return paths
+
+
+def inspect_json_files(targets=SEARCH_FOLDERS, output_file='filestructures.txt', sample_size=SAMPLE_SIZE):
+    paths = collect_files(targets)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    lines = ["=== DATASYSTEMETS STRUKTUR-ANALYS ===",
+             f"Urval: högst {sample_size} koncept per fil (reservoar). '*' = unikt i urvalet.", ""]
+    t_start = time.perf_counter()
+
+    for path in paths:
+        t0 = time.perf_counter()
+        name = os.path.relpath(os.path.abspath(path), root)
         try:
-            with open(filename, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                
-                # Om det är en lista, kolla första objektet
-                if isinstance(data, list):
-                    analysis += f"Typ: Lista med {len(data)} objekt.\n"
-                    if len(data) > 0:
-                        analysis += "Exempel-objekt (Struktur):\n"
-                        first_item = data[0]
-                        for key, value in first_item.items():
-                            analysis += f"  - {key}: {type(value).__name__} (Exempel: {value})\n"
-                            
-                            # Om det finns nästlade relationer, inspektera dem
-                            if key == 'relations' and isinstance(value, list) and len(value) > 0:
-                                analysis += "    * Understruktur i 'relations':\n"
-                                for sub_key, sub_val in value[0].items():
-                                    analysis += f"      - {sub_key}: {type(sub_val).__name__} (Exempel: {sub_val})\n"
-
-                # Om det är ett objekt (dictionary)
-                elif isinstance(data, dict):
-                    analysis += f"Typ: Dictionary med {len(data)} nycklar.\n"
-                    first_key = list(data.keys())[0]
-                    analysis += f"Exempel-nyckel: {first_key} ({type(first_key).__name__})\n"
-                    analysis += f"Exempel-värde: {data[first_key]} ({type(data[first_key]).__name__})\n"
-                
-                analysis += "\n"
-                
+            profile, envelope = profile_file(path, sample_size)
         except Exception as e:
-            analysis += f"Fel vid läsning: {str(e)}\n\n"
+            lines += [f"--- FIL: {name} ---", f"Fel vid läsning: {e}", ""]
+            continue
+        size_kb = os.path.getsize(path) / 1024
+        lines.append(f"--- FIL: {name} ({size_kb:,.0f} KB, {envelope}, {profile.total:,} koncept, "
+                     f"urval {len(profile.sample):,}, {time.perf_counter() - t0:.2f} s) ---")
+        lines += profile.report() + [""]
 
-    # Skriv ner analysen till fil
     with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(analysis)
-    
-    print(f"✅ Analys slutförd! Öppna filen '{output_file}' för att se resultatet.")
+        f.write("\n".join(lines))
+    print(f"✅ Analys slutförd! {len(paths)} filer på {time.perf_counter() - t_start:.1f} s – "
+          f"öppna filen '{output_file}' för att se resultatet.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Strömmande schemaprofil för JobTech-filerna")
+    parser.add_argument('targets', nargs='*', default=list(SEARCH_FOLDERS), help="Filer eller mappar")
+    parser.add_argument('--sample', type=int, default=SAMPLE_SIZE, help=f"Urvalsstorlek per fil (default: {SAMPLE_SIZE})")
+    parser.add_argument('--out', default='filestructures.txt', help="Rapportfil (default: filestructures.txt)")
+    args = parser.parse_args()
+    inspect_json_files(args.targets, args.out, args.sample)
+
 
 if __name__ == "__main__":
-    inspect_json_files()
\ No newline at end of file
+    main()
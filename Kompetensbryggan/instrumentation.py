@@ -0,0 +1,211 @@
+"""
+Lätt instrumentering av pipelinen: laddning -> PDF-extrahering -> detektering -> poängsättning.
+
+En processglobal Metrics-instans (metrics) samlar:
+  - timers:   tid per steg (antal, summa, max och p50/p95 över de senaste mätningarna)
+  - counters: t.ex. tecken skannade, kompetenser hittade, yrken berörda, cacheträffar, fel
+  - gauges:   minnesögonblicksbilder per steg (tracemalloc om den är igång, annars max-RSS)
+
+Allt är trådsäkert och kostar några mikrosekunder per mätning. Exporten skriver
+Prometheus textformat (för node_exporters textfile-collector) eller en JSON-rad per export.
+
+Environment:
+    KOMPETENSBRYGGAN_METRICS=/var/lib/node_exporter/kb.prom   # .prom = Prometheus, annars JSON-rader
+    KOMPETENSBRYGGAN_TRACEMALLOC=1                            # minnesmätning med tracemalloc
+
+Usage:
+    from instrumentation import metrics
+    with metrics.timer('detect'):
+        ...
+    metrics.count('skills_detected', len(skill_ids))
+    metrics.export()
+"""
+import functools
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, deque
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows: ingen getrusage, minnet mäts bara med tracemalloc
+    resource = None
+
+METRICS_PATH = os.environ.get('KOMPETENSBRYGGAN_METRICS')
+PREFIX = 'kompetensbryggan'
+WINDOW = 512  # senaste mätningarna per steg som kvantilerna räknas på
+QUANTILES = (0.5, 0.95)
+
+log = logging.getLogger('kompetensbryggan')
+
+if os.environ.get('KOMPETENSBRYGGAN_TRACEMALLOC') and not tracemalloc.is_tracing():
+    tracemalloc.start()
+
+
+def _quantile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def _name(name):
+    return re.sub(r'[^a-zA-Z0-9_]', '_', name)
+
+
+class _Timer:
+    __slots__ = ('count', 'total', 'max', 'last', 'recent')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+        self.recent = deque(maxlen=WINDOW)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.last = seconds
+        self.recent.append(seconds)
+
+    def summary(self):
+        recent = sorted(self.recent)
+        return {'count': self.count, 'total': self.total, 'max': self.max, 'last': self.last,
+                **{f"p{int(q * 100)}": _quantile(recent, q) for q in QUANTILES}}
+
+
+class Metrics:
+    """Timers, räknare och minnesmätningar för en process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.timers = {}
+            self.counters = Counter()
+            self.gauges = {}
+            self.started = time.time()
+
+    # ── MÄTNING ───────────────────────────────────────────────────────────────
+
+    def observe(self, stage, seconds):
+        """Registrerar en redan uppmätt tid för ett steg."""
+        with self._lock:
+            timer = self.timers.get(stage)
+            if timer is None:
+                timer = self.timers[stage] = _Timer()
+            timer.add(seconds)
+
+    @contextmanager
+    def timer(self, stage):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - t0)
+
+    def timed(self, stage):
+        """Dekorator: tar tid på varje anrop av funktionen."""
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.timer(stage):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] += n
+
+    def error(self, stage, message):
+        """Loggar pågående undantag med stacktrace och räknar det per steg (anropas i except)."""
+        log.exception("%s: %s", stage, message)
+        self.count(f"errors.{stage}")
+
+    def memory(self, stage):
+        """Minnesögonblicksbild efter ett steg: tracemalloc (aktuellt/topp) om igång, annars max-RSS."""
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            values = {'traced_bytes': current, 'traced_peak_bytes': peak}
+        elif resource is not None:
+            rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            values = {'max_rss_bytes': rss if sys.platform == 'darwin' else rss * 1024}
+        else:
+            return {}
+        with self._lock:
+            self.gauges[stage] = values
+        return values
+
+    # ── EXPORT ────────────────────────────────────────────────────────────────
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'time': time.time(),
+                'uptime': time.time() - self.started,
+                'pid': os.getpid(),
+                'timers': {stage: t.summary() for stage, t in self.timers.items()},
+                'counters': dict(self.counters),
+                'memory': {stage: dict(v) for stage, v in self.gauges.items()},
+            }
+
+    def prometheus(self):
+        """Ögonblicksbilden i Prometheus textformat (summary per steg, counters, gauges)."""
+        snap = self.snapshot()
+        lines = [f"# TYPE {PREFIX}_stage_seconds summary"]
+        for stage, t in sorted(snap['timers'].items()):
+            label = f'stage="{stage}"'
+            for q in QUANTILES:
+                lines.append(f'{PREFIX}_stage_seconds{{{label},quantile="{q}"}} {t[f"p{int(q * 100)}"]:.6f}')
+            lines.append(f"{PREFIX}_stage_seconds_sum{{{label}}} {t['total']:.6f}")
+            lines.append(f"{PREFIX}_stage_seconds_count{{{label}}} {t['count']}")
+        for name, value in sorted(snap['counters'].items()):
+            metric = f"{PREFIX}_{_name(name)}_total"
+            lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+        gauges = {}
+        for stage, values in sorted(snap['memory'].items()):
+            for key, value in values.items():
+                gauges.setdefault(f"{PREFIX}_memory_{key}", []).append(f'{{stage="{stage}"}} {value}')
+        for metric, samples in sorted(gauges.items()):
+            lines += [f"# TYPE {metric} gauge"] + [metric + sample for sample in samples]
+        lines += [f"# TYPE {PREFIX}_uptime_seconds gauge", f"{PREFIX}_uptime_seconds {snap['uptime']:.1f}"]
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        # Atomiskt, så textfile-collectorn aldrig läser en halvskriven fil
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.prometheus())
+        os.replace(tmp_path, path)
+
+    def append_json(self, path):
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(self.snapshot(), ensure_ascii=False) + "\n")
+
+    def export(self, path=None):
+        """Skriver till path eller KOMPETENSBRYGGAN_METRICS (.prom = Prometheus, annars JSON-rader)."""
+        path = path or METRICS_PATH
+        if not path:
+            return None
+        try:
+            if path.endswith('.prom'):
+                self.write_prometheus(path)
+            else:
+                self.append_json(path)
+        except OSError:
+            log.exception("Kunde inte exportera mätvärden till %s", path)
+            return None
+        return path
+
+
+metrics = Metrics()
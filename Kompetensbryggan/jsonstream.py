@@ -0,0 +1,55 @@
+import json
+import re
+
+_CONCEPTS_START = re.compile(r'"concepts"\s*:\s*\[')
+_SEPARATORS = ' \t\r\n,'
+
+
+def iter_concepts(path, chunk_size=1 << 16):
+    """
+    Strömmar data -> concepts ur en JobTech-fil, ett koncept i taget.
+    Bufferten rymmer högst ett koncept plus ett läsblock, så hela dokumentet
+    hålls aldrig i minnet (till skillnad från json.load).
+    """
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buf = ''
+        # Leta upp början på concepts-listan (första förekomsten, JobTech-kuvertet)
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            buf += chunk
+            m = _CONCEPTS_START.search(buf)
+            if m:
+                buf = buf[m.end():]
+                break
+            buf = buf[-32:]  # behåll svansen ifall nyckeln delas mellan block
+
+        pos = 0
+        eof = False
+        while True:
+            # Hoppa över whitespace och kommatecken mellan elementen
+            while pos < len(buf) and buf[pos] in _SEPARATORS:
+                pos += 1
+            if pos < len(buf) and buf[pos] == ']':
+                return
+            try:
+                if pos >= len(buf):
+                    raise json.JSONDecodeError('buffer exhausted', buf, pos)
+                item, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                # Ofullständigt element: läs mer och försök igen
+                if eof:
+                    raise
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    eof = True
+                buf = buf[pos:] + chunk
+                pos = 0
+                continue
+            yield item
+            pos = end
+            if pos > chunk_size:
+                buf = buf[pos:]
+                pos = 0
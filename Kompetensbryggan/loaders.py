@@ -1,7 +1,19 @@
+import io
 import json
 import PyPDF2
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from occupation_index import OccupationIndex
+from bitset_profiles import BitsetProfiles
+from hierarchy import SkillHierarchy
+from fuzzy import FuzzyMatcher
+from engine import SkillRegistry
+from snapshot import open_snapshot
+from jsonstream import iter_concepts
+from instrumentation import metrics
 
+@metrics.timed('load')
 def load_jobtech_data():
     """
     Data Engineering Core:
@@ -12,71 +24,210 @@ def load_jobtech_data():
         'jobs': {}, 
         'skills': {}, 
         'relations': [], 
-        'hierarchy': {}  # Nytt: mappar barn-ID -> [föräldra-IDn]
+        'hierarchy': {},  # Nytt: mappar barn-ID -> [föräldra-IDn]
+        'ancestry': SkillHierarchy({}),  # förberäknade förfäder per kompetens
+        'fuzzy': FuzzyMatcher(),  # trigram-index för böjningar och stavfel
+        'registry': SkillRegistry({}),  # id <-> etikett och räknare (engine.py)
+        'index': OccupationIndex([]),  # kompetens-ID -> yrkesrader
+        'profiles': BitsetProfiles([]),  # yrkesrader som uint64-bitmängder
     }
     
     current_folder = os.path.dirname(os.path.abspath(__file__))
     master_file = os.path.join(current_folder, 'concepts-and-common-relations.json')
     skills_file = os.path.join(current_folder, 'skills.json')
 
+    # 0. Kompilerad snapshot (python snapshot.py compile) ersätter JSON-parsningen helt
+    snap = open_snapshot(current_folder)
+    if snap:
+        db['skills'] = snap.skills()
+        db['hierarchy'] = snap.hierarchy()
+        db['jobs'] = snap.jobs()
+        db['relations'] = snap.relations()
+        db['index'] = OccupationIndex(db['relations'])
+        db['profiles'] = BitsetProfiles(db['relations'], db['index'])
+        db['ancestry'] = SkillHierarchy(db['hierarchy'])
+        db['fuzzy'] = snap.fuzzy_matcher()
+        db['registry'] = SkillRegistry(db['skills'])
+        print(f"✅ Pipeline: snapshot {snap.taxonomy_version} – {len(db['skills'])} atomer, "
+              f"{len(db['jobs'])} yrken.")
+        return db
+
     try:
         # 1. Ladda kompetenser OCH deras hierarkiska kopplingar
         if os.path.exists(skills_file):
-            with open(skills_file, 'r', encoding='utf-8') as f:
-                content = json.load(f)
-                concepts = content.get('data', {}).get('concepts', [])
-                for s in concepts:
-                    s_id = str(s['id'])
-                    db['skills'][s_id] = s['preferred_label']
-                    
-                    # Extrahera "föräldrar" (broader) för att förstå kontext
-                    # Om 'Google Ads' har 'Marknadsföring' som broader, sparar vi det här.
-                    parents = [str(b['id']) for b in s.get('broader', []) if 'id' in b]
-                    if parents:
-                        db['hierarchy'][s_id] = parents
+            for s in iter_concepts(skills_file):
+                s_id = str(s['id'])
+                db['skills'][s_id] = s['preferred_label']
+
+                # Extrahera "föräldrar" (broader) för att förstå kontext
+                # Om 'Google Ads' har 'Marknadsföring' som broader, sparar vi det här.
+                parents = [str(b['id']) for b in s.get('broader', []) if 'id' in b]
+                if parents:
+                    db['hierarchy'][s_id] = parents
+            db['ancestry'] = SkillHierarchy(db['hierarchy'])
+            db['fuzzy'] = FuzzyMatcher(db['skills'])
+            db['registry'] = SkillRegistry(db['skills'])
             print(f"✅ Pipeline: {len(db['skills'])} atomer och {len(db['hierarchy'])} hierarkiska kopplingar laddade.")
 
         # 2. Ladda yrken och deras kravprofiler
         if os.path.exists(master_file):
-            with open(master_file, 'r', encoding='utf-8') as f:
-                content = json.load(f)
-                all_concepts = content.get('data', {}).get('concepts', [])
-                
-                for c in all_concepts:
-                    if c.get('type') == 'occupation-name':
-                        c_id = str(c.get('id'))
-                        db['jobs'][c_id] = c.get('preferred_label')
-                        
-                        # Vi samlar relationer från ALLA relevanta fält för maximal täckning
-                        raw_relations = (
-                            c.get('related', []) + 
-                            c.get('broader', []) + 
-                            c.get('close_match', []) + 
-                            c.get('exact_match', [])
-                        )
-                        
-                        clean_rels = [str(r['id']) for r in raw_relations if 'id' in r]
-                        
-                        if clean_rels:
-                            db['relations'].append({
-                                'id': c_id,
-                                'relations': [{'id': rid} for rid in set(clean_rels)] # set() tar bort dubbletter
-                            })
-                
-                print(f"✅ Pipeline: {len(db['jobs'])} yrken mappade mot relationsmatrisen.")
+            # Strömmas koncept för koncept: bara occupation-name och deras relations-IDn behålls
+            for c in iter_concepts(master_file):
+                if c.get('type') == 'occupation-name':
+                    c_id = str(c.get('id'))
+                    db['jobs'][c_id] = c.get('preferred_label')
+
+                    # Vi samlar relationer från ALLA relevanta fält för maximal täckning
+                    raw_relations = (
+                        c.get('related', []) +
+                        c.get('broader', []) +
+                        c.get('close_match', []) +
+                        c.get('exact_match', [])
+                    )
+
+                    clean_rels = [str(r['id']) for r in raw_relations if 'id' in r]
+
+                    if clean_rels:
+                        db['relations'].append({
+                            'id': c_id,
+                            'relations': [{'id': rid} for rid in set(clean_rels)] # set() tar bort dubbletter
+                        })
+
+            print(f"✅ Pipeline: {len(db['jobs'])} yrken mappade mot relationsmatrisen.")
+
+            # 3. Inverterat index kompetens -> yrken gallrar kandidaterna för bitmängdsprofilerna
+            db['index'] = OccupationIndex(db['relations'])
+            db['profiles'] = BitsetProfiles(db['relations'], db['index'])
         else:
             print(f"❌ Fel: Hittade inte master-filen {master_file}")
                 
     except Exception as e:
         print(f"❌ Kritisk pipeline-krasch: {e}")
+        metrics.error('load', "Kritisk pipeline-krasch")
         
     return db
 
-def extract_text(pdf_file):
+def _read_page_range(source, start, stop):
+    """Worker: extraherar sidorna [start, stop) och tar tid per sida."""
+    reader = PyPDF2.PdfReader(io.BytesIO(source) if isinstance(source, bytes) else source)
+    pages = []
+    for n in range(start, stop):
+        t0 = time.perf_counter()
+        text = reader.pages[n].extract_text() or ""
+        pages.append({'page': n + 1, 'text': text, 'seconds': time.perf_counter() - t0})
+    return pages
+
+
+def iter_pages(pdf_file, max_pages=None, max_chars=None, workers=1, parallel_threshold=16):
+    """
+    Strömmar en PDF sida för sida: {'page', 'text', 'seconds', 'truncated'}.
+    Stora dokument (minst parallel_threshold sidor) delas upp i sidintervall över en
+    processpool när workers > 1; sidorna levereras ändå i ordning.
+    max_pages/max_chars är en budget – läsningen avbryts tidigt när den är förbrukad.
+    """
+    reader = PyPDF2.PdfReader(pdf_file)
+    total_pages = len(reader.pages)
+    n_pages = total_pages if max_pages is None else min(total_pages, max_pages)
+    chars = 0
+
+    def within_budget(page):
+        # Kapar sidan mot teckenbudgeten; truncated så fort någon text faller bort,
+        # vare sig sidan kapas eller läsningen slutar före dokumentets sista sida
+        nonlocal chars
+        cut = max_chars is not None and chars + len(page['text']) > max_chars
+        if cut:
+            page['text'] = page['text'][:max_chars - chars]
+        chars += len(page['text'])
+        more = page['page'] < n_pages and (max_chars is None or chars < max_chars)
+        page['truncated'] = cut or (not more and page['page'] < total_pages)
+        return more
+
+    if workers > 1 and n_pages >= parallel_threshold:
+        # Workers läser från bytes (filobjekt kan inte skickas mellan processer)
+        if isinstance(pdf_file, (str, os.PathLike)):
+            with open(pdf_file, 'rb') as f:
+                source = f.read()
+        else:
+            pdf_file.seek(0)
+            source = pdf_file.read()
+        step = -(-n_pages // (workers * 2))
+        pool = ProcessPoolExecutor(max_workers=workers)
+        try:
+            futures = [pool.submit(_read_page_range, source, a, min(a + step, n_pages))
+                       for a in range(0, n_pages, step)]
+            for future in futures:
+                for page in future.result():
+                    ok = within_budget(page)
+                    yield page
+                    if not ok:
+                        return
+        finally:
+            # Tidig cutoff: väntande sidintervall avbryts i stället för att läsas klart
+            pool.shutdown(wait=False, cancel_futures=True)
+        return
+
+    for n in range(n_pages):
+        t0 = time.perf_counter()
+        page = {'page': n + 1, 'text': reader.pages[n].extract_text() or "",
+                'seconds': time.perf_counter() - t0}
+        ok = within_budget(page)
+        yield page
+        if not ok:
+            return
+
+
+def detect_pdf_skills(pdf_file, matcher, max_pages=None, max_chars=None, workers=1, fuzzy=None):
+    """
+    Matar sidorna direkt in i kompetens-automaten allteftersom de extraheras.
+    Med fuzzy (FuzzyMatcher) läggs böjningar och stavfel av etiketterna till de exakta träffarna;
+    de listas också i 'fuzzy_ids' så att poängsättningen kan vikta ned dem (fuzzy.FUZZY_CREDIT).
+    Returnerar {'text', 'skill_ids', 'fuzzy_ids', 'pages': [{'page', 'chars', 'seconds'}], 'truncated'}.
+    """
+    texts, timings = [], []
+    truncated = False
+    extract_seconds = detect_seconds = 0.0
+
+    def pages():
+        # Extrahering och exakt detektering varvas sida för sida. Båda mäts i den här
+        # processen: extract = väntan på nästa sida (även från poolen), detect = tiden
+        # automaten arbetar med sidan innan den ber om nästa
+        nonlocal truncated, extract_seconds, detect_seconds
+        stream = iter_pages(pdf_file, max_pages, max_chars, workers)
+        while True:
+            t0 = time.perf_counter()
+            page = next(stream, None)
+            extract_seconds += time.perf_counter() - t0
+            if page is None:
+                return
+            truncated = page['truncated']
+            chunks = (" ", page['text']) if texts else (page['text'],)  # samma sidavgränsare som extract_text
+            texts.append(page['text'])
+            timings.append({'page': page['page'], 'chars': len(page['text']),
+                            'seconds': round(page['seconds'], 4)})
+            t0 = time.perf_counter()
+            yield from chunks
+            detect_seconds += time.perf_counter() - t0
+
+    skill_ids = matcher.scan(pages())
+    text = " ".join(texts)
+    metrics.observe('extract', extract_seconds)
+    metrics.observe('detect', detect_seconds)
+    approximate = set()
+    if fuzzy is not None:
+        with metrics.timer('detect_fuzzy'):
+            approximate = fuzzy.find_ids(text, skill_ids)
+        skill_ids |= approximate
+    ordered = sorted(skill_ids, key=matcher.order.__getitem__)
+    metrics.count('pages', len(timings))
+    metrics.count('chars_scanned', len(text))
+    metrics.count('skills_detected', len(ordered))
+    return {'text': text, 'skill_ids': ordered, 'fuzzy_ids': [s for s in ordered if s in approximate],
+            'pages': timings, 'truncated': truncated}
+
+
+def extract_text(pdf_file, max_pages=None, max_chars=None):
     """Extraherar råtext från PDF."""
     try:
-        reader = PyPDF2.PdfReader(pdf_file)
-        text = " ".join([page.extract_text() or "" for page in reader.pages])
-        return text
+        return " ".join(page['text'] for page in iter_pages(pdf_file, max_pages, max_chars))
     except Exception as e:
-        return f"Extraction Error: {e}"
\ No newline at end of file
+        return f"Extraction Error: {e}"
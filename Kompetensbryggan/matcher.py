@@ -0,0 +1,128 @@
+from collections import deque
+
+
+def _is_word(ch):
+    # Samma definition som regex-motorns \w (Unicode): bokstäver, siffror och understreck
+    return ch.isalnum() or ch == '_'
+
+
+class SkillMatcher:
+    """
+    Aho-Corasick-automat över alla kompetens-etiketter.
+    Byggs en gång vid laddning och hittar sedan alla ordavgränsade träffar
+    i CV-texten med en enda linjär genomläsning, i stället för en regex per kompetens.
+    """
+
+    def __init__(self, skills, min_length=3):
+        # skills: {id: preferred_label}, samma form som db['skills']
+        self.order = {}       # id -> position i db['skills'] (bevarar UI:ts ordning)
+        self.labels = {}      # id -> ursprunglig etikett
+        self.patterns = []    # mönster-index -> (gemen etikett, [ids])
+        by_label = {}
+
+        for pos, (s_id, s_name) in enumerate(skills.items()):
+            if not s_name or len(s_name) < min_length:
+                continue
+            self.order[s_id] = pos
+            self.labels[s_id] = s_name
+            key = s_name.lower()
+            if key not in by_label:
+                by_label[key] = len(self.patterns)
+                self.patterns.append((key, []))
+            self.patterns[by_label[key]][1].append(s_id)
+
+        self.max_length = max((len(key) for key, _ in self.patterns), default=0)
+        self._build()
+
+    def _build(self):
+        # Trie: goto[state] = {tecken: nästa state}, out[state] = mönster som slutar här
+        self.goto = [{}]
+        self.out = [[]]
+        for p_idx, (key, _) in enumerate(self.patterns):
+            state = 0
+            for ch in key:
+                nxt = self.goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[state][ch] = nxt
+                    self.goto.append({})
+                    self.out.append([])
+                state = nxt
+            self.out[state].append(p_idx)
+
+        # Fail-länkar byggs bredden-först; utdata ärvs längs fail-kedjan
+        self.fail = [0] * len(self.goto)
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                cand = self.goto[f].get(ch, 0)
+                self.fail[nxt] = cand if cand != nxt else 0
+                if self.out[self.fail[nxt]]:
+                    self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def find_ids(self, text):
+        """Returnerar mängden kompetens-IDn vars etikett förekommer ordavgränsat i texten."""
+        return self.scan([text])
+
+    def scan(self, chunks):
+        """
+        Strömmande variant av find_ids: läser texten i block (t.ex. en PDF-sida i taget).
+        Automatens tillstånd och ordgränserna bärs över blockgränserna, så resultatet
+        blir detsamma som för den sammanslagna texten.
+        """
+        goto, fail, out, patterns = self.goto, self.fail, self.out, self.patterns
+        found = set()
+        state = 0
+        tail = ''      # de sista tecknen från föregående block (för startgränsen)
+        pending = []   # träffar som slutar sist i blocket och väntar på nästa tecken
+
+        for chunk in chunks:
+            if not chunk:
+                continue
+            text = tail + chunk.lower()
+            first = len(tail)
+            n = len(text)
+            if pending:
+                after = _is_word(text[first])
+                for key, ids in pending:
+                    if after != _is_word(key[-1]):
+                        found.update(ids)
+                pending = []
+
+            for i in range(first, n):
+                ch = text[i]
+                while state and ch not in goto[state]:
+                    state = fail[state]
+                state = goto[state].get(ch, 0)
+                if not out[state]:
+                    continue
+                for p_idx in out[state]:
+                    key, ids = patterns[p_idx]
+                    if ids[0] in found:
+                        continue
+                    start = i - len(key) + 1
+                    # \b-semantik: ordtecken-status måste skifta vid båda kanterna
+                    before = _is_word(text[start - 1]) if start > 0 else False
+                    if before == _is_word(key[0]):
+                        continue
+                    if i + 1 == n:
+                        pending.append((key, ids))
+                    elif _is_word(text[i + 1]) != _is_word(key[-1]):
+                        found.update(ids)
+            tail = text[-self.max_length:] if self.max_length else ''
+
+        # Textens slut räknas som icke-ordtecken
+        for key, ids in pending:
+            if _is_word(key[-1]):
+                found.update(ids)
+        return found
+
+    def find(self, text):
+        """Hittar kompetenser i texten. Returnerar [{'id', 'name'}] i samma ordning som db['skills']."""
+        ids = sorted(self.find_ids(text), key=self.order.__getitem__)
+        return [{'id': s_id, 'name': self.labels[s_id]} for s_id in ids]
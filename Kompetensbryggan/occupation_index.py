@@ -0,0 +1,71 @@
+class OccupationIndex:
+    """
+    Inverterat index kompetens -> yrken, byggt en gång från db['relations'].
+    Poängsättningen besöker bara yrken som nås från de detekterade kompetenserna
+    i stället för att gå igenom hela relationsmatrisen per förfrågan.
+    """
+
+    def __init__(self, relations):
+        self.occupation_ids = []  # rad -> yrkes-ID (samma ordning som db['relations'])
+        self.requirements = []    # rad -> frozenset av kompetens-IDn
+        self.by_skill = {}        # kompetens-ID -> [rader]
+
+        for rel in relations:
+            job_skills = frozenset(r['id'] for r in rel.get('relations', []))
+            if not job_skills:
+                continue
+            row = len(self.occupation_ids)
+            self.occupation_ids.append(rel['id'])
+            self.requirements.append(job_skills)
+            for s_id in job_skills:
+                self.by_skill.setdefault(s_id, []).append(row)
+
+    def __len__(self):
+        return len(self.occupation_ids)
+
+    def requirement_count(self, row):
+        return len(self.requirements[row])
+
+    def candidates(self, my_ids):
+        """Sorterade rader för yrken som kräver minst en av kompetenserna – övriga kan inte få poäng."""
+        rows = set()
+        for s_id in my_ids:
+            rows.update(self.by_skill.get(s_id, ()))
+        return sorted(rows)
+
+    def touch(self, my_ids):
+        """Returnerar {rad: [träffade kompetens-IDn]} för alla yrken som delar minst en kompetens."""
+        touched = {}
+        for s_id in my_ids:
+            for row in self.by_skill.get(s_id, ()):
+                touched.setdefault(row, []).append(s_id)
+        return touched
+
+    def score(self, my_ids, credits=None):
+        """
+        Matchar en kompetensmängd mot alla yrken.
+        Returnerar [{'id', 'score', 'hits', 'inherited', 'missing'}] med kompetens-IDn, i relationsordning.
+        credits: {kompetens-ID: kredit} från SkillHierarchy.expand – krav som bara täcks via
+        en underordnad kompetens hamnar i 'inherited' och ger delpoäng.
+        """
+        exact = credits is None or all(c >= 1.0 for c in credits.values())
+        touched = self.touch(my_ids if credits is None else credits)
+        results = []
+        for row in sorted(touched):
+            if exact:
+                hits, inherited, points = touched[row], [], len(touched[row])
+            else:
+                hits, inherited, points = [], [], 0.0
+                for s_id in touched[row]:
+                    credit = credits[s_id]
+                    points += credit
+                    (hits if credit >= 1.0 else inherited).append(s_id)
+            job_skills = self.requirements[row]
+            results.append({
+                'id': self.occupation_ids[row],
+                'score': points / len(job_skills),
+                'hits': hits,
+                'inherited': inherited,
+                'missing': list(job_skills.difference(touched[row])),
+            })
+        return results
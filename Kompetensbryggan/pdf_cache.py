@@ -0,0 +1,121 @@
+import hashlib
+import json
+import os
+
+from instrumentation import metrics
+from snapshot import CURRENT_FOLDER, open_snapshot, taxonomy_version
+
+DEFAULT_CACHE_DIR = os.environ.get('KOMPETENSBRYGGAN_CACHE', os.path.join(CURRENT_FOLDER, '.cache'))
+DEFAULT_MAX_BYTES = 256 * 2**20
+LOW_WATER = 0.9  # eviction rensar ner till 90 % av max_bytes, så katalogen inte skannas vid varje put
+DETECTOR_VERSION = 4  # höjs när detekteringen eller postformatet ändras (2: ungefärlig matchning, 3: sidor, 4: fuzzy_ids)
+
+
+def current_taxonomy_version(folder=CURRENT_FOLDER):
+    """Versionen från snapshoten om den är aktuell, annars innehållshashen över källfilerna."""
+    snap = open_snapshot(folder)
+    return snap.taxonomy_version if snap else taxonomy_version(folder)
+
+
+class AnalysisCache:
+    """
+    Persistent diskcache för PDF-analyser.
+    Nyckeln är PDF:ens innehållshash plus taxonomiversionen, läsbudgeten (max_pages,
+    max_chars) och om ungefärlig matchning användes, så samma CV aldrig parsas om (t.ex. vid Streamlit-reruns) men en ny taxonomi
+    eller en annan budget automatiskt ger nya resultat.
+    Poster lagras som en JSON-fil var; LRU-ordningen följer filernas mtime. Katalogens storlek
+    räknas upp vid varje put och skannas bara när den passerar max_bytes, då de äldsta
+    posterna tas bort ner till LOW_WATER × max_bytes.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, version=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.version = version or current_taxonomy_version()
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._size = None  # uppskattad katalogstorlek; None = inte skannad än
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, pdf_bytes, max_pages=None, max_chars=None, fuzzy=False):
+        h = hashlib.sha256(pdf_bytes)
+        h.update(f"{self.version}:{DETECTOR_VERSION}:{max_pages}:{max_chars}:{int(fuzzy)}".encode('utf-8'))
+        return h.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        """Returnerar {'text', 'skill_ids', 'fuzzy_ids', 'pages', 'truncated'} eller None."""
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            os.utime(path)  # markera som senast använd
+        except (OSError, ValueError):
+            self.misses += 1
+            metrics.count('cache_misses')
+            return None
+        self.hits += 1
+        metrics.count('cache_hits')
+        return entry
+
+    def put(self, key, result):
+        entry = {'version': self.version, 'text': result['text'], 'skill_ids': list(result['skill_ids']),
+                 'fuzzy_ids': list(result.get('fuzzy_ids', [])),
+                 'pages': result.get('pages', []), 'truncated': result.get('truncated', False)}
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, path)  # atomiskt även med flera Streamlit-workers
+        if self._size is not None:
+            self._size += os.path.getsize(path)
+        if self._size is None or self._size > self.max_bytes:
+            self.evict()
+        return entry
+
+    def get_or_compute(self, pdf_bytes, compute, max_pages=None, max_chars=None, fuzzy=False):
+        """
+        Hämtar {'text', 'skill_ids', 'fuzzy_ids', 'pages', 'truncated'} från cachen eller
+        räknar fram dem med compute() (samma form som detect_pdf_skills). Tomma texter
+        (misslyckad läsning) cachas inte.
+        """
+        key = self.key(pdf_bytes, max_pages, max_chars, fuzzy)
+        entry = self.get(key)
+        if entry is not None:
+            return entry
+        result = compute()
+        if result['text']:
+            return self.put(key, result)
+        return result
+
+    def evict(self):
+        """
+        Skannar katalogen och tar bort de minst nyligen använda posterna tills den ryms
+        i LOW_WATER × max_bytes (andra processer kan ha skrivit, så storleken räknas om).
+        """
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as it:
+            for e in it:
+                if e.name.endswith('.json'):
+                    st = e.stat()
+                    entries.append((st.st_mtime, st.st_size, e.path))
+                    total += st.st_size
+        if total <= self.max_bytes:
+            self._size = total
+            return 0
+        target = self.max_bytes * LOW_WATER
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        self._size = total
+        return removed
@@ -0,0 +1,89 @@
+"""
+Yrkessegment ur SSYK: varje yrke -> SSYK-nivå 1 (segment) och nivå 2 (yrkesområde).
+
+Tillhörigheten härleds en gång ur the-ssyk-hierarchy-with-occupations.json, med koder
+och etiketter från ssyk-level-1/2-groups.json, till två heltalsvektorer (yrke -> grupp).
+En matchningsmängd grupperas sedan med np.bincount i stället för nyckelordssökning
+i yrkesnamnen per rendering.
+"""
+import numpy as np
+
+from catalog import TaxonomyCatalog
+
+OTHER = 0  # grupp för yrken som saknas i SSYK-hierarkin
+SOURCES = ('ssyk-level-1-groups', 'ssyk-level-2-groups', 'the-ssyk-hierarchy-with-occupations')
+
+
+class OccupationSegments:
+    """Yrkes-ID -> SSYK-1/SSYK-2-grupp som index i groups, byggt en gång ur katalogen."""
+
+    def __init__(self, catalog=None):
+        catalog = catalog if catalog is not None else TaxonomyCatalog()
+        self.version = catalog.version(*SOURCES)  # källfilernas stämplar, nyckel för figurcachen
+        codes = {c['id']: c.get('ssyk_code_2012', '') for name in SOURCES[:2] for c in catalog.concepts(name)}
+        self.groups = [{'id': None, 'code': '', 'label': 'Övriga yrken', 'level': 1, 'parent': None}]
+        group_index = {}
+        ancestors = {}  # SSYK-ID -> (SSYK-1-grupp, SSYK-2-grupp)
+        self.occupation_index = {}
+        level1, level2 = [], []
+
+        for node in catalog.flatten('the-ssyk-hierarchy-with-occupations'):
+            kind, parent = node['type'], node['parent']
+            if kind in ('ssyk-level-1', 'ssyk-level-2'):
+                group_index[node['id']] = len(self.groups)
+                self.groups.append({'id': node['id'], 'code': codes.get(node['id'], ''),
+                                    'label': node['label'], 'level': int(kind[-1]),
+                                    'parent': group_index.get(parent)})
+            if kind == 'ssyk-level-1':
+                ancestors[node['id']] = (group_index[node['id']], OTHER)
+            elif kind == 'ssyk-level-2':
+                ancestors[node['id']] = (ancestors[parent][0], group_index[node['id']])
+            elif parent in ancestors:
+                ancestors[node['id']] = ancestors[parent]
+                if kind in ('ssyk-level-4', 'occupation-name'):
+                    self.occupation_index[node['id']] = len(level1)
+                    level1.append(ancestors[parent][0])
+                    level2.append(ancestors[parent][1])
+
+        # Sista raden är "okänt yrke", så uppslag av saknade IDn inte behöver specialfall
+        self.level1 = np.array(level1 + [OTHER], dtype=np.int32)
+        self.level2 = np.array(level2 + [OTHER], dtype=np.int32)
+
+    def __len__(self):
+        return len(self.occupation_index)
+
+    def rows(self, occupation_ids):
+        unknown = len(self.occupation_index)
+        index = self.occupation_index
+        return np.fromiter((index.get(o, unknown) for o in occupation_ids), dtype=np.int64,
+                           count=len(occupation_ids))
+
+    def sunburst(self, occupation_ids, names, values):
+        """
+        Solfjäderdata segment -> yrkesområde -> yrke som parallella listor
+        (ids, names, parents, values); föräldrarnas värden är summan av barnens.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        keep = np.flatnonzero(values > 0)  # tomma noder får ingen plats i solfjädern
+        rows, values = self.rows([occupation_ids[i] for i in keep]), values[keep]
+        names = [names[i] for i in keep]
+        l1, l2 = self.level1[rows], self.level2[rows]
+        n = len(self.groups)
+        totals = np.bincount(l1, weights=values, minlength=n) + np.bincount(l2, weights=values, minlength=n)
+        totals[OTHER] = values[l1 == OTHER].sum()
+
+        groups = self.groups
+        used = np.flatnonzero(totals > 0)
+        ids = [f"g{g}" for g in used.tolist()]
+        labels = [groups[g]['label'] for g in used.tolist()]
+        parents = [f"g{groups[g]['parent']}" if groups[g]['parent'] is not None else "" for g in used.tolist()]
+        weights = totals[used].tolist()
+
+        # Yrket hänger under sitt yrkesområde, eller direkt under segmentet om området saknas
+        leaf_parents = np.where(l2 != OTHER, l2, l1)
+        ids += [f"o{i}" for i in range(len(rows))]
+        labels += names
+        parents += [f"g{g}" for g in leaf_parents.tolist()]
+        weights += values.tolist()
+        return ids, labels, parents, weights
+
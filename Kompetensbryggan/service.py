@@ -0,0 +1,407 @@
+"""
+Lokal matchningstjänst med varm taxonomi.
+
+Taxonomin laddas och indexeras en gång i en långlivad process som sedan delas av
+flera Streamlit-workers och batch-CLI:t över HTTP (TCP eller Unix-socket).
+Alla endpoints tar en lista med uppdrag, så en klient kan skicka många CV:n per anrop:
+
+    POST /detect_skills       {"items": [{"text": ... | "pdf": <base64>, "fuzzy": false}, ...]}
+    POST /score_occupations   {"items": [{"skill_ids": [...], "fuzzy_ids": [...], "top_k": 50, "details": 5}, ...]}
+    POST /gap_plan            {"items": [{"skill_ids": [...], "steps": 5}, ...]}
+    GET  /taxonomy            etiketter för kompetenser och yrken samt taxonomiversion
+    GET  /industries          SNI nivå 1 (kod -> branschnamn), parsas vid första anropet
+    GET  /metrics             Prometheus textformat (instrumentation.py); /metrics.json som JSON
+    GET  /health
+
+Svaren har formen {"results": [...]} i samma ordning som uppdragen.
+
+Usage:
+    python service.py                         # http://127.0.0.1:8765
+    python service.py --socket /tmp/kb.sock   # Unix-socket
+    KOMPETENSBRYGGAN_SERVICE=http://127.0.0.1:8765 streamlit run bryggan.py
+    python batch.py cv_mapp/ --service unix:///tmp/kb.sock
+"""
+import argparse
+import base64
+import http.client
+import io
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from bitset_profiles import BitsetProfiles
+from catalog import TaxonomyCatalog
+from sparse_engine import MatchMatrix
+from engine import get_registry
+from fuzzy import FUZZY_CREDIT, FuzzyMatcher
+from gap_analysis import GapAnalyzer
+from hierarchy import SkillHierarchy
+from instrumentation import metrics
+from loaders import detect_pdf_skills, load_jobtech_data
+from pdf_cache import AnalysisCache, current_taxonomy_version
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+ENDPOINTS = ('detect_skills', 'score_occupations', 'gap_plan')
+
+
+# ── TJÄNST ────────────────────────────────────────────────────────────────────
+
+class MatchingService:
+    """
+    Detektering, poängsättning och gapanalys över en laddad taxonomi.
+    Samma gränssnitt som MatchingClient, så UI:t kan köra den i processen eller via tjänsten.
+    Färdiga komponenter kan skickas in (t.ex. Streamlits cache_resource-objekt);
+    annars byggs de från db.
+    """
+
+    def __init__(self, db=None, matcher=None, fuzzy=None, profiles=None, hierarchy=None, gap=None,
+                 cache=None, version=None, page_workers=1, matrix=None, catalog=None):
+        db = load_jobtech_data() if db is None else db
+        self.db = db
+        self.matcher = matcher if matcher is not None else get_registry(db).matcher  # en automat per process
+        self.fuzzy = fuzzy if fuzzy is not None else db.get('fuzzy') or FuzzyMatcher(db['skills'])
+        self.profiles = profiles if profiles is not None else db.get('profiles') or BitsetProfiles(db['relations'])
+        self.hierarchy = hierarchy if hierarchy is not None else db.get('ancestry') or SkillHierarchy(db['hierarchy'])
+        self.gap = gap if gap is not None else GapAnalyzer(self.profiles)
+        self.matrix = matrix if matrix is not None else MatchMatrix(db['relations'])  # flera CV:n per anrop
+        if self.matrix.occupation_ids != self.profiles.occupation_ids:
+            raise ValueError("MatchMatrix och profilerna måste byggas från samma relationer")
+        self.catalog = catalog if catalog is not None else TaxonomyCatalog()  # SNI m.fl., parsas vid behov
+        self.cache = cache  # AnalysisCache för PDF-uppdrag, valfri
+        self.page_workers = page_workers  # > 1: långa PDF:er extraheras i en processpool
+        self.version = version or current_taxonomy_version()
+
+    def taxonomy(self):
+        return {
+            'version': self.version,
+            'skills': self.db.get('skills', {}),
+            'jobs': self.db.get('jobs', {}),
+        }
+
+    def industries(self):
+        """SNI nivå 1: {kod: branschnamn} (nivå 1 saknar ID:n). Parsas först när någon frågar."""
+        return self.catalog.labels('sni-level-1') if 'sni-level-1' in self.catalog else {}
+
+    def _detect(self, item):
+        # Ungefärlig matchning är opt-in: den kostar ett flertal gånger den exakta automaten
+        fuzzy = self.fuzzy if item.get('fuzzy', False) else None
+        if 'text' in item:
+            with metrics.timer('detect'):
+                skill_ids = self.matcher.find_ids(item['text'])
+            approximate = set()
+            if fuzzy is not None:
+                with metrics.timer('detect_fuzzy'):
+                    approximate = fuzzy.find_ids(item['text'], skill_ids)
+                skill_ids |= approximate
+            metrics.count('chars_scanned', len(item['text']))
+            metrics.count('skills_detected', len(skill_ids))
+            ordered = sorted(skill_ids, key=self.matcher.order.__getitem__)
+            return {'skill_ids': ordered, 'fuzzy_ids': [s for s in ordered if s in approximate]}
+
+        def analyze():
+            return detect_pdf_skills(io.BytesIO(item['pdf']), self.matcher, item.get('max_pages'),
+                                     item.get('max_chars'), self.page_workers, fuzzy=fuzzy)
+
+        if self.cache is not None:
+            pdf = self.cache.get_or_compute(item['pdf'], analyze, item.get('max_pages'), item.get('max_chars'),
+                                            fuzzy=fuzzy is not None)
+        else:
+            pdf = analyze()
+        return {f: pdf[f] for f in ('text', 'skill_ids', 'fuzzy_ids', 'pages', 'truncated')}
+
+    def detect_skills(self, items):
+        """
+        [{'text'} | {'pdf': bytes, 'max_pages', 'max_chars'}, 'fuzzy'] -> [{'skill_ids', 'fuzzy_ids', ...} | {'error'}].
+        fuzzy=True lägger till böjningar och stavfel (FuzzyMatcher); de listas även i 'fuzzy_ids'.
+        """
+        results = []
+        for item in items:
+            try:
+                results.append(self._detect(item))
+            except Exception as e:
+                metrics.error('detect', "Detektering misslyckades")
+                results.append({'error': str(e)})
+        return results
+
+    def _credits(self, item):
+        # Ungefärliga träffar (fuzzy_ids från detect_skills) ger FUZZY_CREDIT i stället för full kredit
+        approximate = set(item.get('fuzzy_ids', ()))
+        return self.hierarchy.expand(set(item['skill_ids']) - approximate, item.get('decay'),
+                                     dict.fromkeys(approximate, FUZZY_CREDIT))
+
+    def score_occupations(self, items):
+        """
+        [{'skill_ids', 'fuzzy_ids', 'top_k' (None = alla), 'details' (antal med träffar/saknade), 'decay'}]
+        -> [{'total', 'matches': [{'id', 'score'}], 'details': [{'id', 'score', 'hits', 'inherited', 'missing'}]}].
+        Yrkena sorteras på poäng, lika poäng i relationsordning. Ett ensamt CV poängsätts med
+        bitmängderna (indexgallrat); flera CV:n med en gles matrisprodukt (MatchMatrix).
+        """
+        profiles = self.profiles
+        requests = [(set(item['skill_ids']), self._credits(item)) for item in items]
+        t0 = time.perf_counter()
+        if len(requests) > 1:
+            # Flera CV:n: en gles matrisprodukt för hela anropet (samma radordning som profilerna)
+            all_scores = self.matrix.score_batches([credits for _, credits in requests])
+        else:
+            all_scores = (profiles.score_vector(my_ids, credits) for my_ids, credits in requests)
+        results = []
+        for item, (my_ids, credits), scores in zip(items, requests, all_scores):
+            rows = np.flatnonzero(scores > 0)
+            rows = rows[np.argsort(-scores[rows], kind='stable')]
+            top_k = item.get('top_k')
+            shown = rows if top_k is None else rows[:top_k]
+            details = profiles.details(rows[:item.get('details', 0)], my_ids, credits,
+                                       scores * profiles.requirement_counts)
+            metrics.count('occupations_scored', len(profiles))
+            metrics.count('occupations_touched', len(rows))
+            results.append({
+                'total': len(rows),
+                'matches': [{'id': profiles.occupation_ids[r], 'score': float(scores[r])} for r in shown.tolist()],
+                'details': [{**d, 'score': float(d['score'])} for d in details],
+            })
+        metrics.observe('score', time.perf_counter() - t0)
+        return results
+
+    def gap_plan(self, items):
+        """[{'skill_ids', 'fuzzy_ids', 'steps', 'decay'}] -> [[{'id', 'unlocks', 'gain', 'occupations', ...}]]."""
+        results = []
+        for item in items:
+            with metrics.timer('gap'):
+                results.append(self.gap.plan(set(item['skill_ids']), self._credits(item), steps=item.get('steps', 5)))
+        return results
+
+    def metrics(self):
+        """Processens mätvärden (instrumentation.Metrics.snapshot)."""
+        return metrics.snapshot()
+
+
+# ── HTTP-SERVER ───────────────────────────────────────────────────────────────
+
+def _validate(endpoint, items):
+    """Kontrollerar uppdragens form före anropet; ValueError blir 400 i stället för en krasch i tråden."""
+    if not isinstance(items, list):
+        raise ValueError("'items' måste vara en lista")
+    for i, item in enumerate(items):
+        if not isinstance(item, dict):
+            raise ValueError(f"uppdrag {i} måste vara ett objekt")
+        if endpoint == 'detect_skills':
+            if not isinstance(item.get('text'), str) and not isinstance(item.get('pdf'), str):
+                raise ValueError(f"uppdrag {i} saknar 'text' eller 'pdf'")
+            if not isinstance(item.get('fuzzy', False), bool):
+                raise ValueError(f"uppdrag {i}: 'fuzzy' måste vara true eller false")
+        else:
+            if not isinstance(item.get('skill_ids'), list) or not all(isinstance(s, str) for s in item['skill_ids']):
+                raise ValueError(f"uppdrag {i} saknar 'skill_ids' (lista med kompetens-IDn)")
+            fuzzy_ids = item.get('fuzzy_ids', [])
+            if not isinstance(fuzzy_ids, list) or not all(isinstance(s, str) for s in fuzzy_ids):
+                raise ValueError(f"uppdrag {i}: 'fuzzy_ids' måste vara en lista med kompetens-IDn")
+        for field in ('top_k', 'details', 'steps', 'max_pages', 'max_chars'):
+            value = item.get(field)
+            if value is not None and (type(value) is not int or value < 0):
+                raise ValueError(f"uppdrag {i}: '{field}' måste vara ett icke-negativt heltal")
+        decay = item.get('decay')
+        if decay is not None and (type(decay) not in (int, float) or decay < 0):
+            raise ValueError(f"uppdrag {i}: 'decay' måste vara ett icke-negativt tal")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive: klienterna återanvänder anslutningen
+    service = None
+    verbose = False
+
+    def address_string(self):
+        return self.client_address[0] if self.client_address else 'unix'
+
+    def log_message(self, fmt, *args):
+        if self.verbose:
+            super().log_message(fmt, *args)
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False, default=dict).encode('utf-8')  # snapshotvyer är Mappings
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == '/health':
+            self._reply(200, {'status': 'ok', 'version': self.service.version})
+        elif self.path == '/taxonomy':
+            self._reply(200, self.service.taxonomy())
+        elif self.path == '/industries':
+            self._reply(200, self.service.industries())
+        elif self.path == '/metrics':
+            body = metrics.prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif self.path == '/metrics.json':
+            self._reply(200, self.service.metrics())
+        else:
+            self._reply(404, {'error': f"Okänd sökväg: {self.path}"})
+
+    def do_POST(self):
+        endpoint = self.path.strip('/')
+        if endpoint not in ENDPOINTS:
+            self._reply(404, {'error': f"Okänd endpoint: {self.path}"})
+            return
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            items = body['items']
+            _validate(endpoint, items)
+            if endpoint == 'detect_skills':
+                items = [{**item, 'pdf': base64.b64decode(item['pdf'], validate=True)} if 'pdf' in item else item
+                         for item in items]
+        except (ValueError, KeyError, TypeError) as e:
+            self._reply(400, {'error': f"Ogiltig förfrågan: {e}"})
+            return
+        t0 = time.perf_counter()
+        try:
+            results = getattr(self.service, endpoint)(items)
+        except Exception as e:
+            metrics.error(endpoint, "Förfrågan misslyckades")
+            self._reply(500, {'error': str(e)})
+            return
+        metrics.memory(endpoint)
+        self._reply(200, {'results': results, 'seconds': round(time.perf_counter() - t0, 4)})
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def make_server(service, host=DEFAULT_HOST, port=DEFAULT_PORT, socket_path=None, verbose=False):
+    handler = type('Handler', (_Handler,), {'service': service, 'verbose': verbose})
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)  # kvarlämnad socket från en tidigare körning
+        return _UnixHTTPServer(socket_path, handler)
+    return ThreadingHTTPServer((host, port), handler)
+
+
+# ── KLIENT ────────────────────────────────────────────────────────────────────
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout):
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class MatchingClient:
+    """
+    Klient mot matchningstjänsten, med samma metoder som MatchingService.
+    url: 'http://värd:port' eller 'unix:///sökväg/till.sock'. En anslutning per tråd återanvänds.
+    """
+
+    def __init__(self, url, timeout=120):
+        self.url = url
+        self.timeout = timeout
+        self._local = threading.local()
+        self._taxonomy = None
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            if self.url.startswith('unix://'):
+                conn = _UnixHTTPConnection(self.url[len('unix://'):], self.timeout)
+            else:
+                host = self.url.split('://', 1)[-1].rstrip('/')
+                conn = http.client.HTTPConnection(host, timeout=self.timeout)
+            self._local.conn = conn
+        return conn
+
+    def _request(self, method, path, payload=None):
+        body = None if payload is None else json.dumps(payload).encode('utf-8')
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        for attempt in (1, 2):
+            conn = self._connection()
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+                data = json.loads(response.read())
+                break
+            except (ConnectionError, http.client.HTTPException, socket.timeout):
+                # Servern kan ha stängt en vilande keep-alive-anslutning: försök en gång till
+                conn.close()
+                self._local.conn = None
+                if attempt == 2:
+                    raise
+        if response.status != 200:
+            raise RuntimeError(f"Matchningstjänsten svarade {response.status}: {data.get('error')}")
+        return data
+
+    @property
+    def version(self):
+        return self.taxonomy()['version']
+
+    def health(self):
+        return self._request('GET', '/health')
+
+    def taxonomy(self):
+        if self._taxonomy is None:
+            self._taxonomy = self._request('GET', '/taxonomy')
+        return self._taxonomy
+
+    def industries(self):
+        return self._request('GET', '/industries')
+
+    def metrics(self):
+        return self._request('GET', '/metrics.json')
+
+    def detect_skills(self, items):
+        items = [{**item, 'pdf': base64.b64encode(item['pdf']).decode('ascii')} if 'pdf' in item else item
+                 for item in items]
+        return self._request('POST', '/detect_skills', {'items': items})['results']
+
+    def score_occupations(self, items):
+        return self._request('POST', '/score_occupations', {'items': items})['results']
+
+    def gap_plan(self, items):
+        return self._request('POST', '/gap_plan', {'items': items})['results']
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lokal matchningstjänst med varm taxonomi")
+    parser.add_argument('--host', default=DEFAULT_HOST, help=f"Adress (default: {DEFAULT_HOST})")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f"Port (default: {DEFAULT_PORT})")
+    parser.add_argument('--socket', default=None, help="Lyssna på en Unix-socket i stället för TCP")
+    parser.add_argument('--cache-dir', default=None, help="Diskcache för PDF-analyser (pdf_cache.py)")
+    parser.add_argument('--page-workers', type=int, default=1,
+                        help="Processer per PDF för sidextrahering av långa dokument (default: 1)")
+    parser.add_argument('--verbose', action='store_true', help="Logga varje förfrågan")
+    args = parser.parse_args()
+
+    t0 = time.time()
+    cache = AnalysisCache(args.cache_dir) if args.cache_dir else None
+    service = MatchingService(cache=cache, page_workers=args.page_workers)
+    server = make_server(service, args.host, args.port, args.socket, args.verbose)
+    metrics.memory('load')
+    where = f"unix://{args.socket}" if args.socket else f"http://{args.host}:{args.port}"
+    print(f"✅ Matchningstjänst redo på {where} (taxonomi {service.version}, {time.time() - t0:.1f} s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if args.socket and os.path.exists(args.socket):
+            os.remove(args.socket)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,419 @@
+"""
+Kompilerad binär taxonomi-snapshot.
+
+Läser JobTech-filernas "data -> concepts"-kuvert en gång och skriver en versionerad
+binärfil med internerade strängar, heltalskodade grannlistor (CSR), en etikett-tabell
+och trigram-indexet för ungefärlig kompetensmatchning (fuzzy.py).
+Laddarna memory-mappar sedan filen i stället för att parsa JSON vid varje kallstart,
+och flera processer delar samma sidor i operativsystemets cache. Uppslagen görs
+direkt i mappningen (binärsökning över ID:n sorterade vid kompileringen), så
+etiketter, hierarki och relationer aldrig kopieras till Python-dictar i sin helhet.
+
+Usage:
+    python snapshot.py compile          # bygger taxonomy.snapshot
+    python snapshot.py info             # visar version och storlekar
+"""
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import struct
+import time
+from array import array
+from collections.abc import Mapping, Sequence
+
+from fuzzy import FuzzyMatcher
+from jsonstream import iter_concepts
+
+FORMAT_VERSION = 3  # 3: sorterade ID-index för uppslag i mappningen, ingen SNI-sektion
+MAGIC = b'KBSNAP\x00\x00'
+SNAPSHOT_NAME = 'taxonomy.snapshot'
+
+_HEADER = struct.Struct('<8sII')       # magic, formatversion, antal sektioner
+_TOC_ENTRY = struct.Struct('<16sc7xQQ')  # namn, typkod, offset, antal element
+
+CURRENT_FOLDER = os.path.dirname(os.path.abspath(__file__))
+
+# Källfiler som ingår i snapshoten (saknade filer hoppas över)
+SOURCE_FILES = (
+    'skills.json',
+    'the-ssyk-hierarchy-with-occupations.json',
+    'concepts-and-common-relations.json',
+)
+
+RELATION_FIELDS = ('related', 'broader', 'close_match', 'exact_match')
+
+
+# ── KÄLLOR ────────────────────────────────────────────────────────────────────
+
+def _source_paths(folder):
+    return [os.path.join(folder, name) for name in SOURCE_FILES]
+
+
+def source_fingerprint(folder=CURRENT_FOLDER):
+    """Billigt fingeravtryck (namn, storlek, mtime) för att upptäcka inaktuella snapshots."""
+    parts = []
+    for path in _source_paths(folder):
+        if os.path.exists(path):
+            st = os.stat(path)
+            parts.append(f"{os.path.basename(path)}:{st.st_size}:{st.st_mtime_ns}")
+    return hashlib.sha1("|".join(parts).encode('utf-8')).hexdigest()
+
+
+def taxonomy_version(folder=CURRENT_FOLDER):
+    """Innehållshash över källfilerna. Identisk taxonomi ger samma version oavsett mtime."""
+    h = hashlib.sha256()
+    for path in _source_paths(folder):
+        if not os.path.exists(path):
+            continue
+        h.update(os.path.basename(path).encode('utf-8'))
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+    return h.hexdigest()[:16]
+
+
+def read_sources(folder=CURRENT_FOLDER):
+    """Läser råfilerna till samma strukturer som laddarna bygger."""
+    tax = {'skills': {}, 'hierarchy': {}, 'jobs': {}, 'relations': []}
+
+    path = os.path.join(folder, 'skills.json')
+    if os.path.exists(path):
+        for s in iter_concepts(path):
+            if 'id' not in s:
+                continue
+            s_id = str(s['id'])
+            tax['skills'][s_id] = s.get('preferred_label', '')
+            parents = [str(b['id']) for b in s.get('broader', []) if 'id' in b]
+            if parents:
+                tax['hierarchy'][s_id] = parents
+
+    path = os.path.join(folder, 'the-ssyk-hierarchy-with-occupations.json')
+    if os.path.exists(path):
+        stack = list(iter_concepts(path))
+        while stack:
+            node = stack.pop()
+            if node.get('type') in ('occupation', 'occupation-name'):
+                tax['jobs'][str(node['id'])] = node.get('preferred_label', '')
+            stack.extend(node.get('narrower', []))
+
+    path = os.path.join(folder, 'concepts-and-common-relations.json')
+    if os.path.exists(path):
+        for c in iter_concepts(path):
+            if c.get('type') != 'occupation-name':
+                continue
+            c_id = str(c.get('id'))
+            tax['jobs'][c_id] = c.get('preferred_label') or tax['jobs'].get(c_id, '')
+            rel_ids = []
+            for field in RELATION_FIELDS:
+                rel_ids.extend(str(r['id']) for r in c.get(field, []) if 'id' in r)
+            if rel_ids:
+                tax['relations'].append((c_id, list(dict.fromkeys(rel_ids))))
+
+    return tax
+
+
+# ── KOMPILERING ───────────────────────────────────────────────────────────────
+
+class _StringTable:
+    def __init__(self):
+        self.index = {}
+        self.offsets = array('I', [0])
+        self.data = bytearray()
+
+    def intern(self, value):
+        idx = self.index.get(value)
+        if idx is None:
+            idx = len(self.index)
+            self.index[value] = idx
+            self.data += value.encode('utf-8')
+            self.offsets.append(len(self.data))
+        return idx
+
+
+def _csr(rows, strings):
+    ptr, idx = array('I', [0]), array('I')
+    for targets in rows:
+        idx.extend(strings.intern(t) for t in targets)
+        ptr.append(len(idx))
+    return ptr, idx
+
+
+def compile_snapshot(folder=CURRENT_FOLDER, out_path=None):
+    """Bygger snapshot-filen från källfilerna och returnerar sökvägen."""
+    out_path = out_path or os.path.join(folder, SNAPSHOT_NAME)
+    t0 = time.time()
+    tax = read_sources(folder)
+    strings = _StringTable()
+    sections = {}
+
+    def keys(name, ids):
+        # Radordningen bevaras; {name}_order är raderna sorterade på ID för binärsökning
+        ids = list(ids)
+        sections[name] = array('I', (strings.intern(k) for k in ids))
+        sections[f'{name}_order'] = array('I', sorted(range(len(ids)), key=ids.__getitem__))
+
+    def id_label(prefix, mapping):
+        keys(f'{prefix}_id', mapping)
+        sections[f'{prefix}_label'] = array('I', (strings.intern(v or '') for v in mapping.values()))
+
+    id_label('skill', tax['skills'])
+    id_label('job', tax['jobs'])
+
+    hier = list(tax['hierarchy'].items())
+    keys('hier_child', (k for k, _ in hier))
+    sections['hier_ptr'], sections['hier_idx'] = _csr((v for _, v in hier), strings)
+
+    keys('rel_occ', (k for k, _ in tax['relations']))
+    sections['rel_ptr'], sections['rel_idx'] = _csr((v for _, v in tax['relations']), strings)
+    sections.update(FuzzyMatcher(tax['skills']).sections(strings.intern))
+
+    meta = {
+        'format_version': FORMAT_VERSION,
+        'taxonomy_version': taxonomy_version(folder),
+        'source_fingerprint': source_fingerprint(folder),
+        'compiled_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'counts': {k: len(tax[k]) for k in tax},
+    }
+    sections['str_off'] = strings.offsets
+    sections['str_data'] = bytes(strings.data)
+    sections['meta'] = json.dumps(meta, ensure_ascii=False).encode('utf-8')
+
+    _write(out_path, sections)
+    size_kb = os.path.getsize(out_path) / 1024
+    print(f"✅ Snapshot: {out_path} ({size_kb:.0f} KB, {len(strings.index):,} strängar, "
+          f"{time.time() - t0:.1f} s)")
+    return out_path
+
+
+def _write(out_path, sections):
+    toc_size = _HEADER.size + _TOC_ENTRY.size * len(sections)
+    offset = (toc_size + 7) & ~7
+    toc, blobs = [], []
+    for name, payload in sections.items():
+        if isinstance(payload, array):
+            typecode, raw, count = payload.typecode.encode(), payload.tobytes(), len(payload)
+        else:
+            typecode, raw, count = b'B', payload, len(payload)
+        toc.append(_TOC_ENTRY.pack(name.encode('ascii'), typecode, offset, count))
+        pad = (-len(raw)) % 8
+        blobs.append(raw + b'\x00' * pad)
+        offset += len(raw) + pad
+
+    tmp_path = out_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(sections)))
+        f.write(b''.join(toc))
+        f.write(b'\x00' * (((toc_size + 7) & ~7) - toc_size))
+        for blob in blobs:
+            f.write(blob)
+    os.replace(tmp_path, out_path)  # atomiskt: läsare ser aldrig en halvskriven fil
+
+
+# ── LÄSNING ───────────────────────────────────────────────────────────────────
+
+class TaxonomySnapshot:
+    """Memory-mappad vy över en kompilerad snapshot. Arrayerna läses direkt ur mappningen."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buf = memoryview(self._mm)
+        magic, version, n_sections = _HEADER.unpack_from(buf, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} är inte en Kompetensbryggan-snapshot")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"{path} har formatversion {version}, förväntade {FORMAT_VERSION}")
+
+        self._sections = {}
+        for i in range(n_sections):
+            name, typecode, offset, count = _TOC_ENTRY.unpack_from(buf, _HEADER.size + i * _TOC_ENTRY.size)
+            name = name.rstrip(b'\x00').decode('ascii')
+            view = buf[offset:offset + count * array(typecode.decode()).itemsize]
+            self._sections[name] = view.cast(typecode.decode()) if typecode != b'B' else view
+
+        self.meta = json.loads(bytes(self._sections['meta']).decode('utf-8'))
+        self._str_off = self._sections['str_off']
+        self._str_data = self._sections['str_data']
+
+    @property
+    def taxonomy_version(self):
+        return self.meta['taxonomy_version']
+
+    def section(self, name):
+        return self._sections[name]
+
+    def string(self, idx):
+        return self.raw(idx).decode('utf-8')
+
+    def raw(self, idx):
+        return bytes(self._str_data[self._str_off[idx]:self._str_off[idx + 1]])
+
+    def row(self, keys, key):
+        """Radindex för key i en nyckelsektion (binärsökning över {keys}_order), annars None."""
+        ids, order = self._sections[keys], self._sections[f'{keys}_order']
+        target = key.encode('utf-8')  # UTF-8-ordning = kodpunktsordning, samma som sorteringen
+        lo, hi = 0, len(order)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.raw(ids[order[mid]]) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(order) and self.raw(ids[order[lo]]) == target:
+            return order[lo]
+        return None
+
+    def skills(self):
+        """{kompetens-ID: etikett} som vy över mappningen."""
+        return _Labels(self, 'skill')
+
+    def jobs(self):
+        return _Labels(self, 'job')
+
+    def hierarchy(self):
+        """{barn-ID: [föräldra-IDn]} som vy över mappningen."""
+        return _Adjacency(self, 'hier_child', 'hier_ptr', 'hier_idx')
+
+    def relations(self):
+        """Relationer i samma form som db['relations']: [{'id', 'relations': [{'id'}]}], avkodade per rad."""
+        return _Relations(self)
+
+    def fuzzy_matcher(self):
+        return FuzzyMatcher.from_snapshot(self)
+
+    def is_stale(self, folder=CURRENT_FOLDER):
+        return self.meta.get('source_fingerprint') != source_fingerprint(folder)
+
+
+class _Labels(Mapping):
+    """ID -> etikett ur en snapshot; iterationen följer källfilens ordning."""
+
+    def __init__(self, snap, prefix):
+        self._snap = snap
+        self._keys = f'{prefix}_id'
+        self._ids = snap.section(self._keys)
+        self._labels = snap.section(f'{prefix}_label')
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __iter__(self):
+        string = self._snap.string
+        return (string(k) for k in self._ids)
+
+    def __getitem__(self, key):
+        row = self._snap.row(self._keys, key) if isinstance(key, str) else None
+        if row is None:
+            raise KeyError(key)
+        return self._snap.string(self._labels[row])
+
+    def items(self):
+        string = self._snap.string
+        return ((string(k), string(v)) for k, v in zip(self._ids, self._labels))
+
+    def values(self):
+        string = self._snap.string
+        return (string(v) for v in self._labels)
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+
+class _Adjacency(Mapping):
+    """Nyckel -> [grann-IDn] ur en CSR-sektion i snapshoten."""
+
+    def __init__(self, snap, keys, ptr, idx):
+        self._snap = snap
+        self._keys = keys
+        self._ids, self._ptr, self._idx = snap.section(keys), snap.section(ptr), snap.section(idx)
+
+    def _targets(self, row):
+        string = self._snap.string
+        return [string(t) for t in self._idx[self._ptr[row]:self._ptr[row + 1]]]
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __iter__(self):
+        string = self._snap.string
+        return (string(k) for k in self._ids)
+
+    def __getitem__(self, key):
+        row = self._snap.row(self._keys, key) if isinstance(key, str) else None
+        if row is None:
+            raise KeyError(key)
+        return self._targets(row)
+
+    def items(self):
+        string = self._snap.string
+        return ((string(k), self._targets(row)) for row, k in enumerate(self._ids))
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+
+class _Relations(Sequence):
+    """db['relations'] ur snapshoten: raderna avkodas när de läses, inget hålls kvar."""
+
+    def __init__(self, snap):
+        self._adjacency = _Adjacency(snap, 'rel_occ', 'rel_ptr', 'rel_idx')
+        self._string = snap.string
+
+    def __len__(self):
+        return len(self._adjacency)
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [self[i] for i in range(*row.indices(len(self)))]
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError(row)
+        return {'id': self._string(self._adjacency._ids[row]),
+                'relations': [{'id': s} for s in self._adjacency._targets(row)]}
+
+    def __iter__(self):
+        for occ, skills in self._adjacency.items():
+            yield {'id': occ, 'relations': [{'id': s} for s in skills]}
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+def open_snapshot(folder=CURRENT_FOLDER, path=None):
+    """Öppnar snapshoten om den finns och är aktuell, annars None (laddarna faller då tillbaka på JSON)."""
+    path = path or os.path.join(folder, SNAPSHOT_NAME)
+    if not os.path.exists(path):
+        return None
+    try:
+        snap = TaxonomySnapshot(path)
+    except (ValueError, OSError, KeyError) as e:
+        print(f"⚠ Ignorerar snapshot {path}: {e}")
+        return None
+    if snap.is_stale(folder):
+        print(f"⚠ Snapshot {path} är inaktuell, kör 'python snapshot.py compile'")
+        return None
+    return snap
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kompilerar JobTech-taxonomin till en binär snapshot")
+    parser.add_argument('command', choices=['compile', 'info'])
+    parser.add_argument('--folder', default=CURRENT_FOLDER, help="Mapp med JobTech-filerna")
+    parser.add_argument('--out', default=None, help=f"Utfil (default: <folder>/{SNAPSHOT_NAME})")
+    args = parser.parse_args()
+
+    if args.command == 'compile':
+        compile_snapshot(args.folder, args.out)
+    else:
+        path = args.out or os.path.join(args.folder, SNAPSHOT_NAME)
+        snap = TaxonomySnapshot(path)
+        print(json.dumps(snap.meta, indent=2, ensure_ascii=False))
+        print(f"Aktuell: {'nej' if snap.is_stale(args.folder) else 'ja'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+import numpy as np
+import scipy.sparse as sp
+
+
+class MatchMatrix:
+    """
+    Vektoriserad matchningsmotor för batchkörningar (t.ex. omställningskohorter);
+    används av batch.py per worker-uppdrag och av tjänstens score_occupations för flera CV:n.
+    Yrke -> kompetens-relationerna kodas som en binär CSR-matris (yrken × kompetenser)
+    och varje CV som en gles kompetensvektor. N CV:n poängsätts mot alla yrken
+    med en enda gles matrisprodukt.
+    """
+
+    def __init__(self, relations):
+        # relations: db['relations'] från loaders.load_jobtech_data
+        self.occupation_ids = []
+        self.skill_ids = []
+        self.skill_index = {}
+        indptr, indices = [0], []
+
+        for rel in relations:
+            cols = {self._column(r['id']) for r in rel.get('relations', [])}
+            if not cols:
+                continue
+            self.occupation_ids.append(rel['id'])
+            indices.extend(sorted(cols))
+            indptr.append(len(indices))
+
+        shape = (len(self.occupation_ids), len(self.skill_ids))
+        self.matrix = sp.csr_matrix(
+            (np.ones(len(indices), dtype=np.float64), np.asarray(indices, dtype=np.int32), indptr),
+            shape=shape,
+        )
+        # Antal krav per yrke (nämnaren i len(hits) / len(job_skills))
+        self.requirement_counts = np.diff(self.matrix.indptr).astype(np.float64)
+
+    def _column(self, s_id):
+        col = self.skill_index.get(s_id)
+        if col is None:
+            col = len(self.skill_ids)
+            self.skill_index[s_id] = col
+            self.skill_ids.append(s_id)
+        return col
+
+    @property
+    def shape(self):
+        return self.matrix.shape
+
+    def encode(self, cv_skill_sets):
+        """
+        Kodar en lista av kompetens-ID-mängder som en gles (N × kompetenser)-matris.
+        En mängd kan också vara {kompetens-ID: kredit} från SkillHierarchy.expand.
+        """
+        indptr, indices, values = [0], [], []
+        for skill_ids in cv_skill_sets:
+            weights = skill_ids if isinstance(skill_ids, dict) else dict.fromkeys(skill_ids, 1.0)
+            cols = {self.skill_index[s]: w for s, w in weights.items() if s in self.skill_index}
+            for col in sorted(cols):
+                indices.append(col)
+                values.append(cols[col])
+            indptr.append(len(indices))
+        return sp.csr_matrix(
+            (np.asarray(values, dtype=np.float64), np.asarray(indices, dtype=np.int32), indptr),
+            shape=(len(indptr) - 1, len(self.skill_ids)),
+        )
+
+    def hit_counts(self, cv_matrix):
+        """Antal träffade krav per (CV, yrke) som gles matris."""
+        return (cv_matrix @ self.matrix.T).tocsr()
+
+    def score(self, cv_matrix):
+        """Täta poäng (N × yrken) = (viktade) träffar / antal krav, som OccupationIndex.score."""
+        return self.hit_counts(cv_matrix).toarray() / self.requirement_counts
+
+    def score_batches(self, cv_skill_sets, batch_size=256):
+        """
+        Täta poängrader (en per CV, i yrkesordning) – en gles matrisprodukt per batch,
+        så den täta poängmatrisen aldrig blir större än batch_size × yrken.
+        """
+        cv_skill_sets = list(cv_skill_sets)
+        for start in range(0, len(cv_skill_sets), batch_size):
+            yield from self.score(self.encode(cv_skill_sets[start:start + batch_size]))
+
+    def top_k(self, cv_skill_sets, k=5, batch_size=256):
+        """Returnerar för varje CV de k bästa yrkena som [(yrkes-ID, poäng)], bäst först."""
+        return [self._select(row, k) for row in self.score_batches(cv_skill_sets, batch_size)]
+
+    def _select(self, row, k):
+        n_pos = int(np.count_nonzero(row))
+        k = min(k, n_pos)
+        if k == 0:
+            return []
+        kth = row[np.argpartition(-row, k - 1)[k - 1]]
+        # Lika poäng vid gränsen avgörs av relationsordningen, som BitsetProfiles.top_k
+        above = np.flatnonzero(row > kth)
+        tied = np.flatnonzero(row == kth)[:k - len(above)]
+        top = np.concatenate([above, tied])
+        top = top[np.lexsort((top, -row[top]))]
+        return [(self.occupation_ids[i], float(row[i])) for i in top]
@@ -0,0 +1,186 @@
+"""
+Karriärövergångar över AF:s släktskapsdata (substitutability-relations-between-occupations.json).
+
+Grafen lagras som kompakta grannlistor (CSR): yrke -> yrken det kan ersätta, med vikten
+substitutability_percentage / 100. En stegvis väg värderas som produkten av vikterna,
+dvs. sannolikheten att varje steg i kedjan är en realistisk övergång.
+
+Usage:
+    python transitions.py "Elevassistent" --steps 2 --top 10
+"""
+import argparse
+import heapq
+import math
+import os
+from array import array
+
+from jsonstream import iter_concepts
+
+CURRENT_FOLDER = os.path.dirname(os.path.abspath(__file__))
+SUBSTITUTABILITY_FILE = os.path.join(CURRENT_FOLDER, 'substitutability-relations-between-occupations.json')
+
+
+class TransitionGraph:
+    """Riktad, viktad övergångsgraf med heltalskodade noder."""
+
+    def __init__(self, path=SUBSTITUTABILITY_FILE):
+        self.ids = []
+        self.labels = []
+        self.node = {}
+        edges = {}  # (från, till) -> vikt
+
+        for c in iter_concepts(path):
+            src = self._intern(c['id'], c.get('preferred_label', ''))
+            # 'substitutes': yrken som den här yrkesgruppen kan ersätta, dvs. möjliga nästa steg
+            for r in c.get('substitutes', []):
+                dst = self._intern(r['id'], r.get('preferred_label', ''))
+                w = r.get('substitutability_percentage', 0) / 100
+                if w > edges.get((src, dst), 0):
+                    edges[(src, dst)] = w
+            # 'substituted_by' är samma relation sedd från andra hållet
+            for r in c.get('substituted_by', []):
+                dst = self._intern(r['id'], r.get('preferred_label', ''))
+                w = r.get('substitutability_percentage', 0) / 100
+                if w > edges.get((dst, src), 0):
+                    edges[(dst, src)] = w
+
+        # CSR: grannar för nod i ligger i targets[offsets[i]:offsets[i + 1]], sorterade på vikt
+        by_src = [[] for _ in self.ids]
+        for (src, dst), w in edges.items():
+            by_src[src].append((w, dst))
+        self.offsets = array('I', [0])
+        self.targets = array('I')
+        self.weights = array('f')
+        for neighbours in by_src:
+            neighbours.sort(key=lambda e: (-e[0], e[1]))
+            self.targets.extend(dst for _, dst in neighbours)
+            self.weights.extend(w for w, _ in neighbours)
+            self.offsets.append(len(self.targets))
+
+        self.next_moves = {}  # (nod, steg, strålbredd) -> förberäknade topp-N för heta yrken
+
+    def _intern(self, occ_id, label):
+        idx = self.node.get(occ_id)
+        if idx is None:
+            idx = len(self.ids)
+            self.node[occ_id] = idx
+            self.ids.append(occ_id)
+            self.labels.append(label)
+        elif label and not self.labels[idx]:
+            self.labels[idx] = label
+        return idx
+
+    def __len__(self):
+        return len(self.ids)
+
+    def resolve(self, occupation):
+        """Tar ett yrkes-ID eller en etikett (skiftlägesokänslig) och returnerar nodindex."""
+        if occupation in self.node:
+            return self.node[occupation]
+        wanted = occupation.lower()
+        for idx, label in enumerate(self.labels):
+            if label.lower() == wanted:
+                return idx
+        raise KeyError(f"Okänt yrke: {occupation}")
+
+    def neighbours(self, idx):
+        a, b = self.offsets[idx], self.offsets[idx + 1]
+        return zip(self.targets[a:b], self.weights[a:b])
+
+    def _path(self, nodes, score):
+        return {
+            'path': [self.ids[n] for n in nodes],
+            'labels': [self.labels[n] for n in nodes],
+            'score': round(score, 4),
+        }
+
+    def best_paths(self, occupation, steps=2, top=10, beam_width=64):
+        """
+        Beam search: de bästa övergångskedjorna med 1..steps steg från ett yrke.
+        Varje slutyrke rapporteras en gång, med sin bästa väg.
+        """
+        start = self.resolve(occupation)
+        cached = self.next_moves.get((start, steps, beam_width))
+        if cached is not None and len(cached) >= top:
+            return cached[:top]
+
+        beam = [(1.0, (start,))]
+        best = {}  # slutnod -> (poäng, väg)
+        for _ in range(steps):
+            candidates = []
+            for score, path in beam:
+                for dst, w in self.neighbours(path[-1]):
+                    if dst in path:
+                        continue
+                    s = score * w
+                    candidates.append((s, path + (dst,)))
+                    if s > best.get(dst, (0, None))[0]:
+                        best[dst] = (s, path + (dst,))
+            beam = heapq.nlargest(beam_width, candidates, key=lambda c: c[0])
+            if not beam:
+                break
+
+        ranked = heapq.nlargest(top, best.values(), key=lambda c: (c[0], -len(c[1])))
+        return [self._path(path, score) for score, path in ranked]
+
+    def shortest_path(self, source, target):
+        """Viktad kortaste väg (Dijkstra på -log(vikt)), dvs. kedjan med högst sannolikhetsprodukt."""
+        src, dst = self.resolve(source), self.resolve(target)
+        dist = {src: 0.0}
+        prev = {}
+        heap = [(0.0, src)]
+        while heap:
+            d, node = heapq.heappop(heap)
+            if node == dst:
+                nodes = [dst]
+                while nodes[-1] != src:
+                    nodes.append(prev[nodes[-1]])
+                return self._path(nodes[::-1], math.exp(-d))
+            if d > dist.get(node, math.inf):
+                continue
+            for nxt, w in self.neighbours(node):
+                if w <= 0:
+                    continue
+                nd = d - math.log(w)
+                if nd < dist.get(nxt, math.inf):
+                    dist[nxt] = nd
+                    prev[nxt] = node
+                    heapq.heappush(heap, (nd, nxt))
+        return None
+
+    def precompute_next_moves(self, hot=None, top=10, steps=2, beam_width=64):
+        """
+        Förberäknar topp-N nästa steg för heta yrken (default: de med flest utgående övergångar).
+        hot: lista av yrkes-IDn/etiketter eller ett antal.
+        """
+        if hot is None or isinstance(hot, int):
+            count = hot or 500
+            degree = sorted(range(len(self)), key=lambda i: -(self.offsets[i + 1] - self.offsets[i]))
+            nodes = degree[:count]
+        else:
+            nodes = [self.resolve(h) for h in hot]
+        for idx in nodes:
+            self.next_moves[(idx, steps, beam_width)] = self.best_paths(self.ids[idx], steps=steps, top=top,
+                                                                         beam_width=beam_width)
+        return len(nodes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bästa karriärövergångar från ett yrke")
+    parser.add_argument('occupation', help="Yrkes-ID eller yrkesbenämning")
+    parser.add_argument('--steps', type=int, default=2, help="Max antal steg (default: 2)")
+    parser.add_argument('--top', type=int, default=10, help="Antal vägar (default: 10)")
+    parser.add_argument('--to', default=None, help="Visa bästa vägen till ett specifikt yrke")
+    args = parser.parse_args()
+
+    graph = TransitionGraph()
+    if args.to:
+        result = graph.shortest_path(args.occupation, args.to)
+        print(" → ".join(result['labels']) + f"  ({result['score']:.0%})" if result else "Ingen väg hittades")
+        return
+    for p in graph.best_paths(args.occupation, steps=args.steps, top=args.top):
+        print(f"{p['score']:>5.0%}  " + " → ".join(p['labels']))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,69 +1,54 @@
 import plotly.express as px
+import numpy as np
 import pandas as pd
 import streamlit as st
 
-def draw_taxonomy_tree(matches):
-    """Ritar upp det hierarkiska trädet: Bransch -> Yrke."""
+def draw_taxonomy_tree(matches, segments):
+    """Ritar upp det hierarkiska trädet: Segment (SSYK 1) -> Yrkesområde (SSYK 2) -> Yrke."""
     if not matches:
         st.warning("Ingen matchningsdata tillgänglig för trädet.")
         return
-    
-    data = []
-    for m in matches[:50]:
-        name = m['name'].lower()
-        # Avancerad kategorisering baserad på yrkestitlar
-        if any(x in name for x in ["marknad", "ads", "seo", "kommunikation", "pr"]): 
-            segment = "Media & Marknad"
-        elif any(x in name for x in ["it", "system", "data", "utvecklare", "mjukvara", "programmerare"]): 
-            segment = "IT & Tech"
-        elif any(x in name for x in ["chef", "ledare", "manager", "koordinator", "projektledare"]): 
-            segment = "Ledning & Strategi"
-        elif any(x in name for x in ["konst", "grafisk", "design", "kultur", "museum"]): 
-            segment = "Kultur & Kreativt"
-        elif any(x in name for x in ["logistik", "transport", "lager", "spedition"]): 
-            segment = "Logistik & Transport"
-        else:
-            segment = "Övriga Sektorer"
-        
-        data.append({
-            "Segment": segment,
-            "Yrkesroll": m['name'],
-            "Matchning": m['score'] * 100
-        })
-    
-    df = pd.DataFrame(data)
+
+    key = tuple((m['id'], m['name'], m['score']) for m in matches[:50])
+    st.plotly_chart(_taxonomy_figure(segments.version, key, segments), use_container_width=True)
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def _taxonomy_figure(version, key, _segments):
+    # Samma matchningar mot samma SSYK-filer ger samma figur; version (källfilernas stämplar)
+    # gör att en omskriven taxonomi ger en ny figur. _segments hashas inte av Streamlit.
+    ids, names, scores = zip(*key)
+    node_ids, labels, parents, values = _segments.sunburst(ids, names, [s * 100 for s in scores])
     fig = px.sunburst(
-        df, 
-        path=['Segment', 'Yrkesroll'], 
-        values='Matchning',
-        color='Matchning',
+        ids=node_ids,
+        names=labels,
+        parents=parents,
+        values=values,
+        color=values,
         color_continuous_scale='GnBu',
+        branchvalues='total',
         title="Ditt Yrkes-ekosystem (Taxonomisk vy)"
     )
-    fig.update_layout(margin=dict(t=40, l=0, r=0, b=0))
-    st.plotly_chart(fig, use_container_width=True)
+    fig.update_layout(margin=dict(t=40, l=0, r=0, b=0), coloraxis_colorbar_title='Matchning')
+    return fig
 
-def draw_industry_heatmap(all_matches):
-    """Visar potential i SNI-branscher."""
-    industry_hits = {
-        "IT & Kommunikation": 0,
-        "Kultur & Fritid": 0,
-        "Handel & Transport": 0,
-        "Företagstjänster": 0,
-        "Utbildning": 0
-    }
-    
-    for m in all_matches:
-        name = m['name'].lower()
-        if any(x in name for x in ["it", "data", "ads"]): industry_hits["IT & Kommunikation"] += 1
-        if any(x in name for x in ["konst", "kultur"]): industry_hits["Kultur & Fritid"] += 1
-        if any(x in name for x in ["logistik", "handel"]): industry_hits["Handel & Transport"] += 1
-        if any(x in name for x in ["ambassadör", "lärare"]): industry_hits["Utbildning"] += 1
-        if any(x in name for x in ["koordinator", "administratör"]): industry_hits["Företagstjänster"] += 1
+def draw_industry_heatmap(all_matches, industries, depth=2):
+    """Visar potential i SNI-branscher: matchningspoängen summerade per bransch (industry.IndustryIndex)."""
+    weights = industries.weights(industries.vector(all_matches))
+    cols = np.flatnonzero((industries.levels <= depth) & (weights > 0))
+    if not len(cols):
+        st.info("Inga av dina matchningar har en branschkoppling.")
+        return
 
-    df = pd.DataFrame([{"Bransch": k, "Vikt": v} for k, v in industry_hits.items()])
-    fig = px.treemap(df, path=['Bransch'], values='Vikt', color='Vikt', color_continuous_scale='Purples')
-    st.write("### 🏢 Branschpotential (SNI)")
+    nodes = industries.nodes
+    df = pd.DataFrame({
+        "id": [str(c) for c in cols],
+        "Bransch": [nodes[c]['label'] for c in cols],
+        "parent": [str(nodes[c]['parent']) if nodes[c]['level'] > 1 else "" for c in cols],
+        "Vikt": weights[cols],
+    })
+    fig = px.treemap(df, ids='id', names='Bransch', parents='parent', values='Vikt', color='Vikt',
+                     color_continuous_scale='Purples', branchvalues='total')
+    st.write("### 🏢 Branschpotential (SNI, uppskattad)")
     st.plotly_chart(fig, use_container_width=True)
 
 def draw_skill_cluster(detected):
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Benchmark: laddningslägen i scripts/import_jobtech.py mot en lokal Postgres.
+
+Syntetiska substitutability-rader skickas genom samma UpsertPipeline som importen:
+  rest   – 500 rader per INSERT ... SELECT FROM json_populate_recordset ... ON CONFLICT,
+           dvs. samma SQL som PostgREST kör för en upsert (utan HTTP-overheaden)
+  copy   – PostgresCopyTarget: COPY till staging-tabell + en INSERT ... ON CONFLICT per batch
+  sqlite – dry-run-målet, som referens (kräver ingen Postgres)
+
+Allt skrivs i ett eget schema (jobtech_bench) som tas bort efteråt.
+
+Usage:
+    python bench/bench_import.py --rows 200000
+    python bench/bench_import.py --pg-dsn postgresql://postgres@localhost/postgres --workers 4
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "scripts"))
+
+import import_jobtech as ij  # noqa: E402
+
+SCHEMA = "jobtech_bench"
+DDL = f"""
+CREATE SCHEMA IF NOT EXISTS {SCHEMA};
+CREATE TABLE IF NOT EXISTS {SCHEMA}.substitutability (
+  from_occupation_id  TEXT,
+  to_occupation_id    TEXT,
+  level               SMALLINT NOT NULL CHECK (level IN (25, 50, 75)),
+  PRIMARY KEY (from_occupation_id, to_occupation_id)
+);
+"""
+
+
+class RestLikeTarget(ij.PostgresCopyTarget):
+    """Samma SQL som PostgREST genererar för upsert av en JSON-array."""
+    batch_size = ij.BATCH_SIZE
+
+    def upsert(self, table, rows, conflict_cols=None):
+        key = list(ij.TABLE_KEYS[table])
+        cols = list(rows[0])
+        updates = ", ".join(f"{c} = EXCLUDED.{c}" for c in cols if c not in key)
+        conn = self._conn()
+        with conn.transaction():
+            conn.execute(
+                f"INSERT INTO {table} ({', '.join(cols)}) "
+                f"SELECT {', '.join(cols)} FROM json_populate_recordset(NULL::{table}, %s) "
+                f"ON CONFLICT ({', '.join(key)}) DO UPDATE SET {updates}",
+                (json.dumps(rows),))
+
+
+def synthetic_rows(n):
+    levels = (25, 50, 75)
+    return [{"from_occupation_id": f"occ{i // 120}", "to_occupation_id": f"occ{i % 120}-{i}",
+             "level": levels[i % 3]} for i in range(n)]
+
+
+def run(target, rows, workers):
+    ij.UPSERT_WORKERS = workers
+    ij.RETRY_BACKOFF = 0.1
+    t0 = time.perf_counter()
+    inserted = ij.batch_upsert(target, "substitutability", rows)
+    return inserted, time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="rows/s för importens laddningslägen")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, default=ij.UPSERT_WORKERS)
+    parser.add_argument("--pg-dsn", default=ij.DATABASE_URL, help="Lokal Postgres (default: $DATABASE_URL)")
+    parser.add_argument("--modes", default="sqlite,rest,copy")
+    args = parser.parse_args()
+
+    modes = [m for m in args.modes.split(",") if m]
+    if not args.pg_dsn and any(m != "sqlite" for m in modes):
+        print("⚠  Ingen --pg-dsn/DATABASE_URL – kör bara sqlite")
+        modes = ["sqlite"]
+    if args.pg_dsn:
+        if ij.psycopg is None:
+            print("✗ pip install 'psycopg[binary]'")
+            sys.exit(1)
+        dsn = ij.psycopg.conninfo.make_conninfo(args.pg_dsn, options=f"-c search_path={SCHEMA}")
+        with ij.psycopg.connect(args.pg_dsn, autocommit=True) as conn:
+            conn.execute(DDL)
+
+    rows = synthetic_rows(args.rows)
+    results = []
+    try:
+        for mode in modes:
+            if mode == "sqlite":
+                target = ij.SQLiteTarget()
+            else:
+                with ij.psycopg.connect(dsn, autocommit=True) as conn:
+                    conn.execute("TRUNCATE substitutability")
+                target = {"rest": RestLikeTarget, "copy": ij.PostgresCopyTarget}[mode](dsn)
+            # Första körningen är ren insert, den andra uppdaterar varje rad via ON CONFLICT
+            for phase in ("insert", "update"):
+                inserted, seconds = run(target, rows, args.workers)
+                results.append({"mode": mode, "phase": phase, "rows": inserted, "workers": args.workers,
+                                "seconds": round(seconds, 3), "rows_per_s": round(inserted / seconds)})
+            if hasattr(target, "close"):
+                target.close()
+    finally:
+        if args.pg_dsn:
+            with ij.psycopg.connect(args.pg_dsn, autocommit=True) as conn:
+                conn.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+
+    print(f"\n{'läge':>7} {'fas':>7} {'rader':>9} {'tid (s)':>8} {'rader/s':>10}")
+    for r in results:
+        print(f"{r['mode']:>7} {r['phase']:>7} {r['rows']:>9,} {r['seconds']:>8.2f} {r['rows_per_s']:>10,}")
+    print(json.dumps(results))
+
+
+if __name__ == "__main__":
+    main()
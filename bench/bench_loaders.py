@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark: json.load av master-filen mot den strömmande laddaren (jsonstream.iter_concepts).
+
+Varje variant körs i en egen subprocess så att toppminnet (tracemalloc och RSS)
+inte påverkas av den andra.
+
+Usage:
+    python bench/bench_loaders.py
+    python bench/bench_loaders.py --file Kompetensbryggan/concepts-and-common-relations.json
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "Kompetensbryggan"))
+
+from jsonstream import iter_concepts  # noqa: E402
+
+DEFAULT_FILE = ROOT / "Kompetensbryggan" / "concepts-and-common-relations.json"
+FIELDS = ('related', 'broader', 'close_match', 'exact_match')
+
+
+def _relations(concepts):
+    # Samma urval som loaders.load_jobtech_data
+    relations = []
+    for c in concepts:
+        if c.get('type') == 'occupation-name':
+            ids = [str(r['id']) for f in FIELDS for r in c.get(f, []) if 'id' in r]
+            if ids:
+                relations.append({'id': str(c.get('id')), 'relations': [{'id': i} for i in set(ids)]})
+    return relations
+
+
+def load_json(path):
+    # Den tidigare laddaren: hela dokumentet parsas och hålls i minnet
+    with open(path, 'r', encoding='utf-8') as f:
+        content = json.load(f)
+    return _relations(content.get('data', {}).get('concepts', []))
+
+
+def load_stream(path):
+    return _relations(iter_concepts(path))
+
+
+def run_one(mode, path):
+    fn = {'json': load_json, 'stream': load_stream}[mode]
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    relations = fn(path)
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({
+        'mode': mode,
+        'seconds': elapsed,
+        'occupations': len(relations),
+        'peak_traced_mb': peak / 2**20,
+        'max_rss_mb': rss_kb / 1024,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="json.load vs strömmande laddare")
+    parser.add_argument("--file", default=str(DEFAULT_FILE))
+    parser.add_argument("--mode", choices=["json", "stream"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        run_one(args.mode, args.file)
+        return
+
+    if not os.path.exists(args.file):
+        print(f"✗ Hittade inte {args.file}")
+        sys.exit(1)
+    size_mb = os.path.getsize(args.file) / 2**20
+    print(f"{args.file} ({size_mb:.1f} MB)\n")
+    print(f"{'läge':>7} {'tid (s)':>8} {'MB/s':>7} {'yrken':>7} {'topp (MB)':>10} {'RSS (MB)':>9}")
+
+    results = []
+    for mode in ("json", "stream"):
+        out = subprocess.run([sys.executable, __file__, "--file", args.file, "--mode", mode],
+                             capture_output=True, text=True, check=True)
+        r = json.loads(out.stdout.strip().splitlines()[-1])
+        results.append(r)
+        print(f"{mode:>7} {r['seconds']:>8.2f} {size_mb / r['seconds']:>7.1f} {r['occupations']:>7} "
+              f"{r['peak_traced_mb']:>10.1f} {r['max_rss_mb']:>9.1f}")
+
+    if results[0]['occupations'] != results[1]['occupations']:
+        print("✗ Olika antal yrken mellan laddarna")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
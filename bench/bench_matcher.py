@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Benchmark: regex-loopen i bryggan.py mot SkillMatcher (Aho-Corasick),
+samt kostnaden för det ungefärliga passet (FuzzyMatcher) relativt automaten.
+
+Usage:
+    python bench/bench_matcher.py
+    python bench/bench_matcher.py --sizes 5000 50000 200000 --repeat 3
+"""
+import argparse
+import json
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "Kompetensbryggan"))
+
+from matcher import SkillMatcher  # noqa: E402
+from fuzzy import FuzzyMatcher  # noqa: E402
+
+FILLER = (
+    "ansvarade för leverans i team med kunder och projekt under flera år "
+    "arbetade ledde utvecklade samordnade planerade uppföljning rapportering"
+).split()
+
+
+def load_skills():
+    with open(ROOT / "Kompetensbryggan" / "skills.json", "r", encoding="utf-8") as f:
+        concepts = json.load(f).get("data", {}).get("concepts", [])
+    return {str(s["id"]): s.get("preferred_label", "") for s in concepts if "id" in s}
+
+
+def synthetic_cv(skills, n_chars, seed=0):
+    """Blandar riktiga etiketter med fyllnadsord tills texten når n_chars."""
+    rng = random.Random(seed)
+    labels = [l for l in skills.values() if l]
+    words = []
+    length = 0
+    while length < n_chars:
+        w = rng.choice(labels) if rng.random() < 0.15 else rng.choice(FILLER)
+        words.append(w)
+        length += len(w) + 1
+    return " ".join(words).lower()
+
+
+def regex_loop(skills, cv_text):
+    # Exakt kopia av den gamla detekteringen i bryggan.py
+    detected = []
+    for s_id, s_name in skills.items():
+        if len(s_name) > 2 and re.search(rf"\b{re.escape(s_name.lower())}\b", cv_text):
+            detected.append({'id': s_id, 'name': s_name})
+    return detected
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Regex-loop vs SkillMatcher")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5_000, 50_000, 200_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    skills = load_skills()
+    t0 = time.perf_counter()
+    matcher = SkillMatcher(skills)
+    build = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    fuzzy = FuzzyMatcher(skills)
+    fuzzy_build = time.perf_counter() - t0
+    print(f"{len(skills):,} kompetenser, automat byggd på {build * 1000:.0f} ms "
+          f"({len(matcher.goto):,} tillstånd), trigram-index på {fuzzy_build * 1000:.0f} ms "
+          f"({len(fuzzy.grams):,} trigram)\n")
+    print(f"{'tecken':>10} {'regex (s)':>10} {'automat (s)':>12} {'speedup':>8} {'träffar':>8} "
+          f"{'fuzzy (s)':>10} {'faktor':>7} {'+träffar':>9}")
+
+    for size in args.sizes:
+        cv = synthetic_cv(skills, size)
+        t_regex, old = best_of(lambda: regex_loop(skills, cv), args.repeat)
+        t_ac, new = best_of(lambda: matcher.find(cv), args.repeat)
+        if old != new:
+            print(f"✗ Avvikande resultat vid {size} tecken: {len(old)} vs {len(new)}")
+            sys.exit(1)
+        exact = {s['id'] for s in new}
+        t_fuzzy, extra = best_of(lambda: fuzzy.find_ids(cv, exact), args.repeat)
+        print(f"{size:>10,} {t_regex:>10.3f} {t_ac:>12.4f} {t_regex / t_ac:>7.0f}x {len(new):>8} "
+              f"{t_fuzzy:>10.4f} {t_fuzzy / t_ac:>6.1f}x {len(extra):>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Benchmark: hela CV-pipelinen – laddning, PDF-extrahering, detektering, poängsättning
+och gapanalys – över en syntetisk CV-korpus och en uppskalad taxonomi.
+
+CV:na byggs av riktiga etiketter ur skills.json (bench_matcher.synthetic_cv) och skrivs
+som flersidiga PDF:er. Katalogen skalas med --scales:
+  - kompetenser: varje etikett får (skala - 1) varianter med ett påhittat efterled,
+    så automaten och trigram-indexet växer utan att CV:na ändras
+  - yrken: varje kravprofil kopieras (skala - 1) gånger med en del av kraven utbytta;
+    kraven dras ur de riktiga kompetenserna, så bitmängdernas bredd är oförändrad
+Saknas master-filen (concepts-and-common-relations.json) får yrkena i SSYK-hierarkin
+slumpade kravprofiler i stället.
+
+Samma steg som bryggan.py kör i lokalt läge mäts via MatchingService, och tiderna
+läses ur instrumentation.metrics (extract, detect, detect_fuzzy, score, gap).
+Resultatet skrivs som JSON med p50/p95 per steg och genomströmning per skala.
+
+Usage:
+    python bench/bench_pipeline.py
+    python bench/bench_pipeline.py --cvs 50 --chars 8000 --out bench/results.json
+    python bench/bench_pipeline.py --scales 1 10    # snabb körning utan 100× (~670k kompetenser, ~40 s bygge)
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import textwrap
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "Kompetensbryggan"))
+sys.path.insert(0, str(ROOT / "bench"))
+
+from bench_matcher import load_skills, synthetic_cv  # noqa: E402
+from catalog import TaxonomyCatalog  # noqa: E402
+from instrumentation import metrics  # noqa: E402
+from loaders import iter_pages, load_jobtech_data  # noqa: E402
+from service import MatchingService  # noqa: E402
+
+STAGES = ('extract', 'detect', 'detect_fuzzy', 'score', 'gap')
+SYLLABLES = "ba ke lo mi nu ra se ti vo ly dä gö".split()
+
+
+# ── SYNTETISK DATA ────────────────────────────────────────────────────────────
+
+def make_pdf(text, line_chars=90, lines_per_page=55):
+    """Minimal PDF (Helvetica, WinAnsi) med texten radbruten över så många sidor som behövs."""
+    lines = textwrap.wrap(text, line_chars) or [""]
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)]
+
+    def escape(line):
+        return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+    n = len(pages)
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{' '.join(f'{4 + 2 * i} 0 R' for i in range(n))}] /Count {n} >>".encode(),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    ]
+    for i, page in enumerate(pages):
+        stream = ("BT /F1 10 Tf 12 TL 50 800 Td " + " ".join(f"({escape(l)}) '" for l in page) + " ET")
+        stream = stream.encode("cp1252", errors="replace")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * i} 0 R >>".encode())
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    out.write(b"".join(b"%010d 00000 n \n" % o for o in offsets))
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return out.getvalue()
+
+
+def base_catalog(seed=0):
+    """Den riktiga taxonomin via loaders.py, eller slumpade kravprofiler om master-filen saknas."""
+    db = load_jobtech_data()
+    if db['relations']:
+        return db, 'jobtech'
+    rng = random.Random(seed)
+    skill_ids = list(db['skills'])
+    occupations = [n for n in TaxonomyCatalog().flatten('the-ssyk-hierarchy-with-occupations')
+                   if n['type'] == 'occupation-name']
+    db['jobs'] = {o['id']: o['label'] for o in occupations}
+    db['relations'] = [{'id': o['id'], 'relations': [{'id': s} for s in rng.sample(skill_ids, rng.randint(8, 40))]}
+                       for o in occupations]
+    return db, 'synthetic-relations'
+
+
+def scale_catalog(db, factor, seed=0):
+    """Ny db med factor × kompetenser och factor × yrken (se modulens docstring)."""
+    if factor == 1:
+        return {k: db[k] for k in ('skills', 'jobs', 'relations', 'hierarchy')}
+    rng = random.Random(seed)
+    skills = dict(db['skills'])
+    for s_id, label in db['skills'].items():
+        for k in range(1, factor):
+            skills[f"{s_id}#{k}"] = f"{label} {''.join(rng.choices(SYLLABLES, k=3))}"
+    universe = list(db['skills'])
+    jobs, relations = dict(db['jobs']), list(db['relations'])
+    for rel in db['relations']:
+        required = [r['id'] for r in rel['relations']]
+        for k in range(1, factor):
+            swap = max(1, len(required) // 4)
+            copy = rng.sample(required, len(required) - swap) + rng.sample(universe, swap)
+            occ_id = f"{rel['id']}#{k}"
+            jobs[occ_id] = f"{db['jobs'].get(rel['id'], occ_id)} {k}"
+            relations.append({'id': occ_id, 'relations': [{'id': s} for s in set(copy)]})
+    return {'skills': skills, 'jobs': jobs, 'relations': relations, 'hierarchy': db['hierarchy']}
+
+
+# ── MÄTNING ───────────────────────────────────────────────────────────────────
+
+def _summary(samples):
+    samples = np.asarray(samples, dtype=np.float64)
+    if not len(samples):
+        return None
+    return {'count': int(len(samples)), 'mean': float(samples.mean()),
+            'p50': float(np.percentile(samples, 50)), 'p95': float(np.percentile(samples, 95)),
+            'max': float(samples.max())}
+
+
+def run_scale(db, factor, pdfs, seed):
+    scaled = scale_catalog(db, factor, seed)
+    t0 = time.perf_counter()
+    service = MatchingService(scaled, version=f"bench-{factor}x")
+    build = time.perf_counter() - t0
+
+    metrics.reset()
+    samples = {stage: [] for stage in STAGES + ('total',)}
+    t_start = time.perf_counter()
+    for pdf in pdfs:
+        before = {s: metrics.timers[s].count if s in metrics.timers else 0 for s in STAGES}
+        t0 = time.perf_counter()
+        # fuzzy är opt-in i tjänsten; slås på här så att detect_fuzzy fortsatt mäts
+        detected = service.detect_skills([{'pdf': pdf, 'fuzzy': True}])[0]
+        if 'error' in detected:
+            raise RuntimeError(detected['error'])
+        item = {'skill_ids': detected['skill_ids'], 'fuzzy_ids': detected['fuzzy_ids']}
+        service.score_occupations([{**item, 'top_k': 50, 'details': 5}])
+        service.gap_plan([{**item, 'steps': 5}])
+        samples['total'].append(time.perf_counter() - t0)
+        for stage in STAGES:
+            timer = metrics.timers.get(stage)
+            if timer is not None and timer.count > before[stage]:
+                samples[stage].append(timer.last)
+    elapsed = time.perf_counter() - t_start
+
+    return {
+        'scale': factor,
+        'skills': len(scaled['skills']),
+        'occupations': len(service.profiles),
+        'profile_bytes': int(service.profiles.nbytes),
+        'build_seconds': build,
+        'cvs': len(pdfs),
+        'throughput_cvs_per_s': len(pdfs) / elapsed,
+        'stages': {stage: _summary(values) for stage, values in samples.items()},
+        'counters': dict(metrics.snapshot()['counters']),
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "-C", str(ROOT), "rev-parse", "--short", "HEAD"],
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pipeline-benchmark med syntetiska CV:n och uppskalad taxonomi")
+    parser.add_argument("--cvs", type=int, default=20, help="Antal syntetiska CV:n (default: 20)")
+    parser.add_argument("--chars", type=int, default=6000, help="Tecken per CV (default: 6000)")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100],
+                        help="Katalogskalor (default: 1 10 100)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=None, help="Skriv resultatet som JSON hit (annars till stdout)")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    db, source = base_catalog(args.seed)
+    load = time.perf_counter() - t0
+    if not db['skills']:
+        print("✗ Hittade inga kompetenser (Kompetensbryggan/skills.json)")
+        sys.exit(1)
+
+    labels = load_skills()
+    pdfs = [make_pdf(synthetic_cv(labels, args.chars, seed=args.seed + i)) for i in range(args.cvs)]
+    pages = sum(1 for _ in iter_pages(io.BytesIO(pdfs[0])))
+    print(f"Katalog: {source}, {len(db['skills']):,} kompetenser, {len(db['relations']):,} yrken "
+          f"(laddad på {load:.2f} s)")
+    print(f"Korpus: {args.cvs} CV:n à {args.chars:,} tecken ({pages} sidor)\n")
+    print(f"{'skala':>6} {'kompetenser':>12} {'yrken':>9} {'bygge (s)':>10} {'CV/s':>7}  "
+          + "  ".join(f"{s + ' p50/p95 (ms)':>26}" for s in STAGES))
+
+    results = []
+    for factor in args.scales:
+        r = run_scale(db, factor, pdfs, args.seed)
+        results.append(r)
+        cells = []
+        for stage in STAGES:
+            s = r['stages'][stage]
+            cells.append(f"{s['p50'] * 1000:>12.1f} / {s['p95'] * 1000:<11.1f}" if s else f"{'–':>26}")
+        print(f"{factor:>5}x {r['skills']:>12,} {r['occupations']:>9,} {r['build_seconds']:>10.2f} "
+              f"{r['throughput_cvs_per_s']:>7.1f}  " + "  ".join(cells))
+
+    report = {
+        'benchmark': 'pipeline',
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'catalog': source,
+        'load_seconds': load,
+        'args': vars(args),
+        'results': results,
+    }
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n✅ Resultat skrivet till {args.out}")
+    else:
+        print(json.dumps(report, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,35 @@
 #!/usr/bin/env python3
 """
-Arbetsförmedlingen Intelligent Data Scraper v2
+Arbetsförmedlingen Intelligent Data Scraper v3
 Scrapes dataset pages to find and download JSON files
 
+Alla nedladdningar körs parallellt (asyncio + httpx) med en begränsad pool av
+anslutningar. Oförändrade datasets hoppas över via ETag/Last-Modified, svaren
+strömmas direkt till disk och avbrutna nedladdningar återupptas med Range.
+
 Usage:
     python download_all_datasets.py
+    python download_all_datasets.py --concurrency 8 --force
+    python download_all_datasets.py --base-url http://localhost:8000 --taxonomy-base http://localhost:8000/concepts
+    python local_test_server.py --check    # kör mot en lokal ersättningsserver (200/304/206/If-Range)
 """
 
-import requests
+import argparse
+import asyncio
 import json
-import time
 import os
 import sys
 import re
+import time
 from pathlib import Path
 from datetime import datetime
 
 try:
+    import httpx
     from bs4 import BeautifulSoup
 except ImportError:
-    print("ERROR: BeautifulSoup4 is required!")
-    print("Install it with: pip3 install beautifulsoup4")
+    print("ERROR: httpx and BeautifulSoup4 are required!")
+    print("Install them with: pip3 install -r requirements.txt")
     sys.exit(1)
 
 # ANSI colors
@@ -42,17 +51,20 @@ def print_info(msg):
 def print_warning(msg):
     print(f"{YELLOW}⚠{RESET} {msg}")
 
-# Create data directories
-BASE_DIR = Path(__file__).parent.parent
-DATA_DIR = BASE_DIR / "data"
+# Data directories
+BASE_DIR = Path(__file__).resolve().parent.parent
+DATA_DIR = Path(os.environ.get("AF_DATA_DIR", BASE_DIR / "data"))
 RAW_DIR = DATA_DIR / "raw"
+METADATA_FILE = DATA_DIR / "download_metadata.json"
 
-for directory in [DATA_DIR, RAW_DIR]:
-    directory.mkdir(exist_ok=True)
+# Kan pekas om mot en lokal HTTP-server vid test (--base-url / --taxonomy-base)
+DATASET_BASE = os.environ.get("AF_DATASET_BASE", "https://data.arbetsformedlingen.se")
+TAXONOMY_API_BASE = os.environ.get(
+    "AF_TAXONOMY_BASE", "https://taxonomy.api.jobtechdev.se/v1/taxonomy/specific/concepts"
+)
 
-print(f"\n{BLUE}{'='*60}{RESET}")
-print(f"{BLUE}Crosstrees - Intelligent Data Scraper v2{RESET}")
-print(f"{BLUE}{'='*60}{RESET}\n")
+DEFAULT_CONCURRENCY = 4
+CHUNK_SIZE = 1 << 16
 
 # =============================================================================
 # PRIORITY DATASETS
@@ -86,95 +98,10 @@ PRIORITY_DATASETS = [
     },
 ]
 
-# =============================================================================
-# SCRAPING FUNCTIONS
-# =============================================================================
-
-def find_download_link(dataset_url):
-    """Visit dataset page and find 'Ladda ner JSON fil' link"""
-    try:
-        response = requests.get(dataset_url, timeout=10)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Look for "Ladda ner JSON fil" text
-        json_links = soup.find_all('a', string=re.compile(r'Ladda ner JSON', re.IGNORECASE))
-        
-        if json_links:
-            href = json_links[0].get('href')
-            if href:
-                if href.startswith('http'):
-                    return href
-                else:
-                    return f"https://data.arbetsformedlingen.se{href}"
-        
-        return None
-        
-    except Exception as e:
-        print_error(f"Error: {str(e)}")
-        return None
-
-def download_dataset(dataset_info):
-    """Download a single dataset"""
-    name = dataset_info["name"]
-    slug = dataset_info["slug"]
-    category = dataset_info["category"]
-    
-    print_info(f"{name}")
-    
-    # Build dataset page URL
-    dataset_page_url = f"https://data.arbetsformedlingen.se/data/dataset/{slug}/"
-    
-    # Find download link
-    print_info(f"  → Visiting {dataset_page_url}")
-    download_url = find_download_link(dataset_page_url)
-    
-    if not download_url:
-        print_error(f"  → Could not find download link")
-        return False
-    
-    print_info(f"  → Found: {download_url}")
-    
-    # Download
-    try:
-        response = requests.get(download_url, timeout=30)
-        response.raise_for_status()
-        
-        data = response.json()
-        
-        # Save
-        category_dir = RAW_DIR / category
-        category_dir.mkdir(exist_ok=True)
-        
-        output_file = category_dir / f"{slug}.json"
-        
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-        
-        # Count records
-        if isinstance(data, list):
-            count = len(data)
-        elif isinstance(data, dict) and 'results' in data:
-            count = len(data['results'])
-        else:
-            count = 1
-        
-        size_kb = len(response.content) / 1024
-        print_success(f"  → {count} records ({size_kb:.1f} KB)")
-        
-        return True
-        
-    except Exception as e:
-        print_error(f"  → Failed: {str(e)}")
-        return False
-
 # =============================================================================
 # TAXONOMY API DATASETS (direct API, no scraping needed)
 # =============================================================================
 
-TAXONOMY_API_BASE = "https://taxonomy.api.jobtechdev.se/v1/taxonomy/specific/concepts"
-
 TAXONOMY_API_DATASETS = [
     {
         "name": "🗺️  Svenska regioner (län)",
@@ -188,99 +115,276 @@ TAXONOMY_API_DATASETS = [
     },
 ]
 
-def download_taxonomy_api_datasets():
-    """Download datasets directly from JobTech Taxonomy API (no auth needed)"""
-    print(f"\n{BLUE}{'='*60}{RESET}")
-    print(f"{BLUE}Downloading from JobTech Taxonomy API{RESET}")
-    print(f"{BLUE}{'='*60}{RESET}\n")
-
-    taxonomy_dir = RAW_DIR / "taxonomy"
-    taxonomy_dir.mkdir(exist_ok=True)
-
-    downloaded = 0
-    failed = 0
+# =============================================================================
+# METADATA
+# =============================================================================
 
-    for i, dataset in enumerate(TAXONOMY_API_DATASETS, 1):
-        name = dataset["name"]
-        endpoint = dataset["endpoint"]
-        filename = dataset["filename"]
+def load_metadata():
+    """Tidigare körningars metadata (ETag, Last-Modified, tider) per dataset."""
+    try:
+        with open(METADATA_FILE, 'r', encoding='utf-8') as f:
+            metadata = json.load(f)
+    except (OSError, ValueError):
+        metadata = {}
+    metadata.setdefault("datasets", {})
+    return metadata
+
+def save_metadata(metadata):
+    tmp_file = METADATA_FILE.with_suffix(".json.tmp")
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(metadata, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_file, METADATA_FILE)
+
+def count_records(output_file):
+    """
+    Antal poster i en nedladdad fil (data -> concepts, lista eller results).
+    Tolkar hela filen och kastar ValueError om den inte är giltig JSON, så den
+    fungerar också som kontroll innan en nedladdning får ersätta den gamla filen.
+    Blockerande: anropas via asyncio.to_thread från event-loopen.
+    """
+    with open(output_file, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if isinstance(data, dict) and 'data' in data and 'concepts' in data['data']:
+        return len(data['data']['concepts'])
+    if isinstance(data, list):
+        return len(data)
+    if isinstance(data, dict) and 'results' in data:
+        return len(data['results'])
+    return 1
 
-        print(f"\n{YELLOW}[{i}/{len(TAXONOMY_API_DATASETS)}]{RESET}")
-        print_info(f"{name}")
+# =============================================================================
+# DOWNLOAD FUNCTIONS
+# =============================================================================
 
-        url = f"{TAXONOMY_API_BASE}/{endpoint}"
-        print_info(f"  → GET {url}")
+async def find_download_link(client, dataset_url):
+    """Visit dataset page and find 'Ladda ner JSON fil' link"""
+    try:
+        response = await client.get(dataset_url, timeout=10)
+        response.raise_for_status()
 
-        try:
-            response = requests.get(url, headers={"accept": "application/json"}, timeout=15)
-            response.raise_for_status()
+        soup = BeautifulSoup(response.text, 'html.parser')
 
-            data = response.json()
+        # Look for "Ladda ner JSON fil" text
+        json_links = soup.find_all('a', string=re.compile(r'Ladda ner JSON', re.IGNORECASE))
 
-            output_file = taxonomy_dir / filename
-            with open(output_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+        if json_links:
+            href = json_links[0].get('href')
+            if href:
+                return str(httpx.URL(dataset_url).join(href))
 
-            # Count records
-            if isinstance(data, dict) and 'data' in data and 'concepts' in data['data']:
-                count = len(data['data']['concepts'])
-            elif isinstance(data, list):
-                count = len(data)
-            else:
-                count = 1
+        return None
 
-            size_kb = len(response.content) / 1024
-            print_success(f"  → {count} records ({size_kb:.1f} KB)")
-            downloaded += 1
+    except Exception as e:
+        print_error(f"Error: {str(e)}")
+        return None
 
-        except Exception as e:
-            print_error(f"  → Failed: {str(e)}")
-            failed += 1
+async def fetch_to_file(client, url, output_file, entry, force=False, headers=None):
+    """
+    Strömmar url till output_file. Returnerar 'downloaded' eller 'unchanged'.
+
+    - Villkorlig GET (If-None-Match / If-Modified-Since) när filen redan finns.
+    - En kvarliggande .part-fil återupptas med Range/If-Range; servern svarar 206
+      om den kan fortsätta, annars 200 och filen skrivs om från början. Ett 206 vars
+      Content-Range inte börjar där .part-filen slutar ger en ny nedladdning från 0.
+    - Accept-Encoding: identity på alla förfrågningar: Range räknar i överförda byte,
+      så .part-filen måste innehålla exakt de byte servern skickade. Komprimerar
+      servern ändå sparas ingen validator och avbrottet återupptas inte.
+    - Den färdiga .part-filen tolkas som JSON (i en tråd) innan den ersätter
+      output_file; ogiltig JSON kastar ValueError och den gamla filen står kvar.
+    """
+    request_headers = headers
+    headers = {**(headers or {}), "Accept-Encoding": "identity"}
+    part_file = output_file.with_name(output_file.name + ".part")
+    validator = entry.get("etag") or entry.get("last_modified")
+
+    if output_file.exists() and not force:
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+    offset = part_file.stat().st_size if part_file.exists() else 0
+    if offset and entry.get("partial_validator"):
+        headers["Range"] = f"bytes={offset}-"
+        headers["If-Range"] = entry["partial_validator"]
+    else:
+        offset = 0
+
+    async with client.stream("GET", url, headers=headers) as response:
+        if response.status_code == 304:
+            return "unchanged"
+        response.raise_for_status()
 
-        if i < len(TAXONOMY_API_DATASETS):
-            time.sleep(1)
+        etag = response.headers.get("etag")
+        last_modified = response.headers.get("last-modified")
+        # Spara validatorn direkt så att ett avbrott kan återupptas nästa körning –
+        # men bara om kroppen är okomprimerad, annars stämmer inte byte-offseten
+        if response.headers.get("content-encoding", "identity") == "identity":
+            entry["partial_validator"] = etag or last_modified or validator
+        else:
+            entry.pop("partial_validator", None)
 
-    return downloaded, failed
+        resumed = response.status_code == 206 and offset > 0
+        if response.status_code == 206 and _range_start(response) != offset:
+            resumed = None  # servern fortsätter inte där vi slutade
+        else:
+            mode = "ab" if resumed else "wb"
+            written = offset if resumed else 0
+            with open(part_file, mode) as f:
+                async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                    f.write(chunk)
+                    written += len(chunk)
+
+    if resumed is None:
+        print_warning(f"  {output_file.name}: Content-Range börjar inte vid byte {offset}, laddar ner från början")
+        part_file.unlink(missing_ok=True)
+        entry.pop("partial_validator", None)
+        return await fetch_to_file(client, url, output_file, entry, force, request_headers)
 
+    try:
+        records = await asyncio.to_thread(count_records, part_file)
+    except ValueError as e:
+        # Trasig eller felaktig kropp (t.ex. en HTML-felsida): återuppta inte, behåll den gamla filen
+        part_file.unlink(missing_ok=True)
+        entry.pop("partial_validator", None)
+        raise ValueError(f"ogiltig JSON ({e})") from e
+
+    os.replace(part_file, output_file)
+    entry.pop("partial_validator", None)
+    entry["etag"] = etag
+    entry["last_modified"] = last_modified
+    entry["bytes"] = written
+    entry["resumed_from"] = offset if resumed else 0
+    entry["records"] = records
+    return "downloaded"
+
+def _range_start(response):
+    """Första byten i ett 206-svars Content-Range ('bytes 100-199/200'), annars None."""
+    match = re.match(r"bytes (\d+)-\d+/(\d+|\*)", response.headers.get("content-range", ""))
+    return int(match.group(1)) if match else None
+
+async def _run_download(client, key, url, output_file, metadata, force, headers=None):
+    """Gemensam wrapper: tidtagning, metadata och utskrift per dataset."""
+    entry = metadata["datasets"].setdefault(key, {})
+    entry["url"] = url
+    entry["file"] = os.path.relpath(output_file, BASE_DIR)
+    t0 = time.perf_counter()
+    try:
+        status = await fetch_to_file(client, url, output_file, entry, force, headers)
+    except Exception as e:
+        entry.update(status="failed", error=str(e), seconds=round(time.perf_counter() - t0, 3))
+        print_error(f"  {key} → Failed: {str(e)}")
+        return "failed"
+
+    entry.update(status=status, seconds=round(time.perf_counter() - t0, 3),
+                 checked_at=datetime.now().isoformat())
+    entry.pop("error", None)
+    if status == "unchanged":
+        print_info(f"  {key} → oförändrad (304), hoppar över")
+    else:
+        entry["downloaded_at"] = entry["checked_at"]
+        size_kb = entry["bytes"] / 1024
+        print_success(f"  {key} → {entry['records']} records ({size_kb:.1f} KB, {entry['seconds']:.2f} s)")
+    return status
+
+async def download_dataset(client, semaphore, dataset_info, metadata, force=False, base_url=DATASET_BASE):
+    """Download a single dataset"""
+    slug = dataset_info["slug"]
+    async with semaphore:
+        print_info(f"{dataset_info['name']}")
+
+        # Find download link on the dataset page
+        dataset_page_url = f"{base_url}/data/dataset/{slug}/"
+        download_url = await find_download_link(client, dataset_page_url)
+        if not download_url:
+            print_error(f"  {slug} → Could not find download link")
+            metadata["datasets"].setdefault(slug, {}).update(status="failed", error="no download link")
+            return "failed"
+
+        category_dir = RAW_DIR / dataset_info["category"]
+        category_dir.mkdir(parents=True, exist_ok=True)
+        return await _run_download(client, slug, download_url, category_dir / f"{slug}.json",
+                                   metadata, force)
+
+async def download_taxonomy_dataset(client, semaphore, dataset, metadata, force=False,
+                                    taxonomy_base=TAXONOMY_API_BASE):
+    """Download a dataset directly from JobTech Taxonomy API (no auth needed)"""
+    async with semaphore:
+        print_info(f"{dataset['name']}")
+        taxonomy_dir = RAW_DIR / "taxonomy"
+        taxonomy_dir.mkdir(parents=True, exist_ok=True)
+        url = f"{taxonomy_base}/{dataset['endpoint']}"
+        return await _run_download(client, f"taxonomy/{dataset['filename']}", url,
+                                   taxonomy_dir / dataset["filename"], metadata, force,
+                                   headers={"accept": "application/json"})
+
+async def download_all(concurrency=DEFAULT_CONCURRENCY, force=False,
+                       base_url=DATASET_BASE, taxonomy_base=TAXONOMY_API_BASE):
+    """Kör alla nedladdningar parallellt och returnerar statusräkningar."""
+    metadata = load_metadata()
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    timeout = httpx.Timeout(30.0, connect=10.0)
+
+    t0 = time.perf_counter()
+    async with httpx.AsyncClient(limits=limits, timeout=timeout, follow_redirects=True) as client:
+        tasks = [download_dataset(client, semaphore, d, metadata, force, base_url)
+                 for d in PRIORITY_DATASETS]
+        tasks += [download_taxonomy_dataset(client, semaphore, d, metadata, force, taxonomy_base)
+                  for d in TAXONOMY_API_DATASETS]
+        try:
+            statuses = await asyncio.gather(*tasks)
+        finally:
+            # Sparas även vid avbrott så att .part-filer kan återupptas nästa körning
+            save_metadata(metadata)
+
+    counts = {s: statuses.count(s) for s in ("downloaded", "unchanged", "failed")}
+    metadata.update(
+        download_date=datetime.now().isoformat(),
+        total_datasets=len(statuses),
+        downloaded=counts["downloaded"],
+        unchanged=counts["unchanged"],
+        failed=counts["failed"],
+        seconds=round(time.perf_counter() - t0, 3),
+        categories=sorted({d["category"] for d in PRIORITY_DATASETS} | {"taxonomy"}),
+    )
+    save_metadata(metadata)
+    return counts, len(statuses)
 
 # =============================================================================
 # MAIN
 # =============================================================================
 
 def main():
-    datasets = PRIORITY_DATASETS
-    print_info(f"Downloading {len(datasets)} priority datasets\n")
+    parser = argparse.ArgumentParser(description="Laddar ner AF:s öppna datasets")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help=f"Max samtidiga anslutningar (default: {DEFAULT_CONCURRENCY})")
+    parser.add_argument("--force", action="store_true", help="Ignorera ETag/Last-Modified och ladda ner allt")
+    parser.add_argument("--base-url", default=DATASET_BASE, help="Bas-URL för datasetsidorna")
+    parser.add_argument("--taxonomy-base", default=TAXONOMY_API_BASE, help="Bas-URL för Taxonomy API")
+    args = parser.parse_args()
 
-    downloaded = 0
-    failed = 0
+    for directory in [DATA_DIR, RAW_DIR]:
+        directory.mkdir(exist_ok=True)
 
-    for i, dataset in enumerate(datasets, 1):
-        print(f"\n{YELLOW}[{i}/{len(datasets)}]{RESET}")
-
-        success = download_dataset(dataset)
-
-        if success:
-            downloaded += 1
-        else:
-            failed += 1
-
-        if i < len(datasets):
-            time.sleep(1)
-
-    # Download Taxonomy API datasets (regions, municipalities)
-    api_downloaded, api_failed = download_taxonomy_api_datasets()
-    downloaded += api_downloaded
-    failed += api_failed
+    print(f"\n{BLUE}{'='*60}{RESET}")
+    print(f"{BLUE}Crosstrees - Intelligent Data Scraper v3{RESET}")
+    print(f"{BLUE}{'='*60}{RESET}\n")
+    print_info(f"Downloading {len(PRIORITY_DATASETS) + len(TAXONOMY_API_DATASETS)} datasets "
+               f"({args.concurrency} parallel)\n")
 
-    total = len(datasets) + len(TAXONOMY_API_DATASETS)
+    counts, total = asyncio.run(download_all(args.concurrency, args.force, args.base_url, args.taxonomy_base))
 
     # Summary
     print(f"\n{BLUE}{'='*60}{RESET}")
-    print_success(f"Downloaded: {downloaded}/{total}")
-    if failed > 0:
-        print_error(f"Failed: {failed}/{total}")
-
-    print_info(f"\nData saved to: {RAW_DIR.relative_to(BASE_DIR)}")
+    print_success(f"Downloaded: {counts['downloaded']}/{total}")
+    if counts["unchanged"]:
+        print_info(f"Unchanged (skipped): {counts['unchanged']}/{total}")
+    if counts["failed"] > 0:
+        print_error(f"Failed: {counts['failed']}/{total}")
+
+    print_info(f"\nData saved to: {os.path.relpath(RAW_DIR, BASE_DIR)}")
+    print_info(f"Timing per dataset: {os.path.relpath(METADATA_FILE, BASE_DIR)}")
     print(f"\n{GREEN}✓ Complete!{RESET}\n")
 
 if __name__ == "__main__":
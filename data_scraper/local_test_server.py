@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Lokal ersättning för AF:s datasetsidor och JobTech Taxonomy API.
+
+Testar download_all_datasets.py utan nätverk. Servern beter sig som de riktiga
+källorna i just de delar nedladdaren är beroende av:
+
+    GET /data/dataset/<slug>/   HTML-sida med länken "Ladda ner JSON fil"
+    GET /files/<slug>.json      datasetet, med ETag och Last-Modified
+    GET /concepts/<endpoint>    Taxonomy API-svar {"data": {"concepts": [...]}}
+
+- If-None-Match / If-Modified-Since ger 304.
+- Range ger 206; en If-Range som inte matchar ger hela filen (200).
+- 200-svar gzippas om klienten tillåter det (som ett CDN).
+
+Usage:
+    python local_test_server.py --port 8000     # peka nedladdaren hit med --base-url/--taxonomy-base
+    python local_test_server.py --check         # kör nedladdaren mot servern: 200, 304, 206, If-Range
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlsplit
+
+GREEN = '\033[92m'
+RED = '\033[91m'
+BLUE = '\033[94m'
+RESET = '\033[0m'
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DOWNLOADER = Path(__file__).resolve().parent / "download_all_datasets.py"
+RECORDS = 2000  # ~100 KB per dataset: tillräckligt för att en halv fil ska vara meningsfull
+
+# =============================================================================
+# SERVER
+# =============================================================================
+
+def dataset_body(name, version, taxonomy=False):
+    """Deterministisk JSON-kropp per dataset; en ny version ger nytt innehåll och ny ETag."""
+    records = [{"id": f"{name}-{i}", "label": f"{name} {i}", "version": version} for i in range(RECORDS)]
+    data = {"data": {"concepts": records}} if taxonomy else records
+    return json.dumps(data, ensure_ascii=False).encode('utf-8')
+
+def validators(body, version):
+    etag = '"%s"' % hashlib.sha1(body).hexdigest()[:16]
+    last_modified = formatdate(1_700_000_000 + version * 86400, usegmt=True)
+    return etag, last_modified
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    version = 1          # höjs för att simulera en ny publicering (ny ETag)
+    bad_range = False    # 206 vars Content-Range inte börjar vid begärd byte
+    verbose = False
+    log = []             # (sökväg, status, Accept-Encoding) per datasetförfrågan
+
+    def log_message(self, fmt, *args):
+        if self.verbose:
+            super().log_message(fmt, *args)
+
+    def _send(self, status, body=b'', content_type='application/json', headers=()):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in headers:
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        page = re.fullmatch(r'/data/dataset/([\w-]+)/', path)
+        if page:
+            html = f'<html><body><a href="/files/{page.group(1)}.json">Ladda ner JSON fil</a></body></html>'
+            self._send(200, html.encode('utf-8'), 'text/html; charset=utf-8')
+            return
+        dataset = re.fullmatch(r'/files/([\w-]+)\.json|/concepts/([\w-]+)', path)
+        if not dataset:
+            self._send(404, b'{"error": "not found"}')
+            return
+        body = dataset_body(dataset.group(1) or dataset.group(2), self.version, taxonomy=bool(dataset.group(2)))
+        self._send_dataset(path, body)
+
+    def _send_dataset(self, path, body):
+        etag, last_modified = validators(body, self.version)
+        common = [('ETag', etag), ('Last-Modified', last_modified), ('Accept-Ranges', 'bytes')]
+        encoding = self.headers.get('Accept-Encoding', '')
+        status = self._status(etag, last_modified, len(body))
+        StandInHandler.log.append((path, status, encoding))
+
+        if status == 304:
+            self._send(304, headers=common)
+        elif status == 206:
+            start = int(re.match(r'bytes=(\d+)-', self.headers['Range']).group(1))
+            if self.bad_range:
+                start = 0  # servern ignorerar offseten men svarar ändå 206
+            self._send(206, body[start:], headers=common + [
+                ('Content-Range', f'bytes {start}-{len(body) - 1}/{len(body)}')])
+        elif 'gzip' in encoding:
+            self._send(200, gzip.compress(body), headers=common + [('Content-Encoding', 'gzip')])
+        else:
+            self._send(200, body, headers=common)
+
+    def _status(self, etag, last_modified, size):
+        if self.headers.get('If-None-Match') == etag or self.headers.get('If-Modified-Since') == last_modified:
+            return 304
+        match = re.match(r'bytes=(\d+)-$', self.headers.get('Range', ''))
+        if not match or int(match.group(1)) >= size:
+            return 200
+        if_range = self.headers.get('If-Range')
+        if if_range is not None and if_range not in (etag, last_modified):
+            return 200  # resursen har ändrats sedan .part-filen skrevs
+        return 206
+
+def body_of(slug, version=None):
+    return dataset_body(slug, StandInHandler.version if version is None else version)
+
+def start_server(host='127.0.0.1', port=0, verbose=False):
+    StandInHandler.verbose = verbose
+    server = ThreadingHTTPServer((host, port), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+# =============================================================================
+# CHECK
+# =============================================================================
+
+class Check:
+    """Kör download_all_datasets.py som underprocess mot servern, med data i en tempkatalog."""
+
+    def __init__(self, server, data_dir):
+        host, port = server.server_address[:2]
+        self.base = f"http://{host}:{port}"
+        self.data_dir = Path(data_dir)
+        self.failures = 0
+
+    def run(self, *args):
+        StandInHandler.log.clear()
+        subprocess.run([sys.executable, str(DOWNLOADER), '--base-url', self.base,
+                        '--taxonomy-base', f"{self.base}/concepts", *args],
+                       env={**os.environ, 'AF_DATA_DIR': str(self.data_dir)},
+                       check=True, capture_output=True)
+        return {path: status for path, status, _ in StandInHandler.log}, list(StandInHandler.log)
+
+    def metadata(self):
+        with open(self.data_dir / "download_metadata.json", 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def save_metadata(self, metadata):
+        with open(self.data_dir / "download_metadata.json", 'w', encoding='utf-8') as f:
+            json.dump(metadata, f)
+
+    def expect(self, ok, msg):
+        print(f"{GREEN}✓{RESET} {msg}" if ok else f"{RED}✗{RESET} {msg}")
+        self.failures += not ok
+
+    def interrupt(self, slug, version):
+        """
+        Lämnar en halv .part-fil och en partial_validator för den givna versionen,
+        som ett avbrutet nedladdningsförsök.
+        """
+        metadata = self.metadata()
+        entry = metadata["datasets"][slug]
+        output_file = BASE_DIR / entry["file"]
+        body = output_file.read_bytes()
+        half = len(body) // 2
+        output_file.with_name(output_file.name + ".part").write_bytes(body[:half])
+        entry["partial_validator"] = validators(body_of(slug, version), version)[0]
+        self.save_metadata(metadata)
+        return output_file, body, half
+
+def check(verbose=False):
+    server = start_server(verbose=verbose)
+    slug, path = "skills", "/files/skills.json"
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            c = Check(server, tmp)
+
+            print(f"{BLUE}ℹ{RESET} Första körningen")
+            statuses, log = c.run()
+            c.expect(statuses and all(s == 200 for s in statuses.values()), f"200 för alla {len(statuses)} datasets")
+            c.expect(all(enc == 'identity' for _, _, enc in log), "Accept-Encoding: identity på varje förfrågan")
+            files = {name: BASE_DIR / e["file"] for name, e in c.metadata()["datasets"].items()}
+            c.expect(all(json.loads(f.read_bytes()) for f in files.values()), "alla filer är giltig JSON")
+
+            print(f"{BLUE}ℹ{RESET} Andra körningen, oförändrad server")
+            statuses, _ = c.run()
+            c.expect(all(s == 304 for s in statuses.values()), "304 för alla datasets")
+
+            print(f"{BLUE}ℹ{RESET} Avbruten nedladdning med giltig validator")
+            output_file, body, half = c.interrupt(slug, StandInHandler.version)
+            statuses, _ = c.run('--force')
+            entry = c.metadata()["datasets"][slug]
+            c.expect(statuses.get(path) == 206, f"206 för {path}")
+            c.expect(entry.get("resumed_from") == half and output_file.read_bytes() == body,
+                     f"återupptogs från byte {half}, filen är identisk")
+
+            print(f"{BLUE}ℹ{RESET} Avbruten nedladdning, servern har publicerat en ny version")
+            StandInHandler.version += 1
+            output_file, _, _ = c.interrupt(slug, StandInHandler.version - 1)
+            statuses, _ = c.run('--force')
+            entry = c.metadata()["datasets"][slug]
+            c.expect(statuses.get(path) == 200, "If-Range matchar inte: 200 med hela filen")
+            c.expect(entry.get("resumed_from") == 0 and output_file.read_bytes() == body_of(slug),
+                     "filen skrevs om från början med den nya versionen")
+
+            print(f"{BLUE}ℹ{RESET} Servern svarar 206 från fel byte")
+            StandInHandler.bad_range = True
+            output_file, body, _ = c.interrupt(slug, StandInHandler.version)
+            _, log = c.run('--force')
+            StandInHandler.bad_range = False
+            c.expect([s for p, s, _ in log if p == path] == [206, 200], "fel Content-Range ger en ny nedladdning")
+            c.expect(c.metadata()["datasets"][slug].get("resumed_from") == 0 and output_file.read_bytes() == body,
+                     "filen är identisk med serverns")
+    finally:
+        server.shutdown()
+    return c.failures
+
+# =============================================================================
+# MAIN
+# =============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Lokal ersättningsserver för download_all_datasets.py")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--check", action="store_true", help="Kör nedladdaren mot servern och kontrollera svaren")
+    parser.add_argument("--verbose", action="store_true", help="Logga varje förfrågan")
+    args = parser.parse_args()
+
+    if args.check:
+        failures = check(args.verbose)
+        print(f"\n{GREEN}✓ Alla kontroller gick igenom{RESET}" if not failures else f"\n{RED}✗ {failures} fel{RESET}")
+        sys.exit(1 if failures else 0)
+
+    server = start_server(args.host, args.port, verbose=True)
+    print(f"{BLUE}ℹ{RESET} Serverar på http://{args.host}:{args.port} – "
+          f"--base-url http://{args.host}:{args.port} --taxonomy-base http://{args.host}:{args.port}/concepts")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,7 @@ Crosstrees — JobTech Dev → Supabase Import Script
 Imports ALL taxonomy data from AF's open APIs into Supabase.
 Usage:
     pip install supabase httpx tqdm
+    pip install "psycopg[binary]"   (optional, for the COPY loader)
 
     Set environment variables:
         SUPABASE_URL=https://your-project.supabase.co
@@ -18,152 +19,599 @@ Usage:
         python import_jobtech.py --step substitutability
         python import_jobtech.py --step occupation_skills
         python import_jobtech.py --step all   (default)
+
+    Runs are incremental: a local row-hash manifest of the last successful sync
+    (see data_sync_log) is diffed against the fresh download, and only new,
+    changed and removed rows are written. Force a complete re-upsert with:
+        python import_jobtech.py --full
+
+    Bulk-load the big relation tables with Postgres COPY (needs psycopg and a
+    direct connection string in DATABASE_URL):
+        python import_jobtech.py --copy-steps substitutability,occupation_skills
+
+    Offline dry run / benchmark (no Supabase needed; JOBTECHDEV_BASE can point
+    at a local mirror of the taxonomy API):
+        python import_jobtech.py --dry-run                 (in-memory SQLite)
+        python import_jobtech.py --dry-run import.sqlite --fetch-concurrency 8 --upsert-workers 8
 """
 import os
 import json
+import time
+import hashlib
+import queue
+import random
+import sqlite3
+import threading
 import httpx
 import argparse
-from datetime import datetime
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 from tqdm import tqdm
-from supabase import create_client, Client
+try:
+    from supabase import create_client
+except ImportError:  # only needed for the real import; --dry-run works without it
+    create_client = None
+try:
+    import psycopg
+    from psycopg import sql
+except ImportError:  # only needed for the COPY loader (--copy-steps)
+    psycopg = None
 # ── CONFIG ────────────────────────────────────────────────────────────────────
 SUPABASE_URL         = os.environ.get("SUPABASE_URL")
 SUPABASE_SERVICE_KEY = os.environ.get("SUPABASE_SERVICE_KEY")
-# JobTech Dev API base
-JOBTECHDEV_BASE = "https://taxonomy.api.jobtechdev.se/v1/taxonomy"
+# JobTech Dev API base (override to point the importer at a local mirror)
+JOBTECHDEV_BASE = os.environ.get("JOBTECHDEV_BASE", "https://taxonomy.api.jobtechdev.se/v1/taxonomy")
 # JobTech Dev static file downloads (CC0 licence)
 STATIC_FILES = {
     "substitutability": (
-        "https://taxonomy.api.jobtechdev.se/v1/taxonomy/specific/relations"
+        f"{JOBTECHDEV_BASE}/specific/relations"
         "/substitutability-relations-between-occupations"
     ),
     "occupation_skill_relations": (
-        "https://taxonomy.api.jobtechdev.se/v1/taxonomy/specific/relations"
+        f"{JOBTECHDEV_BASE}/specific/relations"
         "/occupation-skill-relations"
     ),
 }
 # Batch size for Supabase upserts (keep under 1000 to stay within limits)
 BATCH_SIZE = 500
+# Rows per COPY batch for the bulk loader (one staging COPY + merge per batch)
+COPY_BATCH_SIZE = 10_000
+# Direct Postgres connection for the COPY loader (Supabase: Settings → Database)
+DATABASE_URL = os.environ.get("DATABASE_URL")
+# Page size for /concepts and how many pages are in flight at once
+PAGE_SIZE         = 1000
+FETCH_CONCURRENCY = 4
+# Concurrent upsert workers, and how many batches may wait for them
+UPSERT_WORKERS = 4
+QUEUE_DEPTH    = 8
+# Retries (exponential backoff with jitter) for API calls and upsert batches
+MAX_RETRIES   = 5
+RETRY_BACKOFF = 0.5
+# Row-hash manifest of the last successful sync, used for delta imports
+MANIFEST_PATH = os.environ.get(
+    "JOBTECH_MANIFEST", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".jobtech_manifest.json")
+)
+# Conflict keys per table (mirrors the primary keys in 002_complete_schema.sql)
+TABLE_KEYS = {
+    "occupations":                ("id",),
+    "skills":                     ("id",),
+    "substitutability":           ("from_occupation_id", "to_occupation_id"),
+    "occupation_skill_relations": ("occupation_id", "skill_id"),
+    "municipalities":             ("kod",),
+}
 # ── HELPERS ───────────────────────────────────────────────────────────────────
-def get_supabase() -> Client:
+def get_supabase():
+    if create_client is None:
+        raise ImportError("pip install supabase — or run with --dry-run to import into SQLite.")
     if not SUPABASE_URL or not SUPABASE_SERVICE_KEY:
         raise EnvironmentError(
             "Set SUPABASE_URL and SUPABASE_SERVICE_KEY environment variables.\n"
             "Use the SERVICE ROLE key (not anon) — needed to bypass RLS for imports."
         )
     return create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
-def batch_upsert(supabase: Client, table: str, rows: list, conflict_cols: str = None):
-    """Upsert rows in batches, with progress bar."""
-    if not rows:
-        print(f"  ⚠  No rows to insert for {table}")
-        return
-    total = len(rows)
-    inserted = 0
-    errors = 0
-    for i in tqdm(range(0, total, BATCH_SIZE), desc=f"  → {table}", unit="batch"):
-        batch = rows[i : i + BATCH_SIZE]
+def with_retry(fn, what: str, retryable=lambda e: True):
+    """Call fn(), retrying with exponential backoff + jitter. Re-raises after MAX_RETRIES."""
+    for attempt in range(MAX_RETRIES + 1):
         try:
-            query = supabase.table(table).upsert(batch)
-            if conflict_cols:
-                query = query.on_conflict(conflict_cols)
-            query.execute()
-            inserted += len(batch)
+            return fn()
         except Exception as e:
-            errors += len(batch)
-            print(f"\n  ✗ Batch {i//BATCH_SIZE + 1} failed: {e}")
-    print(f"  ✓ {inserted:,} rows upserted into {table}"
-          + (f" ({errors:,} errors)" if errors else ""))
-    return inserted
+            if attempt == MAX_RETRIES or not retryable(e):
+                raise
+            delay = RETRY_BACKOFF * 2 ** attempt * random.uniform(0.5, 1.0)
+            print(f"\n  ↻ {what} failed ({e}) — retry {attempt + 1}/{MAX_RETRIES} in {delay:.1f}s")
+            time.sleep(delay)
+class SupabaseTarget:
+    """Upserts into Supabase over PostgREST."""
+    def __init__(self, client):
+        self.client = client
+    def upsert(self, table: str, rows: list, conflict_cols: str = None):
+        if conflict_cols:
+            self.client.table(table).upsert(rows, on_conflict=conflict_cols).execute()
+        else:
+            self.client.table(table).upsert(rows).execute()
+    def insert(self, table: str, row: dict):
+        self.client.table(table).insert(row).execute()
+    def delete(self, table: str, keys: list):
+        cols = TABLE_KEYS[table]
+        # PostgREST filters go in the URL, so delete in groups: col IN (...) per leading key
+        groups = {}
+        for key in keys:
+            groups.setdefault(key[:-1], []).append(key[-1])
+        for prefix, last in groups.items():
+            for i in range(0, len(last), 200):
+                query = self.client.table(table).delete()
+                for col, value in zip(cols, prefix):
+                    query = query.eq(col, value)
+                query.in_(cols[-1], last[i : i + 200]).execute()
+    def last_sync(self, source: str):
+        res = (self.client.table("data_sync_log").select("finished_at")
+               .eq("source", source).eq("status", "success")
+               .order("finished_at", desc=True).limit(1).execute())
+        return res.data[0]["finished_at"] if res.data else None
+class SQLiteTarget:
+    """
+    Local stand-in for Supabase used by --dry-run: same upsert semantics
+    (ON CONFLICT on the table's primary key), no network, so the pipeline
+    can be run and benchmarked offline. Tables are created on first use.
+    """
+    def __init__(self, path: str = ":memory:"):
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.columns = {}
+    def _ensure_table(self, table: str, cols: list):
+        known = self.columns.get(table)
+        if known is None:
+            key = TABLE_KEYS.get(table)
+            pk = f", PRIMARY KEY ({', '.join(key)})" if key else ""
+            defs = ", ".join(f'"{c}"' for c in dict.fromkeys(list(key or ()) + cols))
+            self.conn.execute(f'CREATE TABLE IF NOT EXISTS "{table}" ({defs}{pk})')
+            known = {row[1] for row in self.conn.execute(f'PRAGMA table_info("{table}")')}
+            self.columns[table] = known
+        for c in cols:
+            if c not in known:
+                self.conn.execute(f'ALTER TABLE "{table}" ADD COLUMN "{c}"')
+                known.add(c)
+    def _write(self, table: str, rows: list, upsert: bool):
+        cols = list(dict.fromkeys(k for r in rows for k in r))
+        values = [
+            tuple(json.dumps(v) if isinstance(v, (dict, list)) else v for v in (r.get(c) for c in cols))
+            for r in rows
+        ]
+        quoted = ", ".join(f'"{c}"' for c in cols)
+        sql = f'INSERT INTO "{table}" ({quoted}) VALUES ({", ".join("?" * len(cols))})'
+        key = TABLE_KEYS.get(table)
+        if upsert and key:
+            updates = [c for c in cols if c not in key]
+            sql += f" ON CONFLICT ({', '.join(key)}) DO " + (
+                "UPDATE SET " + ", ".join(f'"{c}" = excluded."{c}"' for c in updates) if updates else "NOTHING"
+            )
+        with self.lock:
+            self._ensure_table(table, cols)
+            self.conn.executemany(sql, values)
+            self.conn.commit()
+    def upsert(self, table: str, rows: list, conflict_cols: str = None):
+        self._write(table, rows, upsert=True)
+    def insert(self, table: str, row: dict):
+        self._write(table, [row], upsert=False)
+    def delete(self, table: str, keys: list):
+        where = " AND ".join(f'"{c}" = ?' for c in TABLE_KEYS[table])
+        with self.lock:
+            self.conn.executemany(f'DELETE FROM "{table}" WHERE {where}', keys)
+            self.conn.commit()
+    def last_sync(self, source: str):
+        try:
+            row = self.conn.execute(
+                "SELECT finished_at FROM data_sync_log WHERE source = ? AND status = 'success' "
+                "ORDER BY finished_at DESC LIMIT 1", (source,)
+            ).fetchone()
+        except sqlite3.OperationalError:  # no sync logged yet
+            return None
+        return row[0] if row else None
+class PostgresCopyTarget:
+    """
+    Bulk loader straight against Postgres: each batch is streamed with COPY into a
+    temporary staging table and merged with a single INSERT ... ON CONFLICT.
+    Every upsert worker thread gets its own connection (and staging tables).
+    """
+    batch_size = COPY_BATCH_SIZE
+    def __init__(self, dsn: str):
+        if psycopg is None:
+            raise ImportError("pip install 'psycopg[binary]' to use the COPY loader.")
+        if not dsn:
+            raise EnvironmentError("Set DATABASE_URL (or --pg-dsn) to use the COPY loader.")
+        self.dsn = dsn
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.connections = []
+    def _conn(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None or conn.closed:
+            conn = self.local.conn = psycopg.connect(self.dsn)
+            self.local.staged = set()
+            with self.lock:
+                self.connections.append(conn)
+        return conn
+    def _stage(self, conn, table: str):
+        stage = f"_stage_{table}"
+        if stage not in self.local.staged:
+            with conn.transaction():
+                conn.execute(sql.SQL(
+                    "CREATE TEMP TABLE IF NOT EXISTS {} (LIKE {} INCLUDING DEFAULTS) ON COMMIT DELETE ROWS"
+                ).format(sql.Identifier(stage), sql.Identifier(table)))
+            self.local.staged.add(stage)
+        return stage
+    def upsert(self, table: str, rows: list, conflict_cols: str = None):
+        key = conflict_cols.split(",") if conflict_cols else list(TABLE_KEYS[table])
+        cols = list(dict.fromkeys(k for r in rows for k in r))
+        updates = [c for c in cols if c not in key]
+        ident = lambda names: sql.SQL(", ").join(map(sql.Identifier, names))
+        conn = self._conn()
+        stage = self._stage(conn, table)
+        merge = sql.SQL("INSERT INTO {table} ({cols}) SELECT DISTINCT ON ({key}) {cols} FROM {stage} "
+                        "ON CONFLICT ({key}) DO ").format(
+            table=sql.Identifier(table), stage=sql.Identifier(stage), cols=ident(cols), key=ident(key))
+        if updates:
+            # Rows whose values did not change are skipped, so re-runs don't rewrite every tuple
+            merge += sql.SQL("UPDATE SET ") + sql.SQL(", ").join(
+                sql.SQL("{0} = EXCLUDED.{0}").format(sql.Identifier(c)) for c in updates
+            ) + sql.SQL(" WHERE ({}) IS DISTINCT FROM ({})").format(
+                sql.SQL(", ").join(sql.SQL("{}.{}").format(sql.Identifier(table), sql.Identifier(c)) for c in updates),
+                sql.SQL(", ").join(sql.SQL("EXCLUDED.{}").format(sql.Identifier(c)) for c in updates))
+        else:
+            merge += sql.SQL("NOTHING")
+        with conn.transaction(), conn.cursor() as cur:
+            with cur.copy(sql.SQL("COPY {} ({}) FROM STDIN").format(sql.Identifier(stage), ident(cols))) as copy:
+                for r in rows:
+                    copy.write_row([json.dumps(v) if isinstance(v, (dict, list)) else v
+                                    for v in (r.get(c) for c in cols)])
+            cur.execute(merge)
+    def insert(self, table: str, row: dict):
+        conn = self._conn()
+        with conn.transaction():
+            conn.execute(sql.SQL("INSERT INTO {} ({}) VALUES ({})").format(
+                sql.Identifier(table), sql.SQL(", ").join(map(sql.Identifier, row)),
+                sql.SQL(", ").join([sql.Placeholder()] * len(row))), list(row.values()))
+    def delete(self, table: str, keys: list):
+        where = sql.SQL(" AND ").join(sql.SQL("{} = %s").format(sql.Identifier(c)) for c in TABLE_KEYS[table])
+        conn = self._conn()
+        with conn.transaction(), conn.cursor() as cur:
+            cur.executemany(sql.SQL("DELETE FROM {} WHERE ").format(sql.Identifier(table)) + where, keys)
+    def last_sync(self, source: str):
+        conn = self._conn()
+        with conn.transaction():
+            row = conn.execute(
+                "SELECT finished_at FROM data_sync_log WHERE source = %s AND status = 'success' "
+                "ORDER BY finished_at DESC LIMIT 1", (source,)
+            ).fetchone()
+        return row[0].isoformat() if row else None
+    def close(self):
+        for conn in self.connections:
+            conn.close()
+class UpsertPipeline:
+    """
+    Bounded queue of batches drained by several concurrent upsert workers.
+    Producers put() rows as soon as they arrive (e.g. one API page at a time);
+    a full queue blocks the producer, so memory stays bounded. Failed batches
+    are retried with backoff and only counted as errors once retries run out.
+    """
+    def __init__(self, target, table: str, conflict_cols: str = None,
+                 workers: int = None, batch_size: int = None):
+        self.target = target
+        self.table = table
+        self.conflict_cols = conflict_cols
+        self.batch_size = batch_size or getattr(target, "batch_size", None) or BATCH_SIZE
+        self.buffer = []
+        self.queued = 0
+        self.inserted = 0
+        self.errors = 0
+        self.lock = threading.Lock()
+        self.queue = queue.Queue(maxsize=QUEUE_DEPTH)
+        self.progress = tqdm(desc=f"  → {table}", unit="row")
+        self.started = time.perf_counter()
+        self.threads = [threading.Thread(target=self._worker, daemon=True)
+                        for _ in range(workers or UPSERT_WORKERS)]
+        for t in self.threads:
+            t.start()
+    def put(self, rows: list):
+        self.buffer.extend(rows)
+        while len(self.buffer) >= self.batch_size:
+            self._enqueue(self.buffer[:self.batch_size])
+            del self.buffer[:self.batch_size]
+    def _enqueue(self, batch: list):
+        self.queued += len(batch)
+        self.queue.put(batch)
+    def _worker(self):
+        while True:
+            batch = self.queue.get()
+            if batch is None:
+                return
+            try:
+                with_retry(lambda: self.target.upsert(self.table, batch, self.conflict_cols),
+                           f"Batch of {len(batch)} rows into {self.table}")
+                ok, failed = len(batch), 0
+            except Exception as e:
+                ok, failed = 0, len(batch)
+                print(f"\n  ✗ Batch of {len(batch)} rows into {self.table} failed after {MAX_RETRIES} retries: {e}")
+            with self.lock:
+                self.inserted += ok
+                self.errors += failed
+                self.progress.update(len(batch))
+    def close_quietly(self):
+        """Flush the last partial batch and wait for all workers."""
+        if self.buffer:
+            self._enqueue(self.buffer)
+            self.buffer = []
+        for _ in self.threads:
+            self.queue.put(None)
+        for t in self.threads:
+            t.join()
+        self.progress.close()
+    def close(self) -> int:
+        """close_quietly() and report throughput."""
+        self.close_quietly()
+        if not self.queued:
+            print(f"  ⚠  No rows to insert for {self.table}")
+            return 0
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        print(f"  ✓ {self.inserted:,} rows upserted into {self.table}"
+              + (f" ({self.errors:,} errors)" if self.errors else "")
+              + f" — {elapsed:.1f}s, {self.queued / elapsed:,.0f} rows/s")
+        return self.inserted
+    def __enter__(self):
+        return self
+    def __exit__(self, *exc):
+        self.close()
+def batch_upsert(target, table: str, rows: list, conflict_cols: str = None):
+    """Upsert an already materialised list of rows through the pipeline."""
+    with UpsertPipeline(target, table, conflict_cols) as pipe:
+        pipe.put(rows)
+    return pipe.inserted
+_client = None
+def get_client() -> httpx.Client:
+    """One pooled keep-alive client shared by all fetches (and fetch threads)."""
+    global _client
+    if _client is None:
+        n = max(FETCH_CONCURRENCY, 1)
+        _client = httpx.Client(
+            headers={"Accept": "application/json"},
+            timeout=30,
+            limits=httpx.Limits(max_connections=n * 2, max_keepalive_connections=n * 2),
+        )
+    return _client
+def _retryable_http(e: Exception) -> bool:
+    # Network errors, 5xx and 429 are worth another try; other 4xx are not
+    if isinstance(e, httpx.HTTPStatusError):
+        return e.response.status_code >= 500 or e.response.status_code == 429
+    return isinstance(e, httpx.TransportError)
 def fetch_api(url: str, params: dict = None) -> dict:
-    """Fetch from JobTech Dev API with error handling."""
-    headers = {"Accept": "application/json"}
-    try:
-        r = httpx.get(url, params=params, headers=headers, timeout=30)
+    """Fetch from JobTech Dev API with retry/backoff on transient errors."""
+    def get():
+        r = get_client().get(url, params=params)
         r.raise_for_status()
         return r.json()
+    try:
+        return with_retry(get, f"GET {url}", _retryable_http)
     except httpx.HTTPError as e:
         print(f"  ✗ HTTP error fetching {url}: {e}")
         raise
-def log_sync(supabase: Client, source: str, status: str,
-             records: int = 0, error: str = None):
-    supabase.table("data_sync_log").insert({
+def iter_concept_pages(concept_type: str, page_size: int = PAGE_SIZE, concurrency: int = None):
+    """
+    Yield /concepts pages in offset order while keeping `concurrency` requests
+    in flight. Stops at the first short or empty page, like the old serial loop.
+    """
+    url = f"{JOBTECHDEV_BASE}/concepts"
+    def page(offset):
+        return fetch_api(url, {"type": concept_type, "offset": offset, "limit": page_size}).get("concept_list", [])
+    concurrency = max(concurrency or FETCH_CONCURRENCY, 1)
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        pending = deque(pool.submit(page, i * page_size) for i in range(concurrency))
+        next_offset = concurrency * page_size
+        while pending:
+            concepts = pending.popleft().result()
+            if concepts:
+                yield concepts
+            if len(concepts) < page_size:
+                for f in pending:
+                    f.cancel()
+                return
+            pending.append(pool.submit(page, next_offset))
+            next_offset += page_size
+def log_sync(target, source: str, status: str,
+             records: int = 0, error: str = None) -> str:
+    finished_at = datetime.now(timezone.utc).isoformat()
+    target.insert("data_sync_log", {
         "source": source,
         "status": status,
         "records_updated": records,
-        "finished_at": datetime.utcnow().isoformat(),
+        "finished_at": finished_at,
         "error_msg": error,
-    }).execute()
+    })
+    return finished_at
+# ── DELTA SYNC ────────────────────────────────────────────────────────────────
+def row_key(table: str, row: dict) -> str:
+    return "\x1f".join(str(row[c]) for c in TABLE_KEYS[table])
+def row_hash(row: dict) -> str:
+    blob = json.dumps(row, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.blake2b(blob.encode("utf-8"), digest_size=8).hexdigest()
+def _utc(value: str) -> datetime:
+    stamp = datetime.fromisoformat(value)
+    if stamp.tzinfo is None:  # older log entries were written as naive UTC
+        stamp = stamp.replace(tzinfo=timezone.utc)
+    return stamp.astimezone(timezone.utc)
+def _same_instant(a: str, b: str) -> bool:
+    # Postgres hands timestamps back in the session time zone, e.g. "2024-05-01T04:00:00.123+02:00"
+    if not a or not b:
+        return False
+    try:
+        return _utc(a) == _utc(b)
+    except ValueError:
+        return a == b
+class SyncManifest:
+    """
+    Local {table: {row key: row hash}} snapshot of what the target held after
+    the last successful sync of each table. It is only trusted when the
+    target's latest successful data_sync_log entry for the source is the one
+    this manifest wrote; otherwise (new database, someone else synced since,
+    --full) the step falls back to a full upsert and rebuilds the manifest.
+    """
+    def __init__(self, path: str, target_id: str, full: bool = False):
+        self.path = path
+        self.target_id = target_id
+        self.full = full
+        self.tables = {}
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("target") == target_id:
+                self.tables = data.get("tables", {})
+        except (OSError, ValueError):
+            pass
+    def baseline(self, target, table: str, source: str):
+        """Row hashes from the last successful sync, or None when a full sync is needed."""
+        entry = self.tables.get(table)
+        if self.full or not entry:
+            return None
+        if not _same_instant(target.last_sync(source), entry.get("synced_at")):
+            print(f"  ⚠  Manifest for {table} does not match the last successful sync — full upsert")
+            return None
+        return entry["rows"]
+    def commit(self, table: str, source: str, rows: dict, synced_at: str):
+        self.tables[table] = {"source": source, "synced_at": synced_at, "rows": rows}
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"target": self.target_id, "tables": self.tables}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+class DeltaSync:
+    """
+    Streams one table's rows through a diff against the manifest: unchanged rows
+    are dropped, new and changed rows go to the upsert pipeline, and rows that
+    disappeared upstream are deleted at the end. Without a baseline every row
+    is upserted (and nothing deleted), exactly like a plain import.
+    """
+    def __init__(self, target, table: str, source: str, manifest: SyncManifest = None):
+        self.target = target
+        self.table = table
+        self.source = source
+        self.manifest = manifest
+        self.previous = manifest.baseline(target, table, source) if manifest else None
+        self.current = {}
+        self.inserted = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.deleted = 0
+        self.pipe = UpsertPipeline(target, table)
+    def put(self, rows: list):
+        changed = []
+        for row in rows:
+            key = row_key(self.table, row)
+            if key in self.current:  # duplicate upstream row; the first one wins
+                continue
+            digest = self.current[key] = row_hash(row)
+            old = self.previous.get(key) if self.previous is not None else None
+            if old == digest:
+                self.unchanged += 1
+                continue
+            if old is None:
+                self.inserted += 1
+            else:
+                self.updated += 1
+            changed.append(row)
+        if changed:
+            self.pipe.put(changed)
+    def _delete_missing(self) -> bool:
+        gone = [k for k in self.previous if k not in self.current]
+        if not gone:
+            return True
+        if not self.current:
+            print(f"  ⚠  Upstream returned no rows for {self.table} — skipping {len(gone):,} deletes")
+            return False
+        keys = [tuple(k.split("\x1f")) for k in gone]
+        try:
+            for i in range(0, len(keys), BATCH_SIZE):
+                batch = keys[i : i + BATCH_SIZE]
+                with_retry(lambda: self.target.delete(self.table, batch), f"Delete from {self.table}")
+                self.deleted += len(batch)
+        except Exception as e:
+            print(f"\n  ✗ Deleting from {self.table} failed after {MAX_RETRIES} retries: {e}")
+            return False
+        return True
+    def close(self) -> int:
+        """Finish upserts and deletes, log the sync and, if it was clean, advance the manifest."""
+        if self.previous is None:
+            self.pipe.close()
+            clean = not self.pipe.errors
+        else:
+            self.pipe.close_quietly()
+            clean = self._delete_missing() and not self.pipe.errors
+            print(f"  Δ {self.table}: +{self.inserted:,} new, ~{self.updated:,} changed, "
+                  f"-{self.deleted:,} deleted, {self.unchanged:,} unchanged"
+                  + (f" ({self.pipe.errors:,} errors)" if self.pipe.errors else ""))
+        records = self.pipe.inserted + self.deleted
+        synced_at = log_sync(self.target, self.source, "success" if clean else "partial", records)
+        if clean and self.manifest is not None:
+            self.manifest.commit(self.table, self.source, self.current, synced_at)
+        return records
+    def __enter__(self):
+        return self
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+            return
+        # Record the aborted sync so the log shows it; the manifest is left untouched
+        self.pipe.close_quietly()
+        try:
+            log_sync(self.target, self.source, "failed", self.pipe.inserted + self.deleted,
+                     f"{exc_type.__name__}: {exc}")
+        except Exception as e:
+            print(f"  ✗ Could not log the failed sync of {self.table}: {e}")
 # ── STEP 1: OCCUPATIONS ───────────────────────────────────────────────────────
-def import_occupations(supabase: Client):
-    print("\n[1/4] Importing occupations (SSYK-4)...")
-    # Fetch all SSYK-4 occupations from taxonomy API
-    url = f"{JOBTECHDEV_BASE}/concepts"
-    params = {"type": "occupation-name", "offset": 0, "limit": 1000}
-    all_concepts = []
-    while True:
-        data = fetch_api(url, params)
-        concepts = data.get("concept_list", [])
-        if not concepts:
-            break
-        all_concepts.extend(concepts)
-        params["offset"] += len(concepts)
-        if len(concepts) < params["limit"]:
+def occupation_row(c: dict) -> dict:
+    # Extract SSYK code from preferred label or external standard
+    ssyk = None
+    for std in c.get("external_standard_code", []):
+        if std.get("standard_name") == "SSYK 2012":
+            ssyk = std.get("code")
             break
-    print(f"  Fetched {len(all_concepts):,} occupation concepts from API")
-    rows = []
-    for c in all_concepts:
-        # Extract SSYK code from preferred label or external standard
-        ssyk = None
-        for std in c.get("external_standard_code", []):
-            if std.get("standard_name") == "SSYK 2012":
-                ssyk = std.get("code")
-                break
-        rows.append({
-            "id":       c["concept_id"],
-            "name_sv":  c.get("preferred_label", ""),
-            "name_en":  c.get("preferred_label_en"),
-            "ssyk_code": ssyk,
-            "ssyk_level_1": ssyk[0]   if ssyk and len(ssyk) >= 1 else None,
-            "ssyk_level_2": ssyk[:2]  if ssyk and len(ssyk) >= 2 else None,
-            "ssyk_level_3": ssyk[:3]  if ssyk and len(ssyk) >= 3 else None,
-        })
-    count = batch_upsert(supabase, "occupations", rows)
-    log_sync(supabase, "taxonomy_api_occupations", "success", count)
+    return {
+        "id":       c["concept_id"],
+        "name_sv":  c.get("preferred_label", ""),
+        "name_en":  c.get("preferred_label_en"),
+        "ssyk_code": ssyk,
+        "ssyk_level_1": ssyk[0]   if ssyk and len(ssyk) >= 1 else None,
+        "ssyk_level_2": ssyk[:2]  if ssyk and len(ssyk) >= 2 else None,
+        "ssyk_level_3": ssyk[:3]  if ssyk and len(ssyk) >= 3 else None,
+    }
+def import_occupations(target, manifest: SyncManifest = None):
+    print("\n[1/4] Importing occupations (SSYK-4)...")
+    # Fetch all SSYK-4 occupations from taxonomy API; changed rows are upserted as pages arrive
+    fetched = 0
+    with DeltaSync(target, "occupations", "taxonomy_api_occupations", manifest) as sync:
+        for concepts in iter_concept_pages("occupation-name"):
+            fetched += len(concepts)
+            sync.put([occupation_row(c) for c in concepts])
+        print(f"  Fetched {fetched:,} occupation concepts from API")
 # ── STEP 2: SKILLS ────────────────────────────────────────────────────────────
-def import_skills(supabase: Client):
+def skill_row(s: dict) -> dict:
+    return {
+        "id":       s["concept_id"],
+        "name_sv":  s.get("preferred_label", ""),
+        "name_en":  s.get("preferred_label_en"),
+        "type":     "skill",
+        "esco_uri": s.get("esco_uri"),
+    }
+def import_skills(target, manifest: SyncManifest = None):
     print("\n[2/4] Importing skills...")
-    url = f"{JOBTECHDEV_BASE}/concepts"
-    skill_types = [
-        ("skill", "competency"),
-        ("skill", "knowledge"),
-        ("skill", "skill"),
-    ]
     # JobTech groups skills under "competency" type
-    params = {"type": "competency", "offset": 0, "limit": 1000}
-    all_skills = []
-    while True:
-        data = fetch_api(url, params)
-        concepts = data.get("concept_list", [])
-        if not concepts:
-            break
-        all_skills.extend(concepts)
-        params["offset"] += len(concepts)
-        if len(concepts) < params["limit"]:
-            break
-    print(f"  Fetched {len(all_skills):,} skill concepts from API")
-    rows = []
-    for s in all_skills:
-        rows.append({
-            "id":       s["concept_id"],
-            "name_sv":  s.get("preferred_label", ""),
-            "name_en":  s.get("preferred_label_en"),
-            "type":     "skill",
-            "esco_uri": s.get("esco_uri"),
-        })
-    count = batch_upsert(supabase, "skills", rows)
-    log_sync(supabase, "taxonomy_api_skills", "success", count)
+    fetched = 0
+    with DeltaSync(target, "skills", "taxonomy_api_skills", manifest) as sync:
+        for concepts in iter_concept_pages("competency"):
+            fetched += len(concepts)
+            sync.put([skill_row(s) for s in concepts])
+        print(f"  Fetched {fetched:,} skill concepts from API")
 # ── STEP 3: SUBSTITUTABILITY RELATIONS ───────────────────────────────────────
-def import_substitutability(supabase: Client):
+def import_substitutability(target, manifest: SyncManifest = None):
     print("\n[3/4] Importing substitutability relations (51,000+)...")
     url = STATIC_FILES["substitutability"]
     print(f"  Fetching from: {url}")
@@ -207,10 +655,10 @@ def import_substitutability(supabase: Client):
         })
     if skipped:
         print(f"  ⚠  Skipped {skipped} relations with missing IDs")
-    count = batch_upsert(supabase, "substitutability", rows)
-    log_sync(supabase, "substitutability_relations", "success", count)
+    with DeltaSync(target, "substitutability", "substitutability_relations", manifest) as sync:
+        sync.put(rows)
 # ── STEP 4: OCCUPATION–SKILL RELATIONS ───────────────────────────────────────
-def import_occupation_skill_relations(supabase: Client):
+def import_occupation_skill_relations(target, manifest: SyncManifest = None):
     print("\n[4/4] Importing occupation–skill relations...")
     url = STATIC_FILES["occupation_skill_relations"]
     print(f"  Fetching from: {url}")
@@ -243,10 +691,10 @@ def import_occupation_skill_relations(supabase: Client):
         })
     if skipped:
         print(f"  ⚠  Skipped {skipped} relations with missing IDs")
-    count = batch_upsert(supabase, "occupation_skill_relations", rows)
-    log_sync(supabase, "occupation_skill_relations", "success", count)
+    with DeltaSync(target, "occupation_skill_relations", "occupation_skill_relations", manifest) as sync:
+        sync.put(rows)
 # ── BONUS: SEED PILOT MUNICIPALITIES ─────────────────────────────────────────
-def seed_municipalities(supabase: Client):
+def seed_municipalities(target):
     print("\n[Bonus] Seeding pilot municipalities...")
     municipalities = [
         # CityIQ pilot targets (investors.html)
@@ -259,10 +707,11 @@ def seed_municipalities(supabase: Client):
         {"kod": "1280", "name": "Malmö",     "nuts3_code": "SE224", "population": 350000, "size_tier": "large",  "is_pilot": False},
         {"kod": "1480", "name": "Göteborg",  "nuts3_code": "SE231", "population": 590000, "size_tier": "large",  "is_pilot": False},
     ]
-    count = batch_upsert(supabase, "municipalities", municipalities)
+    count = batch_upsert(target, "municipalities", municipalities)
     print(f"  ✓ {count} municipalities seeded")
 # ── MAIN ──────────────────────────────────────────────────────────────────────
 def main():
+    global FETCH_CONCURRENCY, UPSERT_WORKERS
     parser = argparse.ArgumentParser(description="Crosstrees — JobTech Dev → Supabase importer")
     parser.add_argument(
         "--step",
@@ -270,23 +719,63 @@ def main():
         choices=["all", "occupations", "skills", "substitutability", "occupation_skills", "municipalities"],
         help="Which import step to run (default: all)"
     )
+    parser.add_argument(
+        "--dry-run",
+        nargs="?",
+        const=":memory:",
+        metavar="SQLITE_PATH",
+        help="Upsert into a local SQLite stand-in instead of Supabase (default: in-memory)"
+    )
+    parser.add_argument("--copy-steps", default="",
+                        help="Comma-separated steps to load with Postgres COPY instead of PostgREST, "
+                             "e.g. substitutability,occupation_skills")
+    parser.add_argument("--pg-dsn", default=DATABASE_URL,
+                        help="Postgres connection string for --copy-steps (default: $DATABASE_URL)")
+    parser.add_argument("--full", action="store_true",
+                        help="Ignore the delta manifest and upsert every row (the manifest is rebuilt)")
+    parser.add_argument("--manifest", default=MANIFEST_PATH,
+                        help=f"Row-hash manifest for delta syncs (default: {MANIFEST_PATH})")
+    parser.add_argument("--fetch-concurrency", type=int, default=FETCH_CONCURRENCY,
+                        help=f"/concepts pages fetched in parallel (default: {FETCH_CONCURRENCY})")
+    parser.add_argument("--upsert-workers", type=int, default=UPSERT_WORKERS,
+                        help=f"Concurrent upsert workers (default: {UPSERT_WORKERS})")
     args = parser.parse_args()
+    FETCH_CONCURRENCY = max(args.fetch_concurrency, 1)
+    UPSERT_WORKERS = max(args.upsert_workers, 1)
     print("=" * 60)
-    print("Crosstrees — JobTech Dev → Supabase Import")
+    print("Crosstrees — JobTech Dev → Supabase Import" + (" (dry run)" if args.dry_run else ""))
     print(f"Started: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print("=" * 60)
-    supabase = get_supabase()
+    if args.dry_run:
+        target = SQLiteTarget(args.dry_run)
+        target_id = f"sqlite:{os.path.abspath(args.dry_run) if args.dry_run != ':memory:' else args.dry_run}"
+        print(f"  Dry run → SQLite {args.dry_run}")
+    else:
+        target = SupabaseTarget(get_supabase())
+        target_id = SUPABASE_URL
+    manifest = SyncManifest(args.manifest, target_id, full=args.full)
+    copy_steps = {s.strip() for s in args.copy_steps.split(",") if s.strip()}
+    unknown = copy_steps - {"occupations", "skills", "substitutability", "occupation_skills"}
+    if unknown:
+        parser.error(f"unknown --copy-steps: {', '.join(sorted(unknown))}")
+    copy_target = PostgresCopyTarget(args.pg_dsn) if copy_steps else None
+    if copy_target:
+        print(f"  COPY loader for: {', '.join(sorted(copy_steps))}")
+    def target_for(name):
+        return copy_target if name in copy_steps else target
     step = args.step
     if step in ("all", "occupations"):
-        import_occupations(supabase)
+        import_occupations(target_for("occupations"), manifest)
     if step in ("all", "skills"):
-        import_skills(supabase)
+        import_skills(target_for("skills"), manifest)
     if step in ("all", "substitutability"):
-        import_substitutability(supabase)
+        import_substitutability(target_for("substitutability"), manifest)
     if step in ("all", "occupation_skills"):
-        import_occupation_skill_relations(supabase)
+        import_occupation_skill_relations(target_for("occupation_skills"), manifest)
+    if copy_target:
+        copy_target.close()
     if step in ("all", "municipalities"):
-        seed_municipalities(supabase)
+        seed_municipalities(target)
     print("\n" + "=" * 60)
     print(f"Done: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print("=" * 60)